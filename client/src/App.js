@@ -12,6 +12,7 @@ import BookingModal from "./components/BookingModal";
 import CraftsmanListModal from "./components/CraftsmanListModal";
 import CraftsmanDetailModal from "./components/CraftsmanDetailModal";
 import AudioGuide from "./components/AudioGuide";
+import PlaceMarkers from "./components/PlaceMarkers";
 
 // User Menu Component
 function UserMenu() {
@@ -652,6 +653,8 @@ function PlaceDetailModal({ place, onClose }) {
 
 export default function App() {
   const [places, setPlaces] = useState([]);
+  // Zoomed-out map showing clusters from the search API instead of every place
+  const [viewportClustered, setViewportClustered] = useState(false);
   const [roadmaps, setRoadmaps] = useState([]);
   const [featuredEvents, setFeaturedEvents] = useState([]);
   const [selectedRoadmap, setSelectedRoadmap] = useState(null);
@@ -1360,8 +1363,13 @@ const formatDateRange = (startDate, endDate) => {
           <UserLocationMarker position={userPosition} />
           
 
+          {/* Clustered markers for the viewport while zoomed out (no roadmap selected) */}
+          {!fullRoadmap && (
+            <PlaceMarkers places={places} onClusteredChange={setViewportClustered} />
+          )}
+
           {/* Place Markers - Only visible places (filtered by roadmap) */}
-          {visiblePlaces.map((place) => {
+          {(fullRoadmap || !viewportClustered) && visiblePlaces.map((place) => {
             const color = categoryColors[place.category] || categoryColors.default;
             const emoji = categoryEmojis[place.category] || categoryEmojis.default;
             const stopNumber = fullRoadmap?.stops.find((s) => s.placeSlug === place.slug)?.order;
@@ -1,5 +1,13 @@
-import { Marker, Popup } from "react-leaflet";
-import { Icon } from "leaflet";
+import { useCallback, useEffect, useRef, useState } from "react";
+import { Marker, Popup, useMap, useMapEvents } from "react-leaflet";
+import { Icon, divIcon } from "leaflet";
+import { getPlacesInBounds } from "../services/api";
+
+// The search API clusters places up to this zoom (CLUSTER_MAX_ZOOM in
+// searchEngine/spatial_index.py); above it every place gets its own marker
+const CLUSTER_MAX_ZOOM = 14;
+// Wait for the map to settle before asking for the new viewport
+const VIEWPORT_DEBOUNCE_MS = 300;
 
 // Different icons for different place types
 const icons = {
@@ -33,47 +41,99 @@ const icons = {
   }),
 };
 
-export default function PlaceMarkers({ places, roadmap }) {
-  if (!places || places.length === 0) return null;
+// Bubble sized by how many places the cluster holds
+function createClusterIcon(count) {
+  const size = count < 10 ? 36 : count < 100 ? 44 : 52;
+  return divIcon({
+    className: "",
+    html: `<div class="cluster-marker" style="width:${size}px;height:${size}px">${count}</div>`,
+    iconSize: [size, size],
+    iconAnchor: [size / 2, size / 2],
+  });
+}
+
+// Clustered markers for the visible area while the map is zoomed out.
+// Reports through onClusteredChange whether it is drawing the viewport, so
+// the caller can hide its own per-place markers meanwhile.
+export default function PlaceMarkers({ places = [], onClusteredChange }) {
+  const map = useMap();
+  const [viewport, setViewport] = useState(null);
+  const timer = useRef(null);
+  const latestRequest = useRef(0);
+
+  const loadViewport = useCallback(async () => {
+    const request = ++latestRequest.current;
+    const zoom = map.getZoom();
+    if (zoom > CLUSTER_MAX_ZOOM) {
+      setViewport(null);
+      return;
+    }
+    try {
+      const data = await getPlacesInBounds(map.getBounds(), zoom);
+      // A later pan or zoom already asked for another viewport
+      if (request === latestRequest.current) setViewport(data.clustered ? data : null);
+    } catch (error) {
+      console.error("Failed to load map clusters:", error);
+    }
+  }, [map]);
+
+  const scheduleLoad = useCallback(() => {
+    clearTimeout(timer.current);
+    timer.current = setTimeout(loadViewport, VIEWPORT_DEBOUNCE_MS);
+  }, [loadViewport]);
 
-  // Get stop order for numbering
-  const getStopNumber = (placeSlug) => {
-    if (!roadmap) return null;
-    const stop = roadmap.stops.find((s) => s.placeSlug === placeSlug);
-    return stop ? stop.order : null;
-  };
+  useMapEvents({ moveend: scheduleLoad, zoomend: scheduleLoad });
 
-  // Check if place is sponsored
-  const isSponsored = (placeSlug) => {
-    if (!roadmap) return false;
-    return roadmap.sponsoredStops.some((s) => s.placeSlug === placeSlug);
-  };
+  useEffect(() => {
+    loadViewport();
+    return () => {
+      clearTimeout(timer.current);
+      // Ignore answers arriving after unmount
+      latestRequest.current += 1;
+    };
+  }, [loadViewport]);
+
+  const clustered = viewport !== null;
+  useEffect(() => {
+    if (onClusteredChange) onClusteredChange(clustered);
+  }, [clustered, onClusteredChange]);
+
+  useEffect(() => () => {
+    if (onClusteredChange) onClusteredChange(false);
+  }, [onClusteredChange]);
+
+  if (!viewport) return null;
 
   return (
     <>
-      {places.map((place) => {
-        const stopNumber = getStopNumber(place.slug);
-        const sponsored = isSponsored(place.slug);
-        const icon = icons[place.category] || icons.default;
+      {viewport.clusters.map((cluster) => (
+        <Marker
+          key={`cluster-${cluster.lat}-${cluster.lon}`}
+          position={[cluster.lat, cluster.lon]}
+          icon={createClusterIcon(cluster.count)}
+          eventHandlers={{
+            click: () => map.flyTo([cluster.lat, cluster.lon], Math.min(map.getZoom() + 2, map.getMaxZoom())),
+          }}
+        />
+      ))}
+      {viewport.places.map((mapPlace) => {
+        const place = places.find((p) => p._id === mapPlace.place_id);
+        const icon = icons[mapPlace.category] || icons.default;
 
         return (
           <Marker
-            key={place._id}
-            position={[place.coordinates.lat, place.coordinates.lng]}
+            key={mapPlace.id}
+            position={[mapPlace.lat, mapPlace.lon]}
             icon={icon}
           >
             <Popup>
               <div className="place-popup">
-                {stopNumber && (
-                  <span className="stop-number">Stop {stopNumber}</span>
-                )}
-                {sponsored && <span className="sponsored-badge">⭐ Sponsored</span>}
-                <h3>{place.name}</h3>
-                <p>{place.description}</p>
-                {place.openingHours && (
+                <h3>{place ? place.name : mapPlace.name || "Place"}</h3>
+                {place && <p>{place.description}</p>}
+                {place && place.openingHours && (
                   <p className="hours">🕐 {place.openingHours}</p>
                 )}
-                {place.hasWorkshop && (
+                {place && place.hasWorkshop && (
                   <p className="workshop-badge">🎨 Workshop Available</p>
                 )}
               </div>
@@ -83,4 +143,4 @@ export default function PlaceMarkers({ places, roadmap }) {
       })}
     </>
   );
-}
\ No newline at end of file
+}
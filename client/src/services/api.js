@@ -97,6 +97,39 @@ export async function basicSearch(query, topK = 10) {
   return response.json();
 }
 
+// Leaflet keeps counting longitudes past ±180 after panning across the
+// antimeridian; the API only accepts [-180, 180] (west > east crosses it)
+function wrapLongitude(lng) {
+  return ((lng + 180) % 360 + 360) % 360 - 180;
+}
+
+function clampLatitude(lat) {
+  return Math.max(-90, Math.min(90, lat));
+}
+
+// Map markers for the visible area: clusters at low zoom, places when zoomed in
+export async function getPlacesInBounds(bounds, zoom, includeDetails = false) {
+  const span = bounds.getEast() - bounds.getWest();
+  let west = -180;
+  let east = 180;
+  if (span < 360) {
+    west = wrapLongitude(bounds.getWest());
+    east = west + span;
+    if (east > 180) east -= 360;
+  }
+  const params = new URLSearchParams({
+    south: clampLatitude(bounds.getSouth()),
+    west: west,
+    north: clampLatitude(bounds.getNorth()),
+    east: east,
+    zoom: Math.round(zoom),
+    include_details: includeDetails
+  });
+  const response = await fetch(`${SEARCH_API_BASE}/places/in-bounds?${params}`);
+  if (!response.ok) throw new Error("Failed to load map places");
+  return response.json();
+}
+
 // Search health check
 export async function checkSearchHealth() {
   try {
@@ -0,0 +1,447 @@
+"""
+Versioned Artifact Bundles
+One directory per build holding every collection's FAISS index, array-backed
+metadata and neighbor graph, plus a manifest tying them to the encoder model,
+embedding dimension and corpus version.
+
+Layout:
+    bundles/
+        CURRENT                      name of the published bundle
+        20260101-120000-3fa9c2d1/
+            manifest.json
+            places.faiss
+            places.meta.npy          structured array, one row per FAISS id
+            places.neighbors.idx.npy
+            places.neighbors.scores.npy
+            places.projection.npz    optional PCA projection (--project-dim)
+            craftsmen.faiss
+            ...
+
+Bundles are written to a temporary directory and renamed into place, then
+CURRENT is swapped with os.replace, so readers never see a partial build.
+After the swap, all but the newest keep_bundles bundles are deleted; the
+previous one is always kept so a running server can still reload or roll back.
+Checksums are computed and checked when a bundle is built; loading only
+verifies them on request, so startup does not hash every artifact.
+"""
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from projection import PCAProjection
+
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+
+# Published bundles kept on disk, including the current one
+DEFAULT_KEEP_BUNDLES = 3
+
+
+class BundleMismatchError(ValueError):
+    """Raised when a bundle does not match the running encoder or is corrupt."""
+
+
+# ============== Array-backed metadata ==============
+
+def metadata_to_array(metadata_map: Dict[Any, Dict[str, Any]]) -> np.ndarray:
+    """
+    Converts {faiss_id: {field: value}} into a structured array indexed by FAISS id.
+
+    Numeric fields become float64 (None -> NaN); everything else becomes a
+    fixed-width unicode column (None -> "").
+    """
+    rows = [metadata_map[key] for key in sorted(metadata_map, key=int)]
+    fields: List[str] = []
+    for row in rows:
+        for field in row:
+            if field not in fields:
+                fields.append(field)
+
+    dtype = []
+    for field in fields:
+        values = [row.get(field) for row in rows]
+        if all(value is None or (isinstance(value, (int, float)) and not isinstance(value, bool))
+               for value in values):
+            dtype.append((field, 'f8'))
+        else:
+            width = max([len(str(value)) for value in values if value is not None] + [1])
+            dtype.append((field, f'U{width}'))
+
+    array = np.zeros(len(rows), dtype=dtype)
+    for field, kind in dtype:
+        if kind == 'f8':
+            array[field] = [math.nan if row.get(field) is None else row[field] for row in rows]
+        else:
+            array[field] = ["" if row.get(field) is None else str(row[field]) for row in rows]
+    return array
+
+
+class ArrayMetadata(Mapping):
+    """
+    Read-only view over a structured metadata array with the same interface as
+    the JSON metadata dict ({"0": {...}, "1": {...}}), built lazily per row.
+    """
+
+    def __init__(self, array: np.ndarray):
+        self.array = array
+        self._float_fields = {name for name in array.dtype.names
+                              if array.dtype[name].kind == 'f'}
+
+    def column(self, field: str) -> Optional[np.ndarray]:
+        """Returns a whole column (zero-copy), or None if the field does not exist."""
+        if field not in self.array.dtype.names:
+            return None
+        return self.array[field]
+
+    def _row(self, idx: int) -> Dict[str, Any]:
+        record = self.array[idx]
+        row = {}
+        for name in self.array.dtype.names:
+            value = record[name]
+            if name in self._float_fields:
+                row[name] = None if math.isnan(value) else float(value)
+            else:
+                row[name] = str(value) or None
+        return row
+
+    def __getitem__(self, key) -> Dict[str, Any]:
+        idx = int(key)
+        if idx < 0 or idx >= len(self.array):
+            raise KeyError(key)
+        return self._row(idx)
+
+    def __contains__(self, key) -> bool:
+        try:
+            idx = int(key)
+        except (TypeError, ValueError):
+            return False
+        return 0 <= idx < len(self.array)
+
+    def __iter__(self) -> Iterator[str]:
+        return (str(idx) for idx in range(len(self.array)))
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+
+# ============== Writing ==============
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fsync_dir(path: str):
+    """Flushes a directory entry (no-op where directories cannot be opened)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class BundleWriter:
+    """Collects collection artifacts into a staging directory and publishes them."""
+
+    def __init__(self, bundles_dir: str, model_name: str, dimension: int,
+                 shard: Optional[Dict[str, int]] = None,
+                 keep_bundles: int = DEFAULT_KEEP_BUNDLES):
+        """
+        Args:
+            bundles_dir: Directory the bundle is published into
+            model_name: Encoder the vectors were produced with
+            dimension: Embedding dimension
+            shard: {"index": i, "count": n} when this bundle holds one shard
+            keep_bundles: Published bundles kept after publish() (at least 2:
+                the new one and the one it replaces)
+        """
+        self.bundles_dir = bundles_dir
+        self.model_name = model_name
+        self.dimension = dimension
+        self.shard = shard
+        self.keep_bundles = max(keep_bundles, 2)
+        self.built_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        self.collections: Dict[str, Dict[str, Any]] = {}
+
+        os.makedirs(bundles_dir, exist_ok=True)
+        self.staging_dir = os.path.join(
+            bundles_dir, f".staging-{os.getpid()}-{int(time.time() * 1000)}"
+        )
+        os.makedirs(self.staging_dir)
+
+    def _write(self, file_name: str, writer) -> str:
+        path = os.path.join(self.staging_dir, file_name)
+        writer(path)
+        with open(path, 'rb+') as f:
+            os.fsync(f.fileno())
+        return file_name
+
+    def add_collection(self, name: str, index, metadata_map: Dict[Any, Dict[str, Any]],
+                       neighbor_indices: Optional[np.ndarray] = None,
+                       neighbor_scores: Optional[np.ndarray] = None,
+                       projection: Optional[PCAProjection] = None,
+                       projection_stats: Optional[Dict[str, Any]] = None):
+        """
+        Writes one collection's index, metadata and optional neighbor graph.
+        With a projection, index holds projected vectors and the projection
+        (plus its build-time measurements) is stored for query time.
+        """
+        files = [
+            self._write(f"{name}.faiss", lambda path: faiss.write_index(index, path)),
+            self._write(f"{name}.meta.npy",
+                        lambda path: np.save(path, metadata_to_array(metadata_map))),
+        ]
+        if neighbor_indices is not None:
+            files.append(self._write(f"{name}.neighbors.idx.npy",
+                                     lambda path: np.save(path, neighbor_indices)))
+            files.append(self._write(f"{name}.neighbors.scores.npy",
+                                     lambda path: np.save(path, neighbor_scores)))
+        if projection is not None:
+            files.append(self._write(f"{name}.projection.npz", projection.save))
+
+        self.collections[name] = {
+            "count": int(index.ntotal),
+            "files": {file_name: _sha256(os.path.join(self.staging_dir, file_name))
+                      for file_name in files}
+        }
+        if projection is not None:
+            self.collections[name]["projection"] = {
+                "dim": projection.output_dim,
+                "explained_variance": projection.explained_variance,
+                **(projection_stats or {})
+            }
+
+    def carry_over(self, source_dir: str, manifest: Dict[str, Any], name: str):
+        """
+        Copies an unchanged collection from a previous bundle (hard link when
+        possible), checking the files against their recorded checksums.
+
+        Raises:
+            BundleMismatchError: If a carried-over file fails its checksum.
+        """
+        entry = manifest["collections"][name]
+        targets = []
+        for file_name, expected in entry["files"].items():
+            source = os.path.join(source_dir, file_name)
+            target = os.path.join(self.staging_dir, file_name)
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+            targets.append(target)
+            if _sha256(target) != expected:
+                for path in targets:
+                    os.remove(path)
+                raise BundleMismatchError(f"Checksum mismatch for {file_name} in {source_dir}")
+        self.collections[name] = entry
+
+    def publish(self) -> str:
+        """
+        Writes the manifest, moves the bundle into place, points CURRENT at it
+        and deletes bundles older than the last keep_bundles.
+
+        Returns:
+            Path of the published bundle directory.
+        """
+        corpus_digest = hashlib.sha256(json.dumps(
+            {name: entry["files"] for name, entry in sorted(self.collections.items())},
+            sort_keys=True
+        ).encode()).hexdigest()
+        version = time.strftime('%Y%m%d-%H%M%S', time.gmtime()) + "-" + corpus_digest[:8]
+        suffix = 1
+        while os.path.exists(os.path.join(self.bundles_dir, version)):
+            # Identical rebuild within the same second
+            suffix += 1
+            version = f"{version.split('.')[0]}.{suffix}"
+
+        manifest = {
+            "format_version": BUNDLE_FORMAT_VERSION,
+            "version": version,
+            "built_at": self.built_at,
+            "model_name": self.model_name,
+            "dimension": self.dimension,
+            "metric": "inner_product",
+            "collections": self.collections
+        }
+        if self.shard is not None:
+            manifest["shard"] = self.shard
+        self._write(MANIFEST_FILE, lambda path: _write_json(path, manifest))
+        _fsync_dir(self.staging_dir)
+
+        bundle_dir = os.path.join(self.bundles_dir, version)
+        os.replace(self.staging_dir, bundle_dir)
+
+        current_tmp = os.path.join(self.bundles_dir, CURRENT_FILE + ".tmp")
+        with open(current_tmp, 'w', encoding='utf-8') as f:
+            f.write(version + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(current_tmp, os.path.join(self.bundles_dir, CURRENT_FILE))
+        _fsync_dir(self.bundles_dir)
+
+        prune_bundles(self.bundles_dir, self.keep_bundles)
+        return bundle_dir
+
+    def abort(self):
+        """Discards the staging directory."""
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+
+def list_bundles(bundles_dir: str) -> List[str]:
+    """Names of the published bundles in bundles_dir, oldest first."""
+    published = {}
+    for name in os.listdir(bundles_dir):
+        manifest_path = os.path.join(bundles_dir, name, MANIFEST_FILE)
+        if not name.startswith(".") and os.path.isfile(manifest_path):
+            # Versions only have second resolution; the manifest is written at publish time
+            published[name] = os.stat(manifest_path).st_mtime_ns
+    return sorted(published, key=lambda name: (published[name], name))
+
+
+def prune_bundles(bundles_dir: str, keep: int) -> List[str]:
+    """
+    Deletes all but the newest `keep` published bundles. The bundle CURRENT
+    points to is never deleted, and staging directories are left alone.
+
+    Returns:
+        Names of the deleted bundles.
+    """
+    current_dir = resolve_current_bundle(bundles_dir)
+    current = os.path.basename(current_dir) if current_dir else None
+    names = list_bundles(bundles_dir)
+    removed = []
+    for name in names[:max(len(names) - keep, 0)]:
+        if name == current:
+            continue
+        shutil.rmtree(os.path.join(bundles_dir, name), ignore_errors=True)
+        removed.append(name)
+    return removed
+
+
+def _write_json(path: str, data: Dict[str, Any]):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+# ============== Reading ==============
+
+def resolve_current_bundle(bundles_dir: str) -> Optional[str]:
+    """Returns the directory CURRENT points to, or None if nothing is published."""
+    current_path = os.path.join(bundles_dir, CURRENT_FILE)
+    if not os.path.exists(current_path):
+        return None
+    with open(current_path, 'r', encoding='utf-8') as f:
+        version = f.read().strip()
+    bundle_dir = os.path.join(bundles_dir, version)
+    return bundle_dir if version and os.path.isdir(bundle_dir) else None
+
+
+def read_manifest(bundle_dir: str) -> Dict[str, Any]:
+    """Loads and sanity-checks a bundle manifest."""
+    manifest_path = os.path.join(bundle_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise BundleMismatchError(f"No manifest in bundle {bundle_dir}")
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != BUNDLE_FORMAT_VERSION:
+        raise BundleMismatchError(
+            f"Bundle format {manifest.get('format_version')} is not supported "
+            f"(expected {BUNDLE_FORMAT_VERSION})"
+        )
+    return manifest
+
+
+def check_compatible(manifest: Dict[str, Any], model_name: str, dimension: int):
+    """Raises BundleMismatchError unless the bundle was built with this encoder."""
+    if manifest["model_name"] != model_name:
+        raise BundleMismatchError(
+            f"Bundle {manifest['version']} was built with model '{manifest['model_name']}', "
+            f"service is running '{model_name}'"
+        )
+    if manifest["dimension"] != dimension:
+        raise BundleMismatchError(
+            f"Bundle {manifest['version']} has dimension {manifest['dimension']}, "
+            f"encoder produces {dimension}"
+        )
+
+
+def load_collection(bundle_dir: str, manifest: Dict[str, Any], name: str,
+                    verify_checksums: bool = False
+                    ) -> Tuple[Any, ArrayMetadata, Optional[Tuple[np.ndarray, np.ndarray]]]:
+    """
+    Loads one collection from a bundle.
+
+    The metadata and neighbor arrays are memory-mapped. The FAISS index is
+    read into memory: faiss-cpu 1.8 cannot memory-map flat indexes, so its
+    vectors are copied on load either way.
+
+    Args:
+        bundle_dir: Bundle directory
+        manifest: The bundle's manifest
+        name: Collection to load
+        verify_checksums: Hash every file and compare it with the manifest
+            (reads each artifact in full; off for regular startups)
+
+    Returns:
+        (faiss index, ArrayMetadata, (neighbor_indices, neighbor_scores) or None)
+    """
+    entry = manifest["collections"][name]
+    if verify_checksums:
+        for file_name, expected in entry["files"].items():
+            if _sha256(os.path.join(bundle_dir, file_name)) != expected:
+                raise BundleMismatchError(f"Checksum mismatch for {file_name} in {bundle_dir}")
+
+    index = faiss.read_index(os.path.join(bundle_dir, f"{name}.faiss"))
+    # Projected collections store fewer dimensions than the encoder produces
+    dimension = entry.get("projection", {}).get("dim", manifest["dimension"])
+    if index.ntotal != entry["count"] or index.d != dimension:
+        raise BundleMismatchError(
+            f"{name}.faiss holds {index.ntotal}x{index.d} vectors, manifest says "
+            f"{entry['count']}x{dimension}"
+        )
+
+    metadata = ArrayMetadata(np.load(os.path.join(bundle_dir, f"{name}.meta.npy"), mmap_mode='r'))
+
+    neighbors = None
+    if f"{name}.neighbors.idx.npy" in entry["files"]:
+        neighbors = (
+            np.load(os.path.join(bundle_dir, f"{name}.neighbors.idx.npy"), mmap_mode='r'),
+            np.load(os.path.join(bundle_dir, f"{name}.neighbors.scores.npy"), mmap_mode='r'),
+        )
+    return index, metadata, neighbors
+
+
+def load_projection(bundle_dir: str, manifest: Dict[str, Any], name: str) -> Optional[PCAProjection]:
+    """
+    Loads a collection's query projection, or None if it stores full-width vectors.
+
+    Raises:
+        BundleMismatchError: If the projection does not fit the encoder dimension.
+    """
+    entry = manifest["collections"][name]
+    if "projection" not in entry:
+        return None
+    projection = PCAProjection.load(os.path.join(bundle_dir, f"{name}.projection.npz"))
+    if projection.input_dim != manifest["dimension"] or projection.output_dim != entry["projection"]["dim"]:
+        raise BundleMismatchError(
+            f"{name}.projection.npz maps {projection.input_dim} -> {projection.output_dim} "
+            f"dimensions, manifest says {manifest['dimension']} -> {entry['projection']['dim']}"
+        )
+    return projection
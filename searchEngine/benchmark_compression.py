@@ -0,0 +1,134 @@
+"""
+Measure the CPU cost of response compression against the bytes it saves.
+
+Usage:
+    python benchmark_compression.py                     # payloads built from data/Data.json
+    python benchmark_compression.py --url http://127.0.0.1:8000 --query "temple"
+    python benchmark_compression.py --top-k 10,50 --json compression.json
+
+Local payloads mimic /search/detailed responses (full_details with gallery,
+videos and descriptions) built from the places export; --url fetches real
+ones from a running instance instead. Each gzip level and brotli quality is
+timed over the same bodies with the same code the middleware uses.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from itertools import cycle, islice
+from typing import Any, Dict, List
+
+from compression import BROTLI_AVAILABLE, compress
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EXPORT_FILE = os.path.join(BASE_DIR, 'data', 'Data.json')
+
+
+def _plain(value: Any) -> Any:
+    """Flattens Mongo extended JSON ({"$oid": ...}, {"$date": ...}) like the API does."""
+    if isinstance(value, dict):
+        if len(value) == 1 and next(iter(value)) in ("$oid", "$date"):
+            return next(iter(value.values()))
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
+
+
+def local_payloads(top_ks: List[int]) -> Dict[str, bytes]:
+    """Builds /search/detailed-shaped response bodies from the places export."""
+    with open(EXPORT_FILE, 'r', encoding='utf-8') as f:
+        places = [_plain(place) for place in json.load(f)]
+
+    payloads = {}
+    for top_k in top_ks:
+        results = []
+        for rank, place in enumerate(islice(cycle(places), top_k)):
+            coordinates = place.get("coordinates") or {}
+            results.append({
+                "collection": "places",
+                "id": place["_id"],
+                "place_id": place["_id"],
+                "score": round(0.9 - rank * 0.01, 6),
+                "category": place.get("category"),
+                "lat": coordinates.get("lat"),
+                "lon": coordinates.get("lng"),
+                "name": None,
+                "description": None,
+                "full_details": place
+            })
+        payloads[f"detailed top_k={top_k}"] = json.dumps(results).encode("utf-8")
+    return payloads
+
+
+def remote_payloads(url: str, query: str, top_ks: List[int]) -> Dict[str, bytes]:
+    """Fetches real /search and /search/detailed bodies (uncompressed) from an instance."""
+    import httpx
+
+    payloads = {}
+    with httpx.Client(base_url=url, timeout=30.0, headers={"Accept-Encoding": "identity"}) as client:
+        for endpoint in ("/search", "/search/detailed"):
+            for top_k in top_ks:
+                response = client.post(endpoint, json={"query": query, "top_k": top_k})
+                response.raise_for_status()
+                payloads[f"{endpoint} top_k={top_k}"] = response.content
+    return payloads
+
+
+def measure(body: bytes, encoding: str, level: int, repeats: int) -> Dict[str, Any]:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        compressed = compress(body, encoding, gzip_level=level, brotli_quality=level)
+        timings.append(time.perf_counter() - started)
+    seconds = statistics.median(timings)
+    return {
+        "encoding": encoding,
+        "level": level,
+        "bytes": len(compressed),
+        "saved_pct": round(100 * (1 - len(compressed) / len(body)), 1),
+        "cpu_ms": round(seconds * 1000, 3),
+        "mb_per_s": round(len(body) / seconds / 1e6, 1) if seconds else 0.0
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compression cost vs. bytes saved.")
+    parser.add_argument("--url", help="Fetch payloads from a running instance")
+    parser.add_argument("--query", default="historic temple", help="Query used with --url")
+    parser.add_argument("--top-k", default="10,50",
+                        type=lambda text: [int(value) for value in text.split(",")],
+                        help="Result counts to measure, e.g. 10,50")
+    parser.add_argument("--repeats", type=int, default=50, help="Timed runs per setting")
+    parser.add_argument("--json", dest="json_out", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    payloads = remote_payloads(args.url, args.query, args.top_k) if args.url \
+        else local_payloads(args.top_k)
+
+    settings = [("gzip", level) for level in (1, 4, 6, 9)]
+    if BROTLI_AVAILABLE:
+        settings += [("br", quality) for quality in (1, 4, 6, 11)]
+    else:
+        print("⚠️  brotli is not installed; measuring gzip only (pip install brotli)")
+
+    report = {}
+    for name, body in payloads.items():
+        print(f"\n📦 {name}: {len(body)} bytes uncompressed")
+        print(f"   {'coding':<6} {'level':>5} {'bytes':>9} {'saved':>7} {'cpu ms':>8} {'MB/s':>7}")
+        rows = [measure(body, encoding, level, args.repeats) for encoding, level in settings]
+        for row in rows:
+            print(f"   {row['encoding']:<6} {row['level']:>5} {row['bytes']:>9} "
+                  f"{row['saved_pct']:>6}% {row['cpu_ms']:>8} {row['mb_per_s']:>7}")
+        report[name] = {"bytes": len(body), "results": rows}
+
+    if not report:
+        print("❌ No payloads to measure.")
+        sys.exit(1)
+
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n   Results written to {args.json_out}")
@@ -0,0 +1,109 @@
+"""
+Measure what PCA-projecting the embeddings costs in recall and saves in memory
+and search time, before choosing sync_embeddings.py --project-dim.
+
+Usage:
+    python benchmark_projection.py                       # places, dims 256,192,128,96,64,32
+    python benchmark_projection.py --collection events --dims 128,64
+    python benchmark_projection.py --json projection.json
+
+Reads the full-width index of the current bundle (or the legacy places.faiss)
+and, for every dimension, fits a projection, builds the projected index and
+compares its top-10 with the full-width one. Recall is measured on the query
+embedding store when it holds enough real queries, else on corpus vectors.
+"""
+import argparse
+import json
+import os
+import sys
+from typing import List
+
+import faiss
+from dotenv import load_dotenv
+
+from artifact_bundle import load_collection, read_manifest, resolve_current_bundle
+from embedding_store import QueryEmbeddingStore
+from projection import (RECALL_K, evaluate_projection, fit_projection, project_index,
+                        recall_queries)
+
+# Load environment variables
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+BUNDLES_DIR = os.getenv("SEARCH_BUNDLES_DIR", os.path.join(DATA_DIR, 'bundles'))
+QUERY_EMBEDDING_STORE_DIR = os.getenv(
+    "QUERY_EMBEDDING_STORE_DIR", os.path.join(DATA_DIR, 'query_embeddings')
+)
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+
+def _int_list(text: str) -> List[int]:
+    return [int(value) for value in text.split(",") if value.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall vs. memory/latency of projected embeddings.")
+    parser.add_argument("--collection", default="places")
+    parser.add_argument("--dims", type=_int_list, default=[256, 192, 128, 96, 64, 32],
+                        help="Projection dimensions to try, e.g. 128,64")
+    parser.add_argument("--queries", type=int, default=1000, help="Queries recall is measured on")
+    parser.add_argument("--json", dest="json_out", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    bundle_dir = resolve_current_bundle(BUNDLES_DIR)
+    if bundle_dir:
+        manifest = read_manifest(bundle_dir)
+        if "projection" in manifest["collections"].get(args.collection, {}):
+            print(f"❌ {args.collection} in {bundle_dir} is already projected; "
+                  "rebuild it at full width first.")
+            sys.exit(1)
+        index, _, _ = load_collection(bundle_dir, manifest, args.collection)
+    elif args.collection == "places":
+        index = faiss.read_index(os.path.join(DATA_DIR, 'places.faiss'))
+    else:
+        print(f"❌ No bundle found in {BUNDLES_DIR}")
+        sys.exit(1)
+    if index.metric_type != faiss.METRIC_INNER_PRODUCT:
+        # Legacy L2 artifacts: normalize like SearchService does
+        vectors = index.reconstruct_n(0, index.ntotal)
+        faiss.normalize_L2(vectors)
+        index = faiss.IndexFlatIP(index.d)
+        index.add(vectors)
+
+    stored = None
+    if QUERY_EMBEDDING_STORE_DIR and os.path.isdir(QUERY_EMBEDDING_STORE_DIR):
+        stored = QueryEmbeddingStore(QUERY_EMBEDDING_STORE_DIR, MODEL_NAME, index.d).vectors()
+    queries, query_ids, source = recall_queries(index, stored, limit=args.queries)
+
+    full_mb = index.ntotal * index.d * 4 / 1e6
+    print(f"\n📐 {args.collection}: {index.ntotal} vectors x {index.d} dims ({full_mb:.1f} MB), "
+          f"recall@{RECALL_K} on {len(queries)} {source}")
+    print(f"   {'dims':>5} {'variance':>9} {'recall':>7} {'MB':>8} {'ms/query':>9} {'full ms':>8}")
+
+    rows = []
+    for dim in args.dims:
+        if not 0 < dim < index.d:
+            print(f"   {dim:>5} skipped (must be below {index.d})")
+            continue
+        projection = fit_projection([index], dim)
+        projected = project_index(index, projection)
+        measured = evaluate_projection(index, projected, projection, queries, query_ids=query_ids)
+        row = {
+            "dims": dim,
+            "explained_variance": round(projection.explained_variance, 4),
+            "recall": round(measured["recall"], 4),
+            "index_mb": round(projected.ntotal * dim * 4 / 1e6, 2),
+            "ms_per_query": round(measured["projected_ms"], 4),
+            "full_ms_per_query": round(measured["full_ms"], 4)
+        }
+        rows.append(row)
+        print(f"   {dim:>5} {row['explained_variance']:>9.1%} {row['recall']:>7.3f} "
+              f"{row['index_mb']:>8.1f} {row['ms_per_query']:>9.4f} {row['full_ms_per_query']:>8.4f}")
+
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump({"collection": args.collection, "vectors": index.ntotal,
+                       "full_dims": index.d, "full_mb": round(full_mb, 2),
+                       "recall_queries": f"{len(queries)} {source}", "results": rows}, f, indent=2)
+        print(f"\n   Results written to {args.json_out}")
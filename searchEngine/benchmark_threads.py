@@ -0,0 +1,163 @@
+"""
+Sweep thread budgets on this host and report search throughput/latency for each.
+
+Usage:
+    python benchmark_threads.py                          # default sweep, built-in queries
+    python benchmark_threads.py --queries traffic.log --concurrency 16 --requests 500
+    python benchmark_threads.py --workers 1,2,4 --threads 1,2,4 --json sweep.json
+    python benchmark_threads.py --workers 2,4 --encoder-threads 1,2,4 --faiss-threads 1,2
+
+Searches run in-process against the local artifacts (no MongoDB, no query
+embedding store), so every request pays for a real encode and FAISS search.
+Workers, encoder threads and FAISS threads are swept independently; set
+SEARCH_INFERENCE_WORKERS / SEARCH_ENCODER_THREADS / SEARCH_FAISS_THREADS from
+the best row. Thread counts are per concurrent call (the encoder setting is
+process-wide, so each worker's encode gets that many); "total" is what all
+workers use together at full load.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+
+from artifact_bundle import resolve_current_bundle
+from precompute_query_embeddings import read_queries
+from replay_traffic import percentile
+from search_service import SearchService
+from thread_budget import ThreadBudget, available_cpus
+
+# Load environment variables
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+BUNDLES_DIR = os.getenv("SEARCH_BUNDLES_DIR", os.path.join(DATA_DIR, 'bundles'))
+
+SAMPLE_QUERIES = [
+    "historic temple", "pottery workshop", "quiet place to meditate",
+    "traditional newari food", "woodcarving", "stupa with mountain view",
+    "metal craft", "festival in the old town", "thangka painting", "tea shop"
+]
+
+
+def _powers_of_two(limit: int) -> List[int]:
+    values, value = [], 1
+    while value <= limit:
+        values.append(value)
+        value *= 2
+    return values
+
+
+def _int_list(text: str) -> List[int]:
+    return [int(value) for value in text.split(",") if value.strip()]
+
+
+def run_trial(service: SearchService, queries: List[str], concurrency: int,
+              top_k: int) -> Dict[str, Any]:
+    """Sends every query through service.search from `concurrency` client threads."""
+    latencies: List[float] = []
+
+    def one(query: str):
+        started = time.perf_counter()
+        service.search(query, top_k=top_k)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        list(clients.map(one, queries))
+    wall_s = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "throughput_qps": round(len(queries) / wall_s, 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2)
+    }
+
+
+if __name__ == "__main__":
+    cpus = available_cpus()
+    parser = argparse.ArgumentParser(description="Find the best thread budget for this host.")
+    parser.add_argument("--queries", nargs="*", help="Query logs (JSON lines or plain text)")
+    parser.add_argument("--requests", type=int, default=200, help="Searches per setting")
+    parser.add_argument("--concurrency", type=int, default=max(4, cpus), help="Client threads")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--workers", type=_int_list, default=_powers_of_two(cpus),
+                        help="Inference worker counts to try, e.g. 1,2,4")
+    parser.add_argument("--threads", type=_int_list, default=_powers_of_two(cpus),
+                        help="Per-call thread counts to try for both encoder and FAISS, e.g. 1,2,4")
+    parser.add_argument("--encoder-threads", type=_int_list,
+                        help="Per-call encoder thread counts to try (default: --threads)")
+    parser.add_argument("--faiss-threads", type=_int_list,
+                        help="Per-call FAISS thread counts to try (default: --threads)")
+    parser.add_argument("--max-oversubscription", type=float, default=2.0,
+                        help="Skip settings whose total threads exceed this many per core")
+    parser.add_argument("--json", dest="json_out", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    queries = list(read_queries(args.queries)) if args.queries else SAMPLE_QUERIES
+    if not queries:
+        print("❌ No queries found.")
+        sys.exit(1)
+    queries = list(islice(cycle(queries), args.requests))
+
+    settings = [budget for budget in (
+                    ThreadBudget(workers, encoder_threads, faiss_threads)
+                    for workers in args.workers
+                    for encoder_threads in args.encoder_threads or args.threads
+                    for faiss_threads in args.faiss_threads or args.threads)
+                if budget.total_threads <= cpus * args.max_oversubscription]
+    if not settings:
+        print(f"❌ No setting fits {cpus} CPUs x {args.max_oversubscription} oversubscription; "
+              "try smaller --workers/--threads or a higher --max-oversubscription.")
+        sys.exit(1)
+
+    bundle_dir = resolve_current_bundle(BUNDLES_DIR)
+    service = SearchService(
+        os.path.join(DATA_DIR, 'places.faiss'),
+        os.path.join(DATA_DIR, 'metadata.json'),
+        use_mongodb=False,
+        bundle_dir=bundle_dir,
+        thread_budget=settings[0]
+    )
+
+    print(f"\n▶️  {len(settings)} settings x {args.requests} searches, "
+          f"{args.concurrency} clients, {cpus} CPUs")
+    results = []
+    try:
+        for budget in settings:
+            service.configure_threads(budget)
+            workers = budget.inference_workers
+            # Warm-up so one-off allocations are not measured
+            run_trial(service, queries[:min(len(queries), workers * 2)], workers, args.top_k)
+            trial = run_trial(service, queries, args.concurrency, args.top_k)
+            trial.update({"inference_workers": workers,
+                          "encoder_threads": budget.encoder_threads,
+                          "faiss_threads": budget.faiss_threads,
+                          "total_threads": budget.total_threads})
+            results.append(trial)
+            print(f"   workers {workers:<3} encoder {budget.encoder_threads:<3}/call "
+                  f"faiss {budget.faiss_threads:<3}/call total {budget.total_threads:<4} "
+                  f"{trial['throughput_qps']:>8} q/s   p50 {trial['p50_ms']} ms   "
+                  f"p99 {trial['p99_ms']} ms")
+    finally:
+        service.close()
+
+    best = max(results, key=lambda trial: trial["throughput_qps"])
+    print("\n" + "=" * 60)
+    print(f"🏆 Best: SEARCH_INFERENCE_WORKERS={best['inference_workers']} "
+          f"SEARCH_ENCODER_THREADS={best['encoder_threads']} "
+          f"SEARCH_FAISS_THREADS={best['faiss_threads']}")
+    print(f"   {best['throughput_qps']} q/s, p99 {best['p99_ms']} ms")
+    print("=" * 60)
+
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump({"cpus": cpus, "concurrency": args.concurrency, "results": results}, f, indent=2)
+        print(f"   Results written to {args.json_out}")
@@ -0,0 +1,183 @@
+"""
+Response Compression
+ASGI middleware that compresses responses with brotli or gzip, negotiated from
+the client's Accept-Encoding header. Small bodies, already-encoded responses
+and non-text content types are passed through unchanged. Large bodies are
+compressed in a worker thread so the event loop keeps serving other requests.
+
+Brotli is optional: without the `brotli` package only gzip is offered.
+"""
+import functools
+import gzip
+from typing import Dict, List, Optional, Tuple
+
+import anyio
+
+# Brotli (optional - gzip is used when it is not installed)
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    """Compresses a body with the given content-coding ("br" or "gzip")."""
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def supported_encodings() -> List[str]:
+    """Content-codings this server can produce, most preferred first."""
+    return ["br", "gzip"] if BROTLI_AVAILABLE else ["gzip"]
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Picks a content-coding from an Accept-Encoding header.
+
+    The highest q-value wins; ties go to the server's preference (br, then
+    gzip). Returns None when nothing acceptable is supported.
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        parts = [part.strip() for part in item.split(";")]
+        coding = parts[0].lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in supported_encodings():
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressionMiddleware:
+    """Compresses JSON/text responses of at least minimum_size bytes."""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6,
+                 brotli_quality: int = 4, thread_threshold: int = 64 * 1024):
+        """
+        Args:
+            app: ASGI application to wrap
+            minimum_size: Bodies smaller than this are sent uncompressed
+            gzip_level: zlib compression level (1-9)
+            brotli_quality: Brotli quality (0-11)
+            thread_threshold: Bodies at least this large are compressed in a
+                worker thread instead of on the event loop
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.thread_threshold = thread_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        encoding = negotiate_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+
+        start_message = None
+        passthrough = False
+        chunks: List[bytes] = []
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                negotiable = self._is_negotiable(message)
+                passthrough = (not negotiable or encoding is None
+                               or self._is_small(message))
+                if passthrough:
+                    if negotiable:
+                        # The same URL is compressed for other clients: caches
+                        # must key this response on Accept-Encoding too
+                        message = {**message, "headers": _add_vary(message.get("headers", []))}
+                    await send(message)
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            # Buffer the (possibly chunked) body, then compress it in one go
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                await self._send_body(start_message, b"".join(chunks), encoding, send)
+
+        await self.app(scope, receive, send_compressed)
+
+    def _is_negotiable(self, start_message) -> bool:
+        """
+        Whether the response's representation depends on Accept-Encoding:
+        compressible content that is not already encoded, and 304s
+        revalidating such content.
+        """
+        if start_message["status"] == 304:
+            return True
+        names = {name.lower(): value for name, value in start_message.get("headers", [])}
+        content_type = names.get(b"content-type", b"").decode("latin-1")
+        return (
+            start_message["status"] not in (204, 206)
+            and b"content-encoding" not in names
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+        )
+
+    def _is_small(self, start_message) -> bool:
+        """Whether the body is known to be too small (or absent) to compress."""
+        if start_message["status"] == 304:
+            return True
+        names = {name.lower(): value for name, value in start_message.get("headers", [])}
+        content_length = names.get(b"content-length")
+        return content_length is not None and int(content_length) < self.minimum_size
+
+    async def _send_body(self, start_message, body: bytes, encoding: str, send):
+        headers: List[Tuple[bytes, bytes]] = list(start_message.get("headers", []))
+        names = {name.lower(): value for name, value in headers}
+
+        if len(body) >= self.minimum_size:
+            compress_body = functools.partial(compress, body, encoding,
+                                              self.gzip_level, self.brotli_quality)
+            if len(body) >= self.thread_threshold:
+                body = await anyio.to_thread.run_sync(compress_body)
+            else:
+                body = compress_body()
+            headers = [(name, value) for name, value in headers
+                       if name.lower() not in (b"content-length", b"etag")]
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            etag = names.get(b"etag")
+            if etag is not None:
+                # The compressed bytes differ, so the validator must be weak;
+                # If-None-Match uses weak comparison, so revalidation still works
+                headers.append((b"etag", etag if etag.startswith(b"W/") else b"W/" + etag))
+
+        await send({**start_message, "headers": _add_vary(headers)})
+        await send({"type": "http.response.body", "body": body})
+
+
+def _add_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """Returns headers with Accept-Encoding added to (or as) the Vary header."""
+    if not any(name.lower() == b"vary" for name, _ in headers):
+        return list(headers) + [(b"vary", b"Accept-Encoding")]
+    return [(name, value + b", Accept-Encoding"
+             if name.lower() == b"vary" and b"accept-encoding" not in value.lower()
+             else value)
+            for name, value in headers]
@@ -1,81 +1,108 @@
-import json
+import argparse
 import os
 import faiss
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
-def create_embeddings(input_file, faiss_index_file, metadata_file):
+from filter_data import DATA_DIR, filter_record
+from json_stream import JsonObjectWriter, iter_json_records
+
+DEFAULT_BATCH_SIZE = 256
+
+
+def _iter_batches(records, batch_size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def create_embeddings(input_file, faiss_index_file, metadata_file,
+                      batch_size=DEFAULT_BATCH_SIZE, model_name='all-MiniLM-L6-v2'):
     """
     Generates embeddings for the input data and stores them in a FAISS index.
+
+    The input (raw export or FilteredData.json, as a JSON array or JSON lines)
+    is streamed: each batch of batch_size records is normalized, encoded and
+    added to the index, and its metadata is written out before the next batch
+    is read. Only the index vectors themselves grow with the corpus.
     """
     if not os.path.exists(input_file):
         print(f"Error: {input_file} not found.")
         return
 
+    print("Loading SentenceTransformer model...")
+    model = SentenceTransformer(model_name)
+    index = faiss.IndexFlatIP(model.get_sentence_embedding_dimension())
+
+    # Both artifacts are built next to the live ones and swapped in together
+    # once the index is written, so a failed or empty run leaves the previous
+    # places.faiss/metadata.json pair untouched.
+    index_tmp = faiss_index_file + ".tmp"
+    metadata_tmp = metadata_file + ".tmp"
     try:
-        # 1. Load Data
-        with open(input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        print(f"Generating embeddings from {input_file} in batches of {batch_size}...")
+        records = (filter_record(item) for item in iter_json_records(input_file))
+
+        with JsonObjectWriter(metadata_tmp) as metadata_writer:
+            for batch in _iter_batches(records, batch_size):
+                corpus = []
+                for item in batch:
+                    # Combine fields: description + tags + category
+                    # Ensure all parts are strings and handle missing values
+                    description = item.get("description") or ""
+                    tags = " ".join(item.get("tags") or [])
+                    category = item.get("category") or ""
+                    corpus.append(f"{description} {tags} {category}".strip())
+
+                    coordinates = item.get("coordinates") or {}
+                    metadata_writer.write_item(index.ntotal + len(corpus) - 1, {
+                        "place_id": item.get("id"),
+                        "lat": coordinates.get("lat"),
+                        "lon": coordinates.get("lng"), # Note: 'lng' in source, mapped to 'lon'
+                        "category": category
+                    })
 
-        if not data:
+                embeddings = np.asarray(model.encode(corpus), dtype='float32')
+                # Normalized vectors + inner product = cosine similarity scores
+                faiss.normalize_L2(embeddings)
+                index.add(embeddings)
+                print(f"   ...{index.ntotal} items indexed")
+
+        if index.ntotal == 0:
             print("No data found in input file.")
             return
 
-        print(f"Loaded {len(data)} items from {input_file}")
-
-        # 2. Prepare Corpus for Embedding
-        corpus = []
-        metadata_map = {}
-        
-        for idx, item in enumerate(data):
-            # Combine fields: description + tags + category
-            # Ensure all parts are strings and handle missing values
-            description = item.get("description", "")
-            tags = " ".join(item.get("tags", []))
-            category = item.get("category", "")
-            
-            text_to_embed = f"{description} {tags} {category}".strip()
-            corpus.append(text_to_embed)
-            
-            # Store metadata
-            metadata_map[idx] = {
-                "place_id": item.get("id"),
-                "lat": item.get("coordinates", {}).get("lat"),
-                "lon": item.get("coordinates", {}).get("lng"), # Note: 'lng' in source, mapped to 'lon'
-                "category": category
-            }
-
-        # 3. Generate Embeddings
-        print("Loading SentenceTransformer model...")
-        model = SentenceTransformer('all-MiniLM-L6-v2') 
-        
-        print(f"Generating embeddings for {len(corpus)} items...")
-        embeddings = model.encode(corpus)
-        
-        # Convert to float32 for FAISS
-        embeddings = np.array(embeddings).astype('float32')
-        
-        # 4. Create and Populate FAISS Index
-        dimension = embeddings.shape[1]
-        index = faiss.IndexFlatL2(dimension)
-        index.add(embeddings)
-        
         print(f"Created FAISS index with {index.ntotal} vectors.")
 
-        # 5. Save Artifacts
-        faiss.write_index(index, faiss_index_file)
-        with open(metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(metadata_map, f, indent=4)
+        faiss.write_index(index, index_tmp)
+        os.replace(index_tmp, faiss_index_file)
+        os.replace(metadata_tmp, metadata_file)
 
         print(f"Saved FAISS index to {faiss_index_file}")
         print(f"Saved metadata to {metadata_file}")
-
-    except Exception as e:
-        print(f"An error occurred: {e}")
+    finally:
+        for path in (index_tmp, metadata_tmp):
+            if os.path.exists(path):
+                os.remove(path)
 
 if __name__ == "__main__":
-    INPUT_FILE = "f:/DigitalSherpaLLM/data/FilteredData.json"
-    FAISS_INDEX_FILE = "f:/DigitalSherpaLLM/data/places.faiss"
-    METADATA_FILE = "f:/DigitalSherpaLLM/data/metadata.json"
-    
-    create_embeddings(INPUT_FILE, FAISS_INDEX_FILE, METADATA_FILE)
+    parser = argparse.ArgumentParser(description="Build the places FAISS index from an export.")
+    parser.add_argument("--input", default=os.getenv("FILTERED_DATA_FILE",
+                                                     os.path.join(DATA_DIR, "FilteredData.json")),
+                        help="Filtered data or raw export (JSON array or JSON lines)")
+    parser.add_argument("--index", default=os.getenv("FAISS_INDEX_PATH",
+                                                     os.path.join(DATA_DIR, "places.faiss")),
+                        help="Output FAISS index")
+    parser.add_argument("--metadata", default=os.getenv("METADATA_PATH",
+                                                        os.path.join(DATA_DIR, "metadata.json")),
+                        help="Output metadata JSON")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Records encoded and indexed per batch")
+    args = parser.parse_args()
+
+    create_embeddings(args.input, args.index, args.metadata, batch_size=args.batch_size)
@@ -1,55 +1,71 @@
+import argparse
 import json
 import os
 
+from json_stream import JsonArrayWriter, iter_json_records
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def filter_record(item):
+    """
+    Reduces one raw export record to the fields used for search.
+    """
+    # Extracting id from _id.$oid if it exists, else just id
+    item_id = ""
+    if "_id" in item and isinstance(item["_id"], dict) and "$oid" in item["_id"]:
+        item_id = item["_id"]["$oid"]
+    elif "id" in item:
+        item_id = item["id"]
+
+    return {
+        "id": item_id,
+        "name": item.get("name", ""),
+        "slug": item.get("slug", ""),
+        "description": item.get("description", ""),
+        "category": item.get("category", ""),
+        "subcategory": item.get("subcategory", ""),
+        "address": item.get("address", ""),
+        "tags": item.get("tags", []),
+        "coordinates": item.get("coordinates", {})
+    }
+
+
 def filter_json_data(input_file, output_file):
     """
     Filters the input JSON data to include only specific fields.
+
+    Records are streamed from the input (a JSON array or JSON lines) and
+    written out one at a time, so memory use does not depend on the export size.
     """
     if not os.path.exists(input_file):
         print(f"Error: {input_file} not found.")
         return
 
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        if not isinstance(data, list):
-            print("Error: Input data is not a list of objects.")
-            return
-
-        filtered_data = []
-        for item in data:
-            # Extracting id from _id.$oid if it exists, else just id
-            item_id = ""
-            if "_id" in item and isinstance(item["_id"], dict) and "$oid" in item["_id"]:
-                item_id = item["_id"]["$oid"]
-            elif "id" in item:
-                item_id = item["id"]
-
-            filtered_item = {
-                "id": item_id,
-                "name": item.get("name", ""),
-                "slug": item.get("slug", ""),
-                "description": item.get("description", ""),
-                "category": item.get("category", ""),
-                "subcategory": item.get("subcategory", ""),
-                "address": item.get("address", ""),
-                "tags": item.get("tags", []),
-                "coordinates": item.get("coordinates", {})
-            }
-            filtered_data.append(filtered_item)
-
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(filtered_data, f, indent=4)
-
-        print(f"Successfully created {output_file} with {len(filtered_data)} entries.")
+        with JsonArrayWriter(output_file) as writer:
+            for item in iter_json_records(input_file):
+                if not isinstance(item, dict):
+                    print("Error: Input data is not a list of objects.")
+                    return
+                writer.write(filter_record(item))
+
+        print(f"Successfully created {output_file} with {writer.count} entries.")
 
     except json.JSONDecodeError as e:
         print(f"Error decoding JSON: {e}")
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
 
+
 if __name__ == "__main__":
-    INPUT_PATH = "f:/DigitalSherpaLLM/data/Data.json"
-    OUTPUT_PATH = "f:/DigitalSherpaLLM/data/FilteredData.json"
-    filter_json_data(INPUT_PATH, OUTPUT_PATH)
+    parser = argparse.ArgumentParser(description="Reduce a raw places export to the search fields.")
+    parser.add_argument("--input", default=os.getenv("PLACES_EXPORT_FILE",
+                                                     os.path.join(DATA_DIR, "Data.json")),
+                        help="Raw export (JSON array or JSON lines)")
+    parser.add_argument("--output", default=os.getenv("FILTERED_DATA_FILE",
+                                                      os.path.join(DATA_DIR, "FilteredData.json")),
+                        help="Filtered output file")
+    args = parser.parse_args()
+
+    filter_json_data(args.input, args.output)
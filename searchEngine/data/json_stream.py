@@ -0,0 +1,110 @@
+"""
+Streaming JSON helpers for the data preparation scripts.
+Reads and writes large exports one record at a time, so memory use does not
+grow with the number of places.
+"""
+import json
+from typing import Any, Dict, Iterator, TextIO
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+def iter_json_records(path: str, chunk_size: int = 1 << 16) -> Iterator[Dict[str, Any]]:
+    """
+    Yields objects from a JSON array file (`[{...}, {...}]`) or a JSON-lines
+    file (mongoexport's default), reading chunk_size characters at a time.
+
+    Only the current record and an unparsed tail of at most one record are held
+    in memory.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ""
+        pos = 0
+        in_array = None
+
+        def fill() -> bool:
+            nonlocal buffer, pos
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return False
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return True
+
+        while True:
+            # Skip whitespace and separators between records
+            while True:
+                while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                    pos += 1
+                if pos < len(buffer):
+                    break
+                if not fill():
+                    return
+
+            char = buffer[pos]
+            if in_array is None:
+                in_array = char == "["
+                if in_array:
+                    pos += 1
+                    continue
+            if in_array and char == ",":
+                pos += 1
+                continue
+            if in_array and char == "]":
+                return
+
+            # Decode one record, pulling more data until it is complete
+            while True:
+                try:
+                    record, end = _DECODER.raw_decode(buffer, pos)
+                    break
+                except json.JSONDecodeError:
+                    if not fill():
+                        raise
+            pos = end
+            yield record
+
+
+class JsonArrayWriter:
+    """
+    Writes a JSON array incrementally, one compact record per line.
+    The result is still a regular JSON array readable with json.load.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file: TextIO = None
+
+    def __enter__(self) -> "JsonArrayWriter":
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write("[")
+        return self
+
+    def write(self, record: Any):
+        self._file.write(",\n" if self.count else "\n")
+        self._file.write(json.dumps(record, ensure_ascii=False))
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.write("\n]\n")
+        self._file.close()
+
+
+class JsonObjectWriter(JsonArrayWriter):
+    """Writes a JSON object ({"key": value, ...}) incrementally, one entry per line."""
+
+    def __enter__(self) -> "JsonObjectWriter":
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write("{")
+        return self
+
+    def write_item(self, key: Any, value: Any):
+        self._file.write(",\n" if self.count else "\n")
+        self._file.write(f"{json.dumps(str(key))}: {json.dumps(value, ensure_ascii=False)}")
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.write("\n}\n")
+        self._file.close()
@@ -0,0 +1,239 @@
+"""
+Persistent Query Embedding Store
+Disk-backed cache of query embeddings, keyed by normalized query text and
+encoder model, so popular queries skip the encoder even right after a restart.
+
+Layout (per model, inside the store directory):
+    <model>.vectors  append-only float32 rows
+    <model>.keys     append-only JSON lines, one normalized query per row
+
+The store is an LRU cache of at most max_entries queries. Evicted queries stay
+in the files until they reach twice that many rows, then the files are
+rewritten with the live entries only.
+
+Queries that traffic_log.sanitize_query would mask or shorten (emails, phone
+numbers, overlong text) are never stored, so the store holds no more than the
+traffic log does.
+"""
+import json
+import os
+import queue
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from traffic_log import sanitize_query
+
+
+def normalize_query(query: str) -> str:
+    """Canonical cache key: lower-cased with collapsed whitespace."""
+    return " ".join(query.lower().split())
+
+
+def _is_storable(key: str) -> bool:
+    """True if a normalized query is safe to persist (sanitizing leaves it unchanged)."""
+    return bool(key) and sanitize_query(key) == key
+
+
+class QueryEmbeddingStore:
+    """
+    Bounded LRU store of query embeddings for one model.
+
+    Lookups are served from memory; new embeddings are appended to disk by a
+    background writer thread so the request path never waits on I/O. After a
+    restart, recency is approximated by the order queries were first stored.
+    """
+
+    def __init__(self, store_dir: str, model_name: str, dimension: int,
+                 max_entries: int = 20_000):
+        """
+        Args:
+            store_dir: Directory holding the store files
+            model_name: Encoder model name (embeddings are never shared across models)
+            dimension: Embedding dimension of the model
+            max_entries: Queries kept before the least recently used is evicted
+                (the vectors are kept in memory: ~30 MB at 20k x 384 dims)
+        """
+        self.store_dir = store_dir
+        self.model_name = model_name
+        self.dimension = dimension
+        self.max_entries = max_entries
+
+        slug = re.sub(r'[^A-Za-z0-9._-]+', '_', model_name)
+        self.vectors_path = os.path.join(store_dir, f"{slug}.vectors")
+        self.keys_path = os.path.join(store_dir, f"{slug}.keys")
+
+        self._embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Rows in the files, including evicted and duplicate ones
+        self._disk_rows = 0
+        self._io_lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Tuple[str, np.ndarray]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+
+        os.makedirs(store_dir, exist_ok=True)
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._embeddings)
+
+    def _load(self):
+        """Loads existing entries, dropping any half-written tail from a crash."""
+        if not os.path.exists(self.vectors_path) or not os.path.exists(self.keys_path):
+            return
+
+        with open(self.keys_path, 'r', encoding='utf-8') as f:
+            keys = []
+            for line in f:
+                try:
+                    keys.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break  # Truncated last line
+
+        row_bytes = self.dimension * 4
+        n_rows = os.path.getsize(self.vectors_path) // row_bytes
+        count = min(len(keys), n_rows)
+        if count:
+            vectors = np.fromfile(self.vectors_path, dtype='float32',
+                                  count=count * self.dimension).reshape(count, self.dimension)
+            for key, vector in zip(keys[:count], vectors):
+                if _is_storable(key):
+                    self._embeddings[key] = vector
+                    self._embeddings.move_to_end(key)
+            # Later rows are newer: keep the last max_entries
+            while len(self._embeddings) > self.max_entries:
+                self._embeddings.popitem(last=False)
+
+        self._disk_rows = len(keys)
+        if (len(self._embeddings) != len(keys)
+                or os.path.getsize(self.vectors_path) != len(keys) * row_bytes):
+            # Rewrite both files so rows line up again before appending, and
+            # drop entries written before sanitizing, evicted or duplicated
+            self._rewrite(list(self._embeddings.items()))
+
+        print(f"Loaded {len(self._embeddings)} cached query embeddings from {self.store_dir}")
+
+    def _rewrite(self, items: List[Tuple[str, np.ndarray]]):
+        vectors = np.array([vector for _, vector in items], dtype='float32')
+        vectors.reshape(-1, self.dimension).tofile(self.vectors_path)
+        with open(self.keys_path, 'w', encoding='utf-8') as f:
+            for key, _ in items:
+                f.write(json.dumps(key) + "\n")
+        self._disk_rows = len(items)
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        """Returns the cached (dim,) embedding for a query, or None."""
+        key = normalize_query(query)
+        with self._lock:
+            vector = self._embeddings.get(key)
+            if vector is not None:
+                self._embeddings.move_to_end(key)
+            return vector
+
+    def vectors(self) -> np.ndarray:
+        """All stored embeddings as an (n, dim) float32 array."""
+        with self._lock:
+            stored = list(self._embeddings.values())
+        if not stored:
+            return np.empty((0, self.dimension), dtype='float32')
+        return np.stack(stored)
+
+    def _insert(self, key: str, embedding: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Adds a normalized query under self._lock, evicting the least recently
+        used entries beyond max_entries.
+
+        Returns:
+            The stored vector, or None if the key is not storable or already present.
+        """
+        if not _is_storable(key):
+            return None
+        if key in self._embeddings:
+            self._embeddings.move_to_end(key)
+            return None
+        vector = np.asarray(embedding, dtype='float32').reshape(self.dimension)
+        self._embeddings[key] = vector
+        while len(self._embeddings) > self.max_entries:
+            self._embeddings.popitem(last=False)
+        return vector
+
+    def put(self, query: str, embedding: np.ndarray):
+        """
+        Caches an embedding in memory and schedules it for an append to disk.
+
+        Args:
+            query: Raw query text (normalized here)
+            embedding: (dim,) or (1, dim) float32 embedding
+        """
+        key = normalize_query(query)
+        with self._lock:
+            vector = self._insert(key, embedding)
+        if vector is None:
+            return
+        self._ensure_writer()
+        self._queue.put((key, vector))
+
+    def put_many(self, items: Iterable[Tuple[str, np.ndarray]]):
+        """Synchronously appends a batch of embeddings (used by offline precompute)."""
+        new_items = []
+        with self._lock:
+            for query, embedding in items:
+                key = normalize_query(query)
+                vector = self._insert(key, embedding)
+                if vector is not None:
+                    new_items.append((key, vector))
+        self._append(new_items)
+
+    def _append(self, items: List[Tuple[str, np.ndarray]]):
+        if not items:
+            return
+        with self._io_lock:
+            # Vectors first: a crash between the two writes leaves an extra vector,
+            # which _load() trims, never a key without its vector
+            with open(self.vectors_path, 'ab') as f:
+                for _, vector in items:
+                    f.write(vector.tobytes())
+            with open(self.keys_path, 'a', encoding='utf-8') as f:
+                for key, _ in items:
+                    f.write(json.dumps(key) + "\n")
+            self._disk_rows += len(items)
+
+            if self._disk_rows > 2 * self.max_entries:
+                # Mostly evicted rows by now: compact to the live entries
+                with self._lock:
+                    live = list(self._embeddings.items())
+                self._rewrite(live)
+
+    def _ensure_writer(self):
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop,
+                                                name="query-embedding-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        """Drains the queue in batches and appends them to disk."""
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            stop = None in batch
+            try:
+                self._append([entry for entry in batch if entry is not None])
+            except Exception as e:
+                print(f"Error writing query embeddings: {e}")
+            if stop:
+                return
+
+    def close(self):
+        """Flushes pending writes and stops the writer thread."""
+        with self._writer_lock:
+            writer = self._writer
+        if writer is not None and writer.is_alive():
+            self._queue.put(None)
+            writer.join(timeout=5)
@@ -0,0 +1,22 @@
+"""
+Geo Utilities
+Small helpers for distance calculations on the lat/lon stored in metadata.
+"""
+import math
+from typing import Optional
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Returns the great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def has_coordinates(lat: Optional[float], lon: Optional[float]) -> bool:
+    """True if both coordinates are present."""
+    return lat is not None and lon is not None
@@ -0,0 +1,91 @@
+"""
+HTTP Caching Helpers
+Weak ETags derived from response content, plus a short-lived cache of the
+ETags recently sent per resource so conditional requests (If-None-Match) can be
+answered with 304 without re-reading MongoDB.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+def compute_etag(payload: Any) -> str:
+    """
+    ETag over the canonical JSON form of a response payload.
+
+    Weak (W/"..."), since the compression middleware may send the payload as
+    different bytes; 200 and 304 responses then carry the same validator.
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"),
+                           ensure_ascii=False, default=str)
+    return 'W/"' + hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """
+    Evaluates an If-None-Match header against an ETag (weak comparison, as
+    RFC 9110 requires for If-None-Match).
+    """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+class ValidatorCache:
+    """
+    Thread-safe LRU of resource key -> (ETag, time stored).
+
+    An entry younger than ttl_s is trusted as the current version; older
+    entries are ignored and the resource is re-read (and re-validated) from
+    the database. ttl_s bounds how long a changed document can keep getting
+    304 responses.
+    """
+
+    def __init__(self, ttl_s: float = 300.0, max_entries: int = 50000):
+        """
+        Args:
+            ttl_s: How long a stored ETag is trusted without checking the database
+            max_entries: Entries kept before the least recently used are dropped
+        """
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Returns the ETag last sent for key, if still trusted."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            etag, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl_s:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return etag
+
+    def put(self, key: Hashable, etag: str):
+        """Records the ETag just sent for key."""
+        with self._lock:
+            self._entries[key] = (etag, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drops every stored ETag (e.g. after the served data was reloaded)."""
+        with self._lock:
+            self._entries.clear()
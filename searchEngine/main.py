@@ -1,12 +1,27 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
+import functools
+import hmac
+import math
 import os
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
 
 from search_service import SearchService
+from shard_coordinator import ShardedSearchService
+from search_collections import COLLECTION_SPECS
+from resilience import (AdmissionController, CircuitBreaker, CircuitOpenError,
+                        DependencyUnavailableError, OverloadedError, RequestBudget)
+from traffic_log import TrafficLogger
+from artifact_bundle import resolve_current_bundle
+from thread_budget import ThreadBudget
+from profiling import SamplingProfiler, profile_path, profiled
+from http_cache import ValidatorCache, compute_etag, etag_matches
+from compression import BROTLI_AVAILABLE, CompressionMiddleware
+from sharding import ShardUnavailableError, decode_vector
 
 # Load environment variables
 load_dotenv()
@@ -16,27 +31,127 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 FAISS_INDEX_FILE = os.path.join(DATA_DIR, 'places.faiss')
 METADATA_FILE = os.path.join(DATA_DIR, 'metadata.json')
+# Versioned bundles written by sync_embeddings.py; loose files above are the fallback
+BUNDLES_DIR = os.getenv("SEARCH_BUNDLES_DIR", os.path.join(DATA_DIR, 'bundles'))
+# Checksums are verified when bundles are built; set to 1 to re-hash on every startup
+VERIFY_BUNDLE_CHECKSUMS = os.getenv("VERIFY_BUNDLE_CHECKSUMS", "0") == "1"
+
+# Latency budget per request; MongoDB enrichment only gets what is left of it
+LATENCY_BUDGET_MS = float(os.getenv("SEARCH_LATENCY_BUDGET_MS", 1000))
+# Largest top_k a client may ask for
+MAX_TOP_K = int(os.getenv("SEARCH_MAX_TOP_K", 500))
+# Circuit breaker around MongoDB: open after N consecutive failures/slow calls
+MONGODB_BREAKER_FAILURES = int(os.getenv("MONGODB_BREAKER_FAILURES", 5))
+MONGODB_SLOW_CALL_MS = float(os.getenv("MONGODB_SLOW_CALL_MS", 500))
+MONGODB_BREAKER_COOLDOWN_S = float(os.getenv("MONGODB_BREAKER_COOLDOWN_S", 30))
+# Persistent query embedding store (set QUERY_EMBEDDING_STORE_DIR="" to disable)
+QUERY_EMBEDDING_STORE_DIR = os.getenv(
+    "QUERY_EMBEDDING_STORE_DIR", os.path.join(DATA_DIR, 'query_embeddings')
+)
+# Traffic capture for replay/benchmarks (disabled unless a path is set)
+TRAFFIC_LOG_FILE = os.getenv("SEARCH_TRAFFIC_LOG")
+TRAFFIC_SAMPLE_RATE = float(os.getenv("SEARCH_TRAFFIC_SAMPLE_RATE", 1.0))
+# CPU thread budget (unset values are derived from the host's core count, or
+# from SEARCH_CPUS when the host is shared, see shard_cluster.py)
+INFERENCE_WORKERS = int(os.getenv("SEARCH_INFERENCE_WORKERS", 0)) or None
+ENCODER_THREADS = int(os.getenv("SEARCH_ENCODER_THREADS", 0)) or None
+FAISS_THREADS = int(os.getenv("SEARCH_FAISS_THREADS", 0)) or None
+# Admission control: concurrent requests, waiting requests and max wait before
+# shedding load with 503 (set SEARCH_MAX_CONCURRENT=0 to disable)
+MAX_CONCURRENT_REQUESTS = int(os.getenv("SEARCH_MAX_CONCURRENT", max(2, os.cpu_count() or 1)))
+MAX_QUEUED_REQUESTS = int(os.getenv("SEARCH_MAX_QUEUE", 64))
+MAX_QUEUE_WAIT_MS = float(os.getenv("SEARCH_MAX_QUEUE_WAIT_MS", 500))
+# Slots /search/detailed may hold, so place lookups still get through under load
+HEAVY_MAX_CONCURRENT = int(os.getenv("SEARCH_HEAVY_MAX_CONCURRENT",
+                                     max(1, MAX_CONCURRENT_REQUESTS // 2)))
+# On-demand profiling of single requests (disabled unless a token is set).
+# Send "X-Profile: <token>" with a /search* request (header only, so the token
+# never ends up in access logs or the traffic log).
+PROFILE_TOKEN = os.getenv("SEARCH_PROFILE_TOKEN")
+PROFILE_DIR = os.getenv("SEARCH_PROFILE_DIR", os.path.join(DATA_DIR, 'profiles'))
+PROFILE_INTERVAL_MS = float(os.getenv("SEARCH_PROFILE_INTERVAL_MS", 5))
+# Conditional GET for place endpoints: clients reuse responses for max-age, then
+# revalidate; an ETag sent within the TTL is answered with 304 without MongoDB.
+# The TTL is capped at max-age, so an edited place is stale for at most twice
+# max-age, and ETags are only trusted for the index generation they were sent for.
+PLACES_CACHE_MAX_AGE_S = int(os.getenv("PLACES_CACHE_MAX_AGE_S", 60))
+PLACES_ETAG_TTL_S = min(float(os.getenv("PLACES_ETAG_TTL_S", PLACES_CACHE_MAX_AGE_S)),
+                        PLACES_CACHE_MAX_AGE_S)
+PLACES_CACHE_CONTROL = f"public, max-age={PLACES_CACHE_MAX_AGE_S}"
+# Response compression (gzip, plus brotli when installed) negotiated from
+# Accept-Encoding; set RESPONSE_COMPRESSION=0 to disable
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "1") != "0"
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 4))
+# Sharded serving (see shard_cluster.py): workers serve one shard's bundles on
+# /internal/shard/*; a coordinator with SEARCH_SHARD_URLS fans queries out to them
+SHARD_ROLE = os.getenv("SEARCH_SHARD_ROLE", "")
+SHARD_URLS = [url.strip() for url in os.getenv("SEARCH_SHARD_URLS", "").split(",") if url.strip()]
+SHARD_TIMEOUT_MS = float(os.getenv("SEARCH_SHARD_TIMEOUT_MS", 500))
 
 # Global search service instance
 search_service = None
+traffic_logger = None
+place_etags = ValidatorCache(ttl_s=PLACES_ETAG_TTL_S)
+admission = AdmissionController(
+    MAX_CONCURRENT_REQUESTS,
+    max_queue=MAX_QUEUED_REQUESTS,
+    max_wait_s=MAX_QUEUE_WAIT_MS / 1000.0,
+    low_priority_limit=HEAVY_MAX_CONCURRENT
+) if MAX_CONCURRENT_REQUESTS > 0 else None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler for startup and shutdown events."""
-    global search_service
+    global search_service, traffic_logger
     
     # Startup
     try:
         # Check if MongoDB is configured
         use_mongodb = bool(os.getenv("MONGODB_URI"))
+        bundle_dir = resolve_current_bundle(BUNDLES_DIR)
         
-        search_service = SearchService(
-            FAISS_INDEX_FILE, 
-            METADATA_FILE,
-            use_mongodb=use_mongodb
+        service_options = dict(
+            use_mongodb=use_mongodb,
+            latency_budget_s=LATENCY_BUDGET_MS / 1000.0,
+            enrichment_breaker=CircuitBreaker(
+                "mongodb",
+                failure_threshold=MONGODB_BREAKER_FAILURES,
+                slow_call_s=MONGODB_SLOW_CALL_MS / 1000.0,
+                reset_timeout_s=MONGODB_BREAKER_COOLDOWN_S
+            ),
+            embedding_store_dir=QUERY_EMBEDDING_STORE_DIR or None,
+            thread_budget=ThreadBudget.for_host(INFERENCE_WORKERS, ENCODER_THREADS, FAISS_THREADS)
         )
+        
+        if SHARD_URLS:
+            print(f"🧩 Coordinating {len(SHARD_URLS)} shard(s)")
+            search_service = ShardedSearchService(
+                SHARD_URLS,
+                shard_timeout_s=SHARD_TIMEOUT_MS / 1000.0,
+                **service_options
+            )
+        else:
+            search_service = SearchService(
+                FAISS_INDEX_FILE, 
+                METADATA_FILE,
+                bundle_dir=bundle_dir,
+                verify_checksums=VERIFY_BUNDLE_CHECKSUMS,
+                **service_options
+            )
+        
+        # Legacy loose files: register any other collections that have been built
+        if not bundle_dir and not SHARD_URLS:
+            for name, spec in COLLECTION_SPECS.items():
+                index_file = os.path.join(DATA_DIR, spec.index_file)
+                metadata_file = os.path.join(DATA_DIR, spec.metadata_file)
+                if name != "places" and os.path.exists(index_file) and os.path.exists(metadata_file):
+                    search_service.register_collection(name, index_file, metadata_file)
+        
         print("✅ Search service initialized successfully!")
+        print(f"   Collections: {', '.join(search_service.collections)}")
         
         if use_mongodb:
             print("📦 MongoDB integration enabled")
@@ -48,10 +163,25 @@ async def lifespan(app: FastAPI):
         print(f"❌ Failed to initialize SearchService: {e}")
         search_service = None
     
+    # ETags recorded for previously loaded data are never trusted again
+    place_etags.clear()
+    
+    if RESPONSE_COMPRESSION:
+        print(f"🗜️  Response compression: {'br, ' if BROTLI_AVAILABLE else ''}gzip "
+              f"(min {COMPRESSION_MIN_BYTES} bytes)")
+    
+    if TRAFFIC_LOG_FILE:
+        traffic_logger = TrafficLogger(TRAFFIC_LOG_FILE, sample_rate=TRAFFIC_SAMPLE_RATE)
+        print(f"📝 Capturing search traffic to {TRAFFIC_LOG_FILE}")
+    
     yield
     
     # Shutdown - cleanup if needed
     print("Shutting down search service...")
+    if search_service:
+        search_service.close()
+    if traffic_logger:
+        traffic_logger.close()
 
 
 app = FastAPI(
@@ -61,7 +191,87 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+
+# ============== Admission Control ==============
+
+def _admission_priority(method: str, path: str) -> Optional[int]:
+    """
+    Admission priority of a request, or None for routes that bypass the limiter
+    (health checks and docs must answer even when the API is saturated).
+    """
+    if path in ("/", "/health", "/docs", "/redoc", "/openapi.json"):
+        return None
+    if path == "/search/detailed":
+        return AdmissionController.LOW
+    if method == "GET" and path.startswith("/places/") and path.count("/") == 2 \
+            and path != "/places/in-bounds":
+        return AdmissionController.HIGH
+    return AdmissionController.NORMAL
+
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """
+    Bounds how many requests reach the threadpool at once. Excess requests wait
+    briefly in a priority queue and are rejected with 503 + Retry-After when
+    the queue is full or the wait runs out, instead of queueing without limit.
+    """
+    priority = _admission_priority(request.method, request.url.path)
+    if admission is None or priority is None:
+        return await call_next(request)
+    try:
+        async with admission.slot(priority):
+            return await call_next(request)
+    except OverloadedError as e:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Search service is overloaded, please retry."},
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after_s))),
+                     "X-Search-Rejected": e.reason}
+        )
+
+
+def _is_profile_admin(token: Optional[str]) -> bool:
+    return bool(PROFILE_TOKEN and token and hmac.compare_digest(token, PROFILE_TOKEN))
+
+
+if PROFILE_TOKEN:
+    # Only registered when enabled, so unprofiled deployments pay nothing
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        """
+        Records a sampled profile of a /search* request carrying the admin
+        token in X-Profile. Only this request's threads are sampled (see
+        profiling.profiled). The folded-stack profile is stored under
+        SEARCH_PROFILE_DIR and its id returned in X-Profile-Id (download it
+        from /admin/profiles/{id}).
+        """
+        token = request.headers.get("X-Profile")
+        if token is None or not request.url.path.startswith("/search"):
+            return await call_next(request)
+        if not _is_profile_admin(token):
+            return JSONResponse(status_code=403, content={"detail": "Invalid profiling token."})
+        
+        profiler = SamplingProfiler(interval_s=PROFILE_INTERVAL_MS / 1000.0)
+        if not profiler.start():
+            response = await call_next(request)
+            response.headers["X-Profile-Skipped"] = "busy"
+            return response
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.stop()
+        
+        profile_id = profiler.save(PROFILE_DIR, request.url.path)
+        print(f"🔬 Profiled {request.url.path}: {profiler.samples} samples in "
+              f"{profiler.duration_s * 1000:.0f}ms -> {profile_id}")
+        response.headers["X-Profile-Id"] = profile_id
+        response.headers["X-Profile-Samples"] = str(profiler.samples)
+        return response
+
+
 # Add CORS middleware for frontend access
+# (added after admission control so it wraps it and rejected requests keep CORS headers)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Configure appropriately for production
@@ -70,17 +280,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost: compresses the final response, CORS headers included
+if RESPONSE_COMPRESSION:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=COMPRESSION_MIN_BYTES,
+        gzip_level=GZIP_LEVEL,
+        brotli_quality=BROTLI_QUALITY
+    )
+
 
 # ============== Request/Response Models ==============
 
 class SearchRequest(BaseModel):
     query: str
-    top_k: Optional[int] = 50
+    top_k: int = Field(default=50, ge=1, le=MAX_TOP_K)
     include_details: Optional[bool] = False  # New: fetch full MongoDB details
+    min_score: Optional[float] = None  # Cosine similarity cutoff (-1 to 1)
+    range_search: Optional[bool] = False  # Return every hit above min_score, up to top_k
+    collections: Optional[List[str]] = None  # e.g. ["places", "events"]; None = endpoint default
+    # Latency budget override; can only shorten the server's budget
+    timeout_ms: Optional[float] = Field(default=None, gt=0, le=LATENCY_BUDGET_MS)
+
+
+class RouteSearchRequest(BaseModel):
+    route: List[List[float]] = Field(..., min_length=1)  # [[lat, lon], ...] in route order
+    buffer_m: float = Field(default=200, gt=0, le=5000)  # Corridor half-width in metres
+    query: Optional[str] = None  # Optional semantic ranking, e.g. "tea shop"
+    top_k: int = Field(default=50, ge=1, le=MAX_TOP_K)
+    min_score: Optional[float] = None
+    collections: Optional[List[str]] = None  # None = places only
+    include_details: Optional[bool] = False
+    # Latency budget override; can only shorten the server's budget
+    timeout_ms: Optional[float] = Field(default=None, gt=0, le=LATENCY_BUDGET_MS)
 
 
 class SearchResult(BaseModel):
-    place_id: str
+    collection: str = "places"
+    id: Optional[str] = None
+    place_id: Optional[str] = None
     score: float
     category: Optional[str] = None
     lat: Optional[float] = None
@@ -94,6 +332,40 @@ class SearchResultWithDetails(SearchResult):
     full_details: Optional[Dict[str, Any]] = None
 
 
+class RouteSearchResult(SearchResultWithDetails):
+    """Search result with its position relative to the route."""
+    distance_m: float
+    route_offset_m: float
+
+
+class MapCluster(BaseModel):
+    """Places aggregated into one map marker."""
+    lat: float  # Centroid of the clustered places
+    lon: float
+    count: int
+    category: Optional[str] = None  # Most common category in the cluster
+
+
+class MapPlace(BaseModel):
+    collection: str = "places"
+    id: Optional[str] = None
+    place_id: Optional[str] = None
+    category: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    name: Optional[str] = None
+    full_details: Optional[Dict[str, Any]] = None
+
+
+class InBoundsResponse(BaseModel):
+    zoom: int
+    clustered: bool  # False above the clustering zoom: every place is listed
+    total: int  # Places inside the bounding box
+    truncated: bool  # More clusters/places than `limit` were found
+    clusters: List[MapCluster]
+    places: List[MapPlace]
+
+
 class PlaceDetails(BaseModel):
     """Full place details model."""
     id: str
@@ -119,6 +391,107 @@ class HealthResponse(BaseModel):
     mongodb_connected: bool
     faiss_index_loaded: bool
     total_vectors: Optional[int] = None
+    collections: Optional[Dict[str, int]] = None  # Vectors per loaded collection
+    mongodb_circuit: Optional[str] = None  # closed / open / half_open
+    bundle_version: Optional[str] = None  # None when running from legacy loose files
+    admission: Optional[Dict[str, int]] = None  # in_flight / queued / rejected counters
+    thread_budget: Optional[Dict[str, int]] = None  # Effective inference/encoder/FAISS threads
+    shards: Optional[int] = None  # Shard workers behind this coordinator
+
+
+class ShardSearchRequest(BaseModel):
+    """Query sent by the coordinator to a shard worker."""
+    vector: str  # sharding.encode_vector() output
+    top_k: int = 50
+    min_score: Optional[float] = None
+    range_search: bool = False
+    collections: Optional[List[str]] = None
+
+
+class ShardRouteRequest(BaseModel):
+    """Corridor lookup sent by the coordinator to a shard worker."""
+    route: List[List[float]]
+    buffer_m: float
+    vector: Optional[str] = None
+    top_k: int = 50
+    min_score: Optional[float] = None
+    collections: Optional[List[str]] = None
+
+
+# ============== Helpers ==============
+
+def _request_budget(timeout_ms: Optional[float] = None) -> RequestBudget:
+    """Starts the latency budget for a request (never longer than LATENCY_BUDGET_MS)."""
+    return RequestBudget.from_ms(min(timeout_ms or LATENCY_BUDGET_MS, LATENCY_BUDGET_MS))
+
+
+def _mark_degraded(response: Response, budget: RequestBudget):
+    """Flags responses where enrichment was skipped or cut short."""
+    if budget.is_degraded:
+        response.headers["X-Search-Degraded"] = ",".join(budget.degraded)
+
+
+def _place_cache_key(*parts) -> tuple:
+    """ETag cache key for a place resource in the currently loaded index generation."""
+    generation = (getattr(search_service, "bundle_manifest", None) or {}).get("version")
+    return (generation, *parts)
+
+
+def _conditional_response(request: Request, key: tuple) -> Optional[Response]:
+    """Returns a 304 if the client's If-None-Match matches the ETag last sent for key."""
+    etag = place_etags.get(key)
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=304,
+                        headers={"ETag": etag, "Cache-Control": PLACES_CACHE_CONTROL})
+    return None
+
+
+def _with_etag(request: Request, response: Response, key: tuple, payload: Any):
+    """
+    Tags a freshly read payload with its content ETag and Cache-Control.
+    Returns a 304 response if the client already has this version, else the payload.
+    """
+    etag = compute_etag(payload)
+    place_etags.put(key, etag)
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=304,
+                        headers={"ETag": etag, "Cache-Control": PLACES_CACHE_CONTROL})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = PLACES_CACHE_CONTROL
+    return payload
+
+
+def _captured(endpoint: str, method: str = "POST"):
+    """
+    Records the decorated endpoint's requests to the traffic log, if enabled.
+    Query text is sanitized; other request fields are kept as replay filters.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(**kwargs):
+            if traffic_logger is None:
+                return func(**kwargs)
+            
+            body = kwargs.get("request")
+            if isinstance(body, BaseModel):
+                fields = body.model_dump(exclude_none=True)
+            else:
+                fields = {key: value for key, value in kwargs.items()
+                          if key != "response" and value is not None
+                          and "{" + key + "}" not in endpoint}
+            path = endpoint.format(**kwargs)
+            query = fields.pop("query", None)
+            top_k = fields.pop("top_k", None)
+            
+            with traffic_logger.capture(method, endpoint, path, query, top_k, **fields) as record:
+                result = func(**kwargs)
+                record["results"] = len(result)
+                response = kwargs.get("response")
+                if response is not None and "X-Search-Degraded" in response.headers:
+                    record["degraded"] = response.headers["X-Search-Degraded"]
+                return result
+        return wrapper
+    return decorator
 
 
 # ============== API Endpoints ==============
@@ -143,42 +516,60 @@ def health_check():
             faiss_index_loaded=False
         )
     
+    sizes = search_service.collection_sizes()
     return HealthResponse(
         status="healthy",
         mongodb_connected=search_service.use_mongodb,
-        faiss_index_loaded=search_service.index is not None,
-        total_vectors=search_service.index.ntotal if search_service.index else None
+        faiss_index_loaded="places" in sizes,
+        total_vectors=sizes.get("places"),
+        collections=sizes,
+        mongodb_circuit=search_service.enrichment_breaker.state,
+        bundle_version=(search_service.bundle_manifest or {}).get("version"),
+        admission=admission.stats() if admission else None,
+        thread_budget=search_service.thread_budget.as_dict(),
+        shards=len(search_service.shards) if SHARD_URLS else None
     )
 
 
 @app.post("/search", response_model=List[SearchResult])
-def search_places(request: SearchRequest):
+@_captured("/search")
+@profiled
+def search_places(request: SearchRequest, response: Response):
     """
-    Basic semantic search for places.
-    Returns matching places with scores and basic metadata.
+    Federated semantic search over places, craftsmen and events.
+    The query is encoded once and every loaded index is searched in parallel;
+    results are merged by score. Limit with `collections`.
     Now enriched with Name and Description from MongoDB if available.
     """
     if not search_service:
         raise HTTPException(status_code=500, detail="Search service is not initialized.")
     
+    budget = _request_budget(request.timeout_ms)
     try:
         # Enable full details to get Name/Description from MongoDB
         results = search_service.search(
             request.query, 
             top_k=request.top_k,
-            include_full_details=True
+            include_full_details=True,
+            min_score=request.min_score,
+            range_search=bool(request.range_search),
+            collections=request.collections,
+            budget=budget
         )
         
         response_data = []
         for res in results:
             meta = res.get("metadata", {})
             full_details = res.get("full_details", {})
+            spec = COLLECTION_SPECS[res["collection"]]
             
             # Map name/description from MongoDB details if available, else None
             name = full_details.get("name")
-            description = full_details.get("description")
+            description = full_details.get(spec.description_field)
             
             response_data.append(SearchResult(
+                collection=res["collection"],
+                id=res.get("id"),
                 place_id=res.get("place_id"),
                 score=res.get("score"),
                 category=meta.get("category"),
@@ -187,33 +578,48 @@ def search_places(request: SearchRequest):
                 name=name,
                 description=description
             ))
-            
+        
+        _mark_degraded(response, budget)
         return response_data
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ShardUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/search/detailed", response_model=List[SearchResultWithDetails])
-def search_places_with_details(request: SearchRequest):
+@_captured("/search/detailed")
+@profiled
+def search_places_with_details(request: SearchRequest, response: Response):
     """
     Semantic search with full place details from MongoDB.
     Requires MongoDB to be configured for full details.
+    Searches places only unless `collections` is given.
     """
     if not search_service:
         raise HTTPException(status_code=500, detail="Search service is not initialized.")
     
+    budget = _request_budget(request.timeout_ms)
     try:
         results = search_service.search(
             request.query, 
             top_k=request.top_k,
-            include_full_details=True
+            include_full_details=True,
+            min_score=request.min_score,
+            range_search=bool(request.range_search),
+            collections=request.collections or ["places"],
+            budget=budget
         )
         
         response_data = []
         for res in results:
             meta = res.get("metadata", {})
             response_data.append(SearchResultWithDetails(
+                collection=res["collection"],
+                id=res.get("id"),
                 place_id=res.get("place_id"),
                 score=res.get("score"),
                 category=meta.get("category"),
@@ -221,17 +627,150 @@ def search_places_with_details(request: SearchRequest):
                 lon=meta.get("lon"),
                 full_details=res.get("full_details")
             ))
-            
+        
+        _mark_degraded(response, budget)
+        return response_data
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ShardUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/search/along-route", response_model=List[RouteSearchResult])
+@_captured("/search/along-route")
+@profiled
+def search_along_route(request: RouteSearchRequest, response: Response):
+    """
+    Corridor search: places within `buffer_m` metres of a roadmap route.
+    With a query, results are ranked by semantic score; without one they
+    follow the route order.
+    """
+    if not search_service:
+        raise HTTPException(status_code=500, detail="Search service is not initialized.")
+    
+    if any(len(point) != 2 for point in request.route):
+        raise HTTPException(status_code=400, detail="Route points must be [lat, lon] pairs.")
+    
+    budget = _request_budget(request.timeout_ms)
+    try:
+        results = search_service.search_along_route(
+            request.route,
+            request.buffer_m,
+            query=request.query,
+            top_k=request.top_k,
+            min_score=request.min_score,
+            collections=request.collections or ["places"],
+            include_full_details=bool(request.include_details),
+            budget=budget
+        )
+        
+        response_data = []
+        for res in results:
+            meta = res.get("metadata", {})
+            full_details = res.get("full_details", {})
+            spec = COLLECTION_SPECS[res["collection"]]
+            response_data.append(RouteSearchResult(
+                collection=res["collection"],
+                id=res.get("id"),
+                place_id=res.get("place_id"),
+                score=res.get("score"),
+                category=meta.get("category"),
+                lat=meta.get("lat"),
+                lon=meta.get("lon"),
+                name=full_details.get("name"),
+                description=full_details.get(spec.description_field),
+                full_details=res.get("full_details"),
+                distance_m=res["distance_m"],
+                route_offset_m=res["route_offset_m"]
+            ))
+        
+        _mark_degraded(response, budget)
         return response_data
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ShardUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/places/in-bounds", response_model=InBoundsResponse)
+def get_places_in_bounds(
+    response: Response,
+    south: float = Query(..., ge=-90, le=90),
+    west: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    zoom: int = Query(..., ge=0, le=22),
+    collection: str = "places",
+    limit: int = Query(default=500, ge=1, le=5000),
+    include_details: bool = False
+):
+    """
+    Markers for a map viewport. Up to the clustering zoom, places are grouped
+    into clusters (count, centroid, dominant category) precomputed on the
+    spatial grid; single places and every place at higher zooms are listed
+    individually. Answered from memory; MongoDB is only used with
+    include_details.
+    """
+    if not search_service:
+        raise HTTPException(status_code=500, detail="Search service is not initialized.")
+    
+    if south > north:
+        raise HTTPException(status_code=400, detail="south must not be greater than north.")
+    
+    budget = _request_budget()
+    try:
+        found = search_service.places_in_bounds(
+            south, west, north, east, zoom,
+            collection=collection,
+            limit=limit,
+            include_full_details=include_details,
+            budget=budget
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ShardUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    places = []
+    for res in found["places"]:
+        meta = res.get("metadata", {})
+        full_details = res.get("full_details") or {}
+        places.append(MapPlace(
+            collection=res["collection"],
+            id=res.get("id"),
+            place_id=res.get("place_id"),
+            category=meta.get("category"),
+            lat=meta.get("lat"),
+            lon=meta.get("lon"),
+            name=full_details.get("name"),
+            full_details=res.get("full_details")
+        ))
+    
+    _mark_degraded(response, budget)
+    return InBoundsResponse(
+        zoom=zoom,
+        clustered=found["clustered"],
+        total=found["total"],
+        truncated=found["truncated"],
+        clusters=[MapCluster(**cluster) for cluster in found["clusters"]],
+        places=places
+    )
+
+
 @app.get("/places/{place_id}", response_model=PlaceDetails)
-def get_place_by_id(place_id: str):
+def get_place_by_id(place_id: str, request: Request, response: Response):
     """
     Fetch full place details by ID from MongoDB.
+    Supports conditional GET: a current If-None-Match gets 304 without a
+    database read.
     """
     if not search_service:
         raise HTTPException(status_code=500, detail="Search service is not initialized.")
@@ -242,13 +781,19 @@ def get_place_by_id(place_id: str):
             detail="MongoDB is not configured. Set MONGODB_URI in .env file."
         )
     
+    cache_key = _place_cache_key("place", place_id)
+    not_modified = _conditional_response(request, cache_key)
+    if not_modified is not None:
+        return not_modified
+    
+    budget = _request_budget()
     try:
-        place = search_service.get_place_details(place_id)
+        place = search_service.get_place_details(place_id, budget=budget)
         
         if not place:
             raise HTTPException(status_code=404, detail="Place not found")
         
-        return PlaceDetails(
+        details = PlaceDetails(
             id=place.get("_id"),
             name=place.get("name"),
             slug=place.get("slug"),
@@ -266,21 +811,92 @@ def get_place_by_id(place_id: str):
             hasWorkshop=place.get("hasWorkshop"),
             isSponsored=place.get("isSponsored")
         )
+        return _with_etag(request, response, cache_key, details.model_dump())
         
     except HTTPException:
         raise
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="MongoDB is temporarily unavailable.",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after_s)))}
+        )
+    except DependencyUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/places/{place_id}/similar", response_model=List[SearchResult])
+@_captured("/places/{place_id}/similar", method="GET")
+def get_similar_places(
+    place_id: str,
+    response: Response,
+    limit: int = Query(default=10, ge=1, le=50),
+    category: Optional[str] = None,
+    max_distance_km: Optional[float] = Query(default=None, gt=0),
+    include_details: bool = False
+):
+    """
+    "You may also like" recommendations for a place.
+    Answered from the neighbor graph precomputed by sync_embeddings.py,
+    optionally filtered by category or distance from the place.
+
+    On sharded deployments neighbor graphs are built per shard, so the
+    recommendations come only from the shard owning the place. If that shard
+    does not answer in time, the response is empty and marked degraded.
+    """
+    if not search_service:
+        raise HTTPException(status_code=500, detail="Search service is not initialized.")
+    
+    budget = _request_budget()
+    try:
+        results = search_service.similar(
+            place_id,
+            limit=limit,
+            category=category,
+            max_distance_km=max_distance_km,
+            include_full_details=include_details,
+            budget=budget
+        )
+    except (ValueError, ShardUnavailableError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    if results is None:
+        raise HTTPException(status_code=404, detail="Place not found in search index")
+    
+    response_data = []
+    for res in results:
+        meta = res.get("metadata", {})
+        full_details = res.get("full_details", {})
+        response_data.append(SearchResult(
+            id=res.get("id"),
+            place_id=res.get("place_id"),
+            score=res.get("score"),
+            category=meta.get("category"),
+            lat=meta.get("lat"),
+            lon=meta.get("lon"),
+            name=full_details.get("name"),
+            description=full_details.get("description")
+        ))
+    
+    _mark_degraded(response, budget)
+    return response_data
 
 
 @app.get("/places")
 def get_all_places(
+    request: Request,
+    response: Response,
     limit: int = Query(default=50, ge=1, le=200),
     skip: int = Query(default=0, ge=0),
     category: Optional[str] = None
 ):
     """
     List all places from MongoDB with pagination.
+    Supports conditional GET like /places/{place_id}.
     """
     if not search_service or not search_service.use_mongodb:
         raise HTTPException(
@@ -288,6 +904,11 @@ def get_all_places(
             detail="MongoDB is not configured. Set MONGODB_URI in .env file."
         )
     
+    cache_key = _place_cache_key("places", limit, skip, category)
+    not_modified = _conditional_response(request, cache_key)
+    if not_modified is not None:
+        return not_modified
+    
     try:
         from mongodb_service import PlaceService
         place_service = PlaceService()
@@ -297,17 +918,131 @@ def get_all_places(
         else:
             places = place_service.get_all_places(limit=limit, skip=skip)
         
-        return {
+        return _with_etag(request, response, cache_key, {
             "count": len(places),
             "limit": limit,
             "skip": skip,
             "places": places
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ============== Shard Worker Endpoints ==============
+# Called by the coordinator (shard_coordinator.py); hidden unless this process
+# runs with SEARCH_SHARD_ROLE=worker.
+
+def _require_shard_worker():
+    if SHARD_ROLE != "worker":
+        raise HTTPException(status_code=404, detail="Not found")
+    if not search_service:
+        raise HTTPException(status_code=503, detail="Search service is not initialized.")
+
+
+def _shard_hits(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Makes raw service hits JSON-safe (FAISS ids come back as numpy ints)."""
+    for hit in hits:
+        hit["faiss_index"] = int(hit["faiss_index"])
+    return hits
+
+
+@app.get("/internal/shard/info", include_in_schema=False)
+def shard_info():
+    """Model, shard position and vector counts of the bundle this worker serves."""
+    _require_shard_worker()
+    manifest = search_service.bundle_manifest or {}
+    return {
+        "shard": manifest.get("shard"),
+        "model_name": search_service.model_name,
+        "dimension": search_service.model.get_sentence_embedding_dimension(),
+        "bundle_version": manifest.get("version"),
+        "collections": search_service.collection_sizes()
+    }
+
+
+@app.post("/internal/shard/search", include_in_schema=False)
+def shard_search(request: ShardSearchRequest):
+    """FAISS search of this shard's indexes with an already encoded query."""
+    _require_shard_worker()
+    try:
+        return _shard_hits(search_service.search_embedding(
+            decode_vector(request.vector),
+            top_k=request.top_k,
+            min_score=request.min_score,
+            range_search=request.range_search,
+            collections=request.collections
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/internal/shard/along-route", include_in_schema=False)
+def shard_along_route(request: ShardRouteRequest):
+    """Corridor lookup over this shard's spatial grids."""
+    _require_shard_worker()
+    try:
+        return _shard_hits(search_service.route_hits(
+            [(float(lat), float(lon)) for lat, lon in request.route],
+            request.buffer_m,
+            query_embedding=decode_vector(request.vector) if request.vector else None,
+            top_k=request.top_k,
+            min_score=request.min_score,
+            collections=request.collections
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/internal/shard/in-bounds", include_in_schema=False)
+def shard_in_bounds(south: float, west: float, north: float, east: float, zoom: int,
+                    collection: str = "places", limit: int = 500):
+    """Viewport lookup over this shard's spatial grid (clusters keep their cell ids)."""
+    _require_shard_worker()
+    try:
+        return search_service.bounds_hits(south, west, north, east, zoom,
+                                          collection=collection, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/internal/shard/similar/{collection}/{doc_id}", include_in_schema=False)
+def shard_similar(
+    collection: str,
+    doc_id: str,
+    limit: int = 10,
+    category: Optional[str] = None,
+    max_distance_km: Optional[float] = None
+):
+    """Neighbor-graph lookup for a document owned by this shard."""
+    _require_shard_worker()
+    try:
+        results = search_service.similar_hits(doc_id, limit=limit, collection=collection,
+                                              category=category, max_distance_km=max_distance_km)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if results is None:
+        raise HTTPException(status_code=404, detail="Document not found in this shard")
+    return _shard_hits(results)
+
+
+@app.get("/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+def get_profile(profile_id: str, x_profile: Optional[str] = Header(default=None)):
+    """
+    Downloads a stored request profile (folded stacks, e.g. for
+    `flamegraph.pl profile.folded > profile.svg` or speedscope).
+    Requires the profiling token in the X-Profile header.
+    """
+    if not _is_profile_admin(x_profile):
+        raise HTTPException(status_code=404, detail="Not found")
+    
+    path = profile_path(PROFILE_DIR, profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
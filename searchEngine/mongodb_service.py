@@ -2,15 +2,100 @@
 MongoDB Service Module
 Provides CRUD operations and business logic for place data.
 """
-from typing import List, Optional, Dict, Any
+from typing import Any, Dict, Iterator, List, Optional
+import pymongo
 from bson import ObjectId
-from mongodb_config import get_places_collection, get_database
+from mongodb_config import MongoDBConfig, get_places_collection, get_database
 
 
-class PlaceService:
+class CollectionService:
+    """Generic read access to any searchable collection (craftsmen, events, ...)."""
+    
+    def __init__(self, collection_name: str):
+        self.collection_name = collection_name
+        self.collection = MongoDBConfig.get_collection(collection_name)
+    
+    def get_documents_by_ids(self, doc_ids: List[str],
+                             projection: Optional[Dict[str, int]] = None,
+                             timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieves multiple documents by their IDs.
+        
+        Unlike the PlaceService helpers, database errors are raised rather than
+        swallowed so callers (circuit breaker, latency budget) can react.
+        
+        Args:
+            doc_ids: List of MongoDB ObjectIds as strings
+            projection: Fields to return (None returns the full document)
+            timeout: Client-side limit in seconds for the whole operation
+            
+        Returns:
+            List of documents with '_id' converted to string
+        
+        Raises:
+            pymongo.errors.PyMongoError: On database errors or timeout
+        """
+        object_ids = [ObjectId(did) for did in doc_ids if ObjectId.is_valid(did)]
+        with pymongo.timeout(timeout):
+            cursor = self.collection.find({"_id": {"$in": object_ids}}, projection)
+            docs = []
+            for doc in cursor:
+                doc['_id'] = str(doc['_id'])
+                docs.append(doc)
+        return docs
+    
+    def get_documents_for_embedding(self, projection: Dict[str, int]) -> List[Dict[str, Any]]:
+        """
+        Retrieves all documents with the fields needed for embedding generation.
+        
+        Args:
+            projection: Fields to fetch
+            
+        Returns:
+            List of documents with 'id' and '_id' as strings
+        """
+        docs = []
+        for batch in self.iter_documents_for_embedding(projection):
+            docs.extend(batch)
+        return docs
+    
+    def iter_documents_for_embedding(self, projection: Dict[str, int],
+                                     batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Streams all documents with the fields needed for embedding generation.
+        
+        The cursor fetches batch_size documents per round-trip and only one
+        batch is held at a time, so memory does not grow with the collection.
+        
+        Args:
+            projection: Fields to fetch
+            batch_size: Documents per yielded batch (and per cursor round-trip)
+            
+        Yields:
+            Lists of up to batch_size documents with 'id' and '_id' as strings
+        """
+        cursor = self.collection.find({}, projection).sort("_id", 1).batch_size(batch_size)
+        batch = []
+        for doc in cursor:
+            doc['id'] = str(doc['_id'])  # Add id field for compatibility
+            doc['_id'] = str(doc['_id'])
+            batch.append(doc)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def count_documents(self) -> int:
+        """Returns the (estimated) number of documents in the collection."""
+        return self.collection.estimated_document_count()
+
+
+class PlaceService(CollectionService):
     """Service class for managing place data in MongoDB."""
     
     def __init__(self):
+        self.collection_name = "places"
         self.collection = get_places_collection()
     
     def get_all_places(self, limit: int = 100, skip: int = 0) -> List[Dict[str, Any]]:
@@ -152,13 +237,7 @@ class PlaceService:
             "tags": 1,
             "coordinates": 1
         }
-        cursor = self.collection.find({}, projection)
-        places = []
-        for doc in cursor:
-            doc['id'] = str(doc['_id'])  # Add id field for compatibility
-            doc['_id'] = str(doc['_id'])
-            places.append(doc)
-        return places
+        return self.get_documents_for_embedding(projection)
     
     def count_places(self) -> int:
         """Returns the total count of places in the collection."""
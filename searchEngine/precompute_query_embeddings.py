@@ -0,0 +1,112 @@
+"""
+Script to warm the persistent query embedding store from logged queries.
+Run it offline (e.g. before a deploy) so the most popular queries are served
+without touching the encoder from the first request.
+
+Usage:
+    python precompute_query_embeddings.py queries.log [more.log ...] --top 5000
+
+Log files may be JSON lines with a "query" field (the traffic capture format
+written when SEARCH_TRAFFIC_LOG is set) or plain text with one query per line.
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from typing import Iterable, List
+
+import faiss
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from dotenv import load_dotenv
+
+from embedding_store import QueryEmbeddingStore, normalize_query
+
+# Load environment variables
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STORE_DIR = os.getenv(
+    "QUERY_EMBEDDING_STORE_DIR", os.path.join(BASE_DIR, 'data', 'query_embeddings')
+)
+
+
+def read_queries(paths: Iterable[str]) -> Iterable[str]:
+    """Yields raw queries from JSON-lines or plain-text log files."""
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith("{"):
+                    try:
+                        query = json.loads(line).get("query")
+                    except json.JSONDecodeError:
+                        continue
+                else:
+                    query = line
+                if query:
+                    yield query
+
+
+def top_queries(paths: List[str], top_n: int) -> List[str]:
+    """Returns the top_n most frequent normalized queries."""
+    counts = Counter(normalize_query(query) for query in read_queries(paths))
+    counts.pop("", None)
+    return [query for query, _ in counts.most_common(top_n)]
+
+
+def precompute(paths: List[str], top_n: int, store_dir: str = DEFAULT_STORE_DIR,
+               model_name: str = 'all-MiniLM-L6-v2', batch_size: int = 64) -> int:
+    """
+    Encodes the top_n logged queries missing from the store and appends them.
+
+    Returns:
+        Number of new embeddings written.
+    """
+    print("=" * 60)
+    print("🔥 Precomputing query embeddings")
+    print("=" * 60)
+
+    queries = top_queries(paths, top_n)
+    print(f"\n📜 {len(queries)} distinct queries selected from {len(paths)} log file(s)")
+
+    print(f"\n🤖 Loading SentenceTransformer model {model_name}...")
+    model = SentenceTransformer(model_name)
+    store = QueryEmbeddingStore(store_dir, model_name, model.get_sentence_embedding_dimension())
+
+    missing = [query for query in queries if store.get(query) is None]
+    print(f"   {len(queries) - len(missing)} already stored, {len(missing)} to encode")
+
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        # Same normalization as SearchService.encode_query
+        embeddings = np.array(model.encode(batch)).astype('float32')
+        faiss.normalize_L2(embeddings)
+        store.put_many(zip(batch, embeddings))
+        print(f"   Encoded {min(start + batch_size, len(missing))}/{len(missing)}")
+
+    print("\n" + "=" * 60)
+    print(f"✅ Store now holds {len(store)} queries ({store.vectors_path})")
+    print("=" * 60)
+    return len(missing)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("logs", nargs="+", help="Query log files")
+    parser.add_argument("--top", type=int, default=5000, help="Number of top queries to encode")
+    parser.add_argument("--store-dir", default=DEFAULT_STORE_DIR, help="Embedding store directory")
+    parser.add_argument("--model", default='all-MiniLM-L6-v2', help="SentenceTransformer model name")
+    args = parser.parse_args()
+
+    try:
+        precompute(args.logs, args.top, store_dir=args.store_dir, model_name=args.model)
+        sys.exit(0)
+    except Exception as e:
+        print(f"\n❌ Error during precompute: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
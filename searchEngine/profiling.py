@@ -0,0 +1,185 @@
+"""
+On-demand Request Profiling
+A small sampling profiler for a single request. A background thread snapshots
+the Python stacks of the threads working for that request at a fixed interval:
+the request thread while a profiled() function runs on it, and executor
+threads while they run work submitted through profiled() by that request.
+Other requests running at the same time are not sampled.
+
+Samples whose innermost frame is waiting on a lock, queue or selector are
+dropped, so the profile shows where the request was running Python code.
+Blocking socket reads inside drivers still count, as the sampler cannot tell
+them apart from computation.
+
+Profiles are written in the folded-stack format ("frame;frame;frame count"
+per line) understood by flamegraph.pl, inferno and speedscope.
+"""
+import contextvars
+import functools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_PROFILE_ID = re.compile(r'^[\w.-]+\.folded$')
+
+# Innermost frames in these modules mean the thread is blocked, not running
+_WAIT_MODULES = ("threading.py", "queue.py", "selectors.py")
+
+# Profiler of the request being handled, set by SamplingProfiler.start()
+_current_profiler: contextvars.ContextVar[Optional["SamplingProfiler"]] = \
+    contextvars.ContextVar("search_profiler", default=None)
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples the stacks of the threads tracked for one request until stopped."""
+
+    # Only one request is profiled at a time
+    _active = threading.Lock()
+
+    def __init__(self, interval_s: float = 0.005):
+        """
+        Args:
+            interval_s: Time between samples
+        """
+        self.interval_s = interval_s
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.duration_s = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at = 0.0
+        self._context_token: Optional[contextvars.Token] = None
+        # Thread id -> nesting depth of track() calls currently running on it
+        self._tracked: Dict[int, int] = {}
+        self._tracked_lock = threading.Lock()
+
+    def start(self) -> bool:
+        """
+        Starts sampling and makes this the current context's profiler (see
+        profiled()); returns False if another profile is already running.
+        """
+        if not SamplingProfiler._active.acquire(blocking=False):
+            return False
+        self._context_token = _current_profiler.set(self)
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Stops sampling and releases the profiler for the next request."""
+        self._stop.set()
+        self._thread.join()
+        self.duration_s = time.perf_counter() - self._started_at
+        _current_profiler.reset(self._context_token)
+        SamplingProfiler._active.release()
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Samples the calling thread while the block runs."""
+        thread_id = threading.get_ident()
+        with self._tracked_lock:
+            self._tracked[thread_id] = self._tracked.get(thread_id, 0) + 1
+        try:
+            yield
+        finally:
+            with self._tracked_lock:
+                if self._tracked[thread_id] == 1:
+                    del self._tracked[thread_id]
+                else:
+                    self._tracked[thread_id] -= 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self.samples += 1
+            with self._tracked_lock:
+                tracked = set(self._tracked)
+            if not tracked:
+                continue
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            for thread_id in tracked:
+                frame = frames.get(thread_id)
+                stack = self._app_stack(frame) if frame is not None else None
+                if stack:
+                    stack.append(names.get(thread_id, str(thread_id)))
+                    self.stacks[";".join(reversed(stack))] += 1
+
+    @staticmethod
+    def _app_stack(frame) -> Optional[List[str]]:
+        """
+        Innermost-first frame labels, or None for threads that are blocked
+        (waiting on a future, lock, queue or selector) or not in application code.
+        """
+        stack = []
+        in_app = False
+        while frame is not None:
+            code = frame.f_code
+            if len(stack) < 2 and code.co_filename.endswith(_WAIT_MODULES):
+                # Blocked: Future.result / queue.get -> Condition.wait, or I/O select
+                return None
+            if not in_app and code.co_filename.startswith(APP_DIR) \
+                    and code.co_filename != __file__:
+                in_app = True
+            stack.append(_frame_label(code))
+            frame = frame.f_back
+        return stack if in_app else None
+
+    def folded(self) -> str:
+        """Returns the profile in folded-stack format."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def save(self, profile_dir: str, label: str) -> str:
+        """
+        Writes the folded profile to profile_dir.
+
+        Returns:
+            The profile id (file name).
+        """
+        os.makedirs(profile_dir, exist_ok=True)
+        slug = re.sub(r'[^\w-]+', '-', label).strip("-") or "request"
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{slug}.folded"
+        with open(os.path.join(profile_dir, profile_id), 'w', encoding='utf-8') as f:
+            f.write(self.folded())
+        return profile_id
+
+
+def profiled(fn):
+    """
+    Wraps fn so the thread running it is sampled by the profiler of the
+    request that wrapped it (or, for functions wrapped at import time, of the
+    request that calls it). Without an active profile fn runs unchanged.
+
+    Wrap work when handing it to an executor, so the worker thread is sampled
+    for the submitting request only:
+        executor.submit(profiled(fn), *args)
+    """
+    bound = _current_profiler.get()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        profiler = bound or _current_profiler.get()
+        if profiler is None:
+            return fn(*args, **kwargs)
+        with profiler.track():
+            return fn(*args, **kwargs)
+    return run
+
+
+def profile_path(profile_dir: str, profile_id: str) -> Optional[str]:
+    """Resolves a stored profile by id, or None if the id is invalid or unknown."""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(profile_dir, profile_id)
+    return path if os.path.isfile(path) else None
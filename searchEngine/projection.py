@@ -0,0 +1,185 @@
+"""
+Embedding Projection
+Optional PCA projection of sentence embeddings to fewer dimensions. Fitted on
+a collection's vectors at build time and stored in the bundle next to the
+FAISS index; queries are encoded at full width and projected per collection
+just before the search.
+
+Projected vectors are re-normalized, so inner-product scores stay cosine
+similarities, now measured in the projected space.
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+# Vectors sampled to fit the projection (the covariance converges long before this)
+DEFAULT_FIT_SAMPLES = 100_000
+
+# Neighbors compared when measuring recall against the full-width index
+RECALL_K = 10
+
+# Queries used to measure recall
+DEFAULT_RECALL_QUERIES = 1000
+
+
+class PCAProjection:
+    """
+    Linear projection x -> normalize(x @ components.T).
+
+    The axes are the top eigenvectors of the uncentered second-moment matrix
+    (PCA without mean removal): they keep as much of the vectors' inner
+    products as possible, which is what cosine ranking depends on. Centering
+    would drop the direction shared by all embeddings and reorder results.
+    """
+
+    def __init__(self, components: np.ndarray, explained_variance: float = 1.0):
+        """
+        Args:
+            components: (output_dim, input_dim) orthonormal axes, largest first
+            explained_variance: Share of the vectors' energy the kept axes hold
+        """
+        self.components = np.ascontiguousarray(components, dtype='float32')
+        self.explained_variance = explained_variance
+
+    @property
+    def input_dim(self) -> int:
+        return self.components.shape[1]
+
+    @property
+    def output_dim(self) -> int:
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, output_dim: int,
+            max_samples: int = DEFAULT_FIT_SAMPLES, seed: int = 0) -> "PCAProjection":
+        """
+        Fits a projection on (a sample of) an (n, dim) array of embeddings.
+
+        Raises:
+            ValueError: If output_dim is not smaller than the input dimension.
+        """
+        n, dim = vectors.shape
+        if not 0 < output_dim < dim:
+            raise ValueError(f"Projection dimension must be between 1 and {dim - 1}, got {output_dim}")
+        if n > max_samples:
+            vectors = vectors[np.random.default_rng(seed).choice(n, max_samples, replace=False)]
+        vectors = vectors.astype('float64')
+
+        second_moment = vectors.T @ vectors / max(len(vectors), 1)
+        eigenvalues, eigenvectors = np.linalg.eigh(second_moment)
+        # eigh returns ascending eigenvalues
+        order = np.argsort(eigenvalues)[::-1][:output_dim]
+        total = float(eigenvalues.clip(min=0).sum())
+        explained = float(eigenvalues[order].clip(min=0).sum() / total) if total > 0 else 1.0
+        return cls(eigenvectors[:, order].T, explained)
+
+    def apply(self, vectors: np.ndarray) -> np.ndarray:
+        """Projects (n, input_dim) vectors into normalized (n, output_dim) float32 vectors."""
+        projected = np.ascontiguousarray(vectors @ self.components.T, dtype='float32')
+        faiss.normalize_L2(projected)
+        return projected
+
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            np.savez(f, components=self.components,
+                     explained_variance=np.float64(self.explained_variance))
+
+    @classmethod
+    def load(cls, path: str) -> "PCAProjection":
+        with np.load(path) as data:
+            return cls(data["components"], float(data["explained_variance"]))
+
+
+def fit_projection(indexes: List, output_dim: int,
+                   max_samples: int = DEFAULT_FIT_SAMPLES, seed: int = 0) -> PCAProjection:
+    """
+    Fits one projection on vectors sampled evenly from several indexes (the
+    shards of a collection), without materializing every vector.
+    """
+    rng = np.random.default_rng(seed)
+    total = sum(index.ntotal for index in indexes)
+    share = min(1.0, max_samples / max(total, 1))
+    samples = []
+    for index in indexes:
+        count = int(round(index.ntotal * share))
+        if count:
+            ids = np.sort(rng.choice(index.ntotal, count, replace=False))
+            samples.append(index.reconstruct_batch(ids))
+    return PCAProjection.fit(np.concatenate(samples), output_dim, max_samples, seed)
+
+
+def project_index(index, projection: PCAProjection):
+    """Builds an inner-product index holding the projected vectors of index."""
+    projected = faiss.IndexFlatIP(projection.output_dim)
+    batch = 65536
+    for start in range(0, index.ntotal, batch):
+        count = min(batch, index.ntotal - start)
+        projected.add(projection.apply(index.reconstruct_n(start, count)))
+    return projected
+
+
+def recall_queries(index, stored_queries: Optional[np.ndarray] = None,
+                   limit: int = DEFAULT_RECALL_QUERIES, min_stored: int = 50,
+                   seed: int = 0) -> Tuple[np.ndarray, Optional[np.ndarray], str]:
+    """
+    Picks the queries recall is measured with: real queries from the query
+    embedding store when there are enough of them, else a sample of the
+    corpus vectors themselves.
+
+    Returns:
+        (queries, their ids in index or None, description of the source)
+    """
+    rng = np.random.default_rng(seed)
+    if stored_queries is not None and len(stored_queries) >= min_stored:
+        if len(stored_queries) > limit:
+            stored_queries = stored_queries[rng.choice(len(stored_queries), limit, replace=False)]
+        return np.ascontiguousarray(stored_queries, dtype='float32'), None, "stored queries"
+    ids = np.sort(rng.choice(index.ntotal, min(limit, index.ntotal), replace=False))
+    return index.reconstruct_batch(ids), ids, "corpus sample"
+
+
+def evaluate_projection(full_index, projected_index, projection: PCAProjection,
+                        queries: np.ndarray, k: int = RECALL_K,
+                        query_ids: Optional[np.ndarray] = None) -> Dict[str, float]:
+    """
+    Compares the projected index with the full-width one on the same queries.
+
+    Args:
+        full_index: Index over the original vectors
+        projected_index: Same vectors, projected (same ids)
+        projection: Projection used for projected_index
+        queries: (n, input_dim) normalized query vectors
+        k: Neighbors compared per query
+        query_ids: When the queries are corpus vectors, their own ids, which
+            are left out of both result lists
+
+    Returns:
+        recall (share of each query's full-width top-k the projected index
+        also returns), and search time per query for both indexes in ms.
+    """
+    extra = 0 if query_ids is None else 1
+    k = min(k, full_index.ntotal - extra)
+    if k <= 0 or len(queries) == 0:
+        return {"recall": 1.0, "full_ms": 0.0, "projected_ms": 0.0}
+
+    started = time.perf_counter()
+    _, truth = full_index.search(queries, k + extra)
+    full_s = time.perf_counter() - started
+    started = time.perf_counter()
+    _, found = projected_index.search(projection.apply(queries), k + extra)
+    projected_s = time.perf_counter() - started
+
+    hits = 0
+    for row in range(len(queries)):
+        expected, returned = truth[row], found[row]
+        if query_ids is not None:
+            expected = expected[expected != query_ids[row]][:k]
+            returned = returned[returned != query_ids[row]][:k]
+        hits += len(np.intersect1d(expected, returned))
+    return {
+        "recall": hits / (len(queries) * k),
+        "full_ms": full_s * 1000 / len(queries),
+        "projected_ms": projected_s * 1000 / len(queries)
+    }
@@ -0,0 +1,211 @@
+"""
+Replay captured search traffic against a running instance and report latency.
+
+Usage:
+    # Open loop: keep the recorded arrival times, 10x faster
+    # (latency counts from when each request was due, queueing included)
+    python replay_traffic.py traffic.log --url http://127.0.0.1:8000 --speedup 10
+
+    # Closed loop: as fast as 16 concurrent clients can go
+    python replay_traffic.py traffic.log --concurrency 16 --json results.json
+
+The log is the JSON-lines file written when SEARCH_TRAFFIC_LOG is set.
+Run the same log against two builds and compare the reports.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+def load_records(paths: List[str], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Reads captured requests, ordered by capture time."""
+    records = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    records.sort(key=lambda record: record.get("ts", 0))
+    return records[:limit] if limit else records
+
+
+def build_request(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Turns a captured record back into httpx request arguments."""
+    filters = dict(record.get("filters") or {})
+    if record.get("method", "POST") == "GET":
+        return {"method": "GET", "url": record["path"], "params": filters}
+
+    body = {"query": record.get("query"), "top_k": record.get("top_k")}
+    body.update(filters)
+    body = {key: value for key, value in body.items() if value is not None}
+    return {"method": "POST", "url": record["path"], "json": body}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+class Replayer:
+    """Sends captured requests and collects per-request outcomes."""
+
+    def __init__(self, base_url: str, timeout_s: float = 30.0):
+        self.client = httpx.Client(base_url=base_url, timeout=timeout_s,
+                                   limits=httpx.Limits(max_connections=256))
+        self.latencies_ms: List[float] = []
+        self.queue_ms: List[float] = []
+        self.statuses: Counter = Counter()
+        self.by_endpoint: Dict[str, List[float]] = {}
+        self.degraded = 0
+        self._lock = threading.Lock()
+
+    def send(self, record: Dict[str, Any], due: Optional[float] = None):
+        """
+        Sends one request. With due (a time.perf_counter() value), latency is
+        measured from when the request was scheduled rather than from when it
+        was actually sent, so time spent waiting to go out is not omitted.
+        """
+        started = time.perf_counter()
+        due = started if due is None else min(due, started)
+        try:
+            response = self.client.request(**build_request(record))
+            status = str(response.status_code)
+            degraded = "x-search-degraded" in response.headers
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+            degraded = False
+        elapsed_ms = (time.perf_counter() - due) * 1000
+
+        with self._lock:
+            self.latencies_ms.append(elapsed_ms)
+            self.queue_ms.append((started - due) * 1000)
+            self.statuses[status] += 1
+            self.by_endpoint.setdefault(record.get("endpoint", "?"), []).append(elapsed_ms)
+            self.degraded += degraded
+
+    def run(self, records: List[Dict[str, Any]], speedup: Optional[float],
+            concurrency: int) -> float:
+        """
+        Replays records. With speedup, requests are issued on the recorded
+        schedule divided by speedup (open loop): each gets its own thread, so
+        a slow target never delays later arrivals, and latency is measured
+        from the scheduled time. Otherwise `concurrency` workers send
+        back-to-back (closed loop). Returns wall time in seconds.
+        """
+        started = time.perf_counter()
+        if speedup:
+            first_ts = records[0].get("ts", 0)
+            threads = []
+            for record in records:
+                due = started + (record.get("ts", first_ts) - first_ts) / speedup
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                thread = threading.Thread(target=self.send, args=(record, due), daemon=True)
+                thread.start()
+                threads.append(thread)
+            for thread in threads:
+                thread.join()
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(self.send, records))
+        return time.perf_counter() - started
+
+    def report(self, wall_s: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies_ms)
+        queued = sorted(self.queue_ms)
+        total = len(latencies)
+        errors = sum(count for status, count in self.statuses.items()
+                     if not status.startswith("2"))
+        return {
+            "requests": total,
+            "wall_s": round(wall_s, 3),
+            "throughput_rps": round(total / wall_s, 2) if wall_s else 0.0,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "degraded_rate": round(self.degraded / total, 4) if total else 0.0,
+            "statuses": dict(self.statuses),
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50), 2),
+                "p90": round(percentile(latencies, 90), 2),
+                "p95": round(percentile(latencies, 95), 2),
+                "p99": round(percentile(latencies, 99), 2),
+                "max": round(latencies[-1], 2) if latencies else 0.0
+            },
+            # Delay between a request's scheduled time and its send starting
+            "queue_ms": {
+                "p50": round(percentile(queued, 50), 2),
+                "p99": round(percentile(queued, 99), 2),
+                "max": round(queued[-1], 2) if queued else 0.0
+            },
+            "endpoints": {
+                endpoint: {
+                    "requests": len(values),
+                    "p50": round(percentile(sorted(values), 50), 2),
+                    "p99": round(percentile(sorted(values), 99), 2)
+                }
+                for endpoint, values in self.by_endpoint.items()
+            }
+        }
+
+
+def print_report(report: Dict[str, Any]):
+    latency = report["latency_ms"]
+    print("\n" + "=" * 60)
+    print("📊 Replay results")
+    print("=" * 60)
+    print(f"   Requests:    {report['requests']} in {report['wall_s']}s "
+          f"({report['throughput_rps']} req/s)")
+    print(f"   Error rate:  {report['error_rate'] * 100:.2f}%   statuses: {report['statuses']}")
+    print(f"   Degraded:    {report['degraded_rate'] * 100:.2f}%")
+    print(f"   Latency ms:  p50 {latency['p50']}  p90 {latency['p90']}  p95 {latency['p95']}  "
+          f"p99 {latency['p99']}  max {latency['max']}")
+    queued = report["queue_ms"]
+    print(f"   Queued ms:   p50 {queued['p50']}  p99 {queued['p99']}  max {queued['max']}")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"   {endpoint:<28} n={stats['requests']:<6} p50 {stats['p50']}  p99 {stats['p99']}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay captured search traffic.")
+    parser.add_argument("logs", nargs="+", help="Captured traffic log files")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Instance base URL")
+    parser.add_argument("--speedup", type=float, help="Replay on the recorded schedule, N times faster")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients (closed loop only)")
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout (s)")
+    parser.add_argument("--json", dest="json_out", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    records = load_records(args.logs, args.limit)
+    if not records:
+        print("❌ No requests found in the log.")
+        sys.exit(1)
+
+    mode = f"speedup x{args.speedup}" if args.speedup else f"concurrency {args.concurrency}"
+    print(f"▶️  Replaying {len(records)} requests against {args.url} ({mode})")
+
+    replayer = Replayer(args.url, timeout_s=args.timeout)
+    wall_s = replayer.run(records, args.speedup, args.concurrency)
+    report = replayer.report(wall_s)
+    print_report(report)
+
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"   Report written to {args.json_out}")
@@ -0,0 +1,293 @@
+"""
+Resilience Helpers
+Per-request latency budgets and a circuit breaker for calls to MongoDB, so a
+slow or failing database degrades search results instead of stalling them,
+and admission control that sheds load before the API saturates.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit breaker is open."""
+
+    def __init__(self, retry_after_s: float):
+        super().__init__(f"Circuit open, retry in {retry_after_s:.0f}s")
+        self.retry_after_s = retry_after_s
+
+
+class DependencyUnavailableError(Exception):
+    """Raised when a call to a backing service fails or runs out of time."""
+
+
+class OverloadedError(Exception):
+    """Raised when admission control rejects a request."""
+
+    def __init__(self, retry_after_s: float, reason: str):
+        super().__init__(f"Overloaded ({reason}), retry in {retry_after_s:.0f}s")
+        self.retry_after_s = retry_after_s
+        self.reason = reason
+
+
+class RequestBudget:
+    """
+    Latency budget for a single request.
+
+    Created when the request arrives and passed down the call chain; each stage
+    asks for the remaining time instead of using its own fixed timeout.
+    Stages that had to cut corners record why in `degraded`.
+    """
+
+    def __init__(self, budget_s: float):
+        self.budget_s = budget_s
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + budget_s
+        self.degraded: List[str] = []
+
+    @classmethod
+    def from_ms(cls, budget_ms: float) -> "RequestBudget":
+        return cls(budget_ms / 1000.0)
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (never negative)."""
+        return max(0.0, self.deadline - time.monotonic())
+
+    def elapsed(self) -> float:
+        """Seconds since the request started."""
+        return time.monotonic() - self.started_at
+
+    def mark_degraded(self, reason: str):
+        """Records that part of the response was skipped or cut short."""
+        if reason not in self.degraded:
+            self.degraded.append(reason)
+
+    @property
+    def is_degraded(self) -> bool:
+        return bool(self.degraded)
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker.
+
+    closed    -> calls pass; consecutive failures (errors or calls slower than
+                 slow_call_s) are counted
+    open      -> calls are rejected until reset_timeout_s has passed
+    half_open -> one trial call is let through; success closes the circuit,
+                 failure opens it again
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5,
+                 slow_call_s: float = 0.5, reset_timeout_s: float = 30.0):
+        """
+        Args:
+            name: Label used in log messages
+            failure_threshold: Consecutive failures that open the circuit
+            slow_call_s: Calls taking longer than this count as failures
+            reset_timeout_s: Cool-down before a trial call is allowed
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_s = slow_call_s
+        self.reset_timeout_s = reset_timeout_s
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._cooldown_elapsed():
+                return self.HALF_OPEN
+            return self._state
+
+    def _cooldown_elapsed(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.reset_timeout_s
+
+    def retry_after(self) -> float:
+        """Seconds until the next trial call is allowed."""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout_s - (time.monotonic() - self._opened_at))
+
+    def allow_request(self) -> bool:
+        """Returns True if a call may proceed (and reserves the half-open trial)."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and self._cooldown_elapsed():
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self, duration_s: Optional[float] = None):
+        """Records a completed call; slow calls are treated as failures."""
+        if duration_s is not None and duration_s > self.slow_call_s:
+            self.record_failure(f"slow call ({duration_s * 1000:.0f}ms)")
+            return
+        with self._lock:
+            if self._state != self.CLOSED:
+                print(f"✅ Circuit '{self.name}' closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self, reason: str = "error"):
+        """Records a failed call, opening the circuit past the threshold."""
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    print(f"⚠️  Circuit '{self.name}' opened after {reason}; "
+                          f"skipping calls for {self.reset_timeout_s:.0f}s")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class AdmissionController:
+    """
+    Bounded concurrency limiter with a priority wait queue (asyncio).
+
+    At most max_concurrent requests run at once. Others wait in a queue of at
+    most max_queue entries, for at most max_wait_s; anything beyond that is
+    rejected immediately with OverloadedError so clients can back off instead
+    of piling up behind CPU-bound work.
+
+    Freed slots go to the highest-priority waiter first (FIFO within a
+    priority). LOW priority requests may hold at most low_priority_limit
+    slots, which keeps capacity free for cheaper calls under load.
+    """
+
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+    def __init__(self, max_concurrent: int, max_queue: int = 64, max_wait_s: float = 0.5,
+                 low_priority_limit: Optional[int] = None):
+        """
+        Args:
+            max_concurrent: Requests allowed to run at the same time
+            max_queue: Requests allowed to wait for a slot
+            max_wait_s: Longest a request may wait before being rejected
+            low_priority_limit: Slots LOW requests may hold (default: all)
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait_s = max_wait_s
+        self.low_priority_limit = low_priority_limit or max_concurrent
+
+        self.in_flight = 0
+        self.low_in_flight = 0
+        self.rejected = 0
+        # Moving average of how long a slot is held, for Retry-After estimates
+        self._avg_hold_s = 0.05
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return len(self._live_waiters())
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": self.in_flight, "queued": self.queued,
+                "max_concurrent": self.max_concurrent, "rejected": self.rejected}
+
+    def retry_after(self) -> float:
+        """Rough time until a new request would get a slot."""
+        return self._avg_hold_s * (self.queued + 1) / self.max_concurrent
+
+    def _can_run(self, priority: int) -> bool:
+        if self.in_flight >= self.max_concurrent:
+            return False
+        return priority != self.LOW or self.low_in_flight < self.low_priority_limit
+
+    def _take(self, priority: int):
+        self.in_flight += 1
+        if priority == self.LOW:
+            self.low_in_flight += 1
+
+    def _wake_next(self):
+        """Hands free slots to waiters in priority order."""
+        while self._waiters:
+            priority, _, waiter = self._waiters[0]
+            if waiter.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._can_run(priority):
+                return
+            heapq.heappop(self._waiters)
+            self._take(priority)
+            waiter.set_result(True)
+
+    def _reject(self, reason: str) -> OverloadedError:
+        self.rejected += 1
+        return OverloadedError(self.retry_after(), reason)
+
+    def _live_waiters(self) -> List[Tuple[int, int, asyncio.Future]]:
+        return [entry for entry in self._waiters if not entry[2].done()]
+
+    async def acquire(self, priority: int = NORMAL):
+        """Waits for a slot; raises OverloadedError if the queue is full or the wait too long."""
+        live = self._live_waiters()
+        if self._can_run(priority) and all(queued > priority for queued, _, _ in live):
+            self._take(priority)
+            return
+        if len(live) >= self.max_queue:
+            # Make room by shedding the newest waiter of a lower priority, if any
+            victim = max(live, key=lambda entry: (entry[0], entry[1]))
+            if victim[0] <= priority:
+                raise self._reject("queue_full")
+            victim[2].set_exception(self._reject("queue_full"))
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+        self._wake_next()
+        try:
+            done, _ = await asyncio.wait({waiter}, timeout=self.max_wait_s)
+        except asyncio.CancelledError:
+            # Client went away; give back a slot handed over in the meantime
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                self.release(priority)
+            else:
+                waiter.cancel()
+            raise
+        if not done:
+            waiter.cancel()
+            raise self._reject("queue_timeout")
+        waiter.result()  # Raises OverloadedError if shed for a higher-priority request
+
+    def release(self, priority: int = NORMAL, held_s: Optional[float] = None):
+        """Frees a slot taken by acquire()."""
+        self.in_flight -= 1
+        if priority == self.LOW:
+            self.low_in_flight -= 1
+        if held_s is not None:
+            self._avg_hold_s = 0.9 * self._avg_hold_s + 0.1 * held_s
+        self._wake_next()
+
+    @asynccontextmanager
+    async def slot(self, priority: int = NORMAL) -> AsyncIterator[None]:
+        """Holds a slot for the duration of the block."""
+        await self.acquire(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(priority, time.monotonic() - started)
@@ -0,0 +1,134 @@
+"""
+Search Collection Registry
+Describes every MongoDB collection that gets its own FAISS index: which fields
+are embedded, what goes into the local metadata file, and which fields are
+fetched when enriching search results.
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def _coordinates_of(coords: Optional[Dict[str, Any]]) -> Tuple[Optional[float], Optional[float]]:
+    """Returns (lat, lon) from a {lat, lng} or {lat, lon} sub-document."""
+    coords = coords or {}
+    return coords.get("lat"), coords.get("lng") or coords.get("lon")
+
+
+def _place_metadata(doc: Dict[str, Any]) -> Dict[str, Any]:
+    lat, lon = _coordinates_of(doc.get("coordinates"))
+    return {
+        "place_id": doc.get("_id") or doc.get("id"),
+        "lat": lat,
+        "lon": lon,
+        "category": doc.get("category", "")
+    }
+
+
+def _craftsman_metadata(doc: Dict[str, Any]) -> Dict[str, Any]:
+    specialty = doc.get("specialty") or []
+    return {
+        "craftsman_id": doc.get("_id") or doc.get("id"),
+        "category": specialty[0] if specialty else "",
+        "place_slug": doc.get("placeSlug")
+    }
+
+
+def _event_metadata(doc: Dict[str, Any]) -> Dict[str, Any]:
+    # Events can span several locations; the first one is used as the anchor
+    locations = doc.get("locations") or [{}]
+    lat, lon = _coordinates_of(locations[0].get("coordinates"))
+    return {
+        "event_id": doc.get("_id") or doc.get("id"),
+        "lat": lat,
+        "lon": lon,
+        "category": doc.get("category", "")
+    }
+
+
+@dataclass(frozen=True)
+class CollectionSpec:
+    """Indexing and enrichment settings for one MongoDB collection."""
+
+    name: str                                   # Registry key and MongoDB collection name
+    id_field: str                               # Metadata key holding the document id
+    text_fields: Tuple[str, ...]                # Fields concatenated into the embedded text
+    build_metadata: Callable[[Dict[str, Any]], Dict[str, Any]]
+    enrich_projection: Optional[Dict[str, int]] # Fields fetched for full_details (None = all)
+    description_field: str = "description"      # Field shown as the result description
+    index_file: str = ""
+    metadata_file: str = ""
+    neighbors_file: Optional[str] = None        # Precomputed k-NN graph ("similar" lookups)
+
+    @property
+    def embedding_projection(self) -> Dict[str, int]:
+        """MongoDB projection covering everything needed to build the index."""
+        projection = {field: 1 for field in self.text_fields}
+        projection.update({"_id": 1, "coordinates": 1, "locations": 1, "placeSlug": 1})
+        return projection
+
+    def build_text(self, doc: Dict[str, Any]) -> str:
+        """Combines the configured text fields into a single string to embed."""
+        parts = []
+        for field in self.text_fields:
+            value = doc.get(field)
+            if isinstance(value, list):
+                value = " ".join(
+                    item.get("name", "") if isinstance(item, dict) else str(item)
+                    for item in value
+                )
+            if value:
+                parts.append(str(value))
+        return " ".join(parts).strip()
+
+
+COLLECTION_SPECS: Dict[str, CollectionSpec] = {
+    "places": CollectionSpec(
+        name="places",
+        id_field="place_id",
+        text_fields=("name", "description", "tags", "category"),
+        build_metadata=_place_metadata,
+        enrich_projection=None,
+        index_file="places.faiss",
+        metadata_file="metadata.json",
+        neighbors_file="places_neighbors.npz"
+    ),
+    "craftsmen": CollectionSpec(
+        name="craftsmen",
+        id_field="craftsman_id",
+        text_fields=("name", "bio", "specialty", "experience", "location"),
+        build_metadata=_craftsman_metadata,
+        enrich_projection={
+            "name": 1, "slug": 1, "photo": 1, "bio": 1, "specialty": 1,
+            "placeSlug": 1, "location": 1, "rating": 1, "isAvailable": 1
+        },
+        description_field="bio",
+        index_file="craftsmen.faiss",
+        metadata_file="craftsmen_metadata.json"
+    ),
+    "events": CollectionSpec(
+        name="events",
+        id_field="event_id",
+        text_fields=("name", "description", "tags", "category", "locations"),
+        build_metadata=_event_metadata,
+        enrich_projection={
+            "name": 1, "slug": 1, "description": 1, "category": 1,
+            "startDate": 1, "endDate": 1, "imageUrl": 1, "locations": 1
+        },
+        index_file="events.faiss",
+        metadata_file="events_metadata.json"
+    ),
+}
+
+
+def get_collection_spec(name: str) -> CollectionSpec:
+    """Returns the spec for a collection, raising ValueError if it is unknown."""
+    if name not in COLLECTION_SPECS:
+        raise ValueError(
+            f"Unknown collection '{name}'. Available: {', '.join(COLLECTION_SPECS)}"
+        )
+    return COLLECTION_SPECS[name]
+
+
+def list_collection_names() -> List[str]:
+    """Returns the names of all searchable collections."""
+    return list(COLLECTION_SPECS)
@@ -2,78 +2,352 @@ import faiss
 import numpy as np
 import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+
+from search_collections import CollectionSpec, get_collection_spec
+from geo_utils import haversine_km, has_coordinates
+from spatial_index import CLUSTER_MAX_ZOOM, SpatialGrid
+from resilience import (CircuitBreaker, CircuitOpenError, DependencyUnavailableError,
+                        RequestBudget)
+from embedding_store import QueryEmbeddingStore
+from projection import PCAProjection
+from profiling import profiled
+from thread_budget import (ThreadBudget, apply_encoder_threads, in_inference_thread,
+                           init_inference_thread)
+import artifact_bundle
 
 # MongoDB imports (optional - gracefully handle if not configured)
 try:
-    from mongodb_service import PlaceService
+    from mongodb_service import CollectionService, PlaceService
     MONGODB_AVAILABLE = True
 except ImportError:
     MONGODB_AVAILABLE = False
     print("⚠️  MongoDB service not available. Using local metadata only.")
 
 
+def bounds_place_order(hit: Dict[str, Any]) -> Tuple[str, int]:
+    """Sort key of unclustered viewport points: document id, then FAISS id."""
+    return (hit.get("id") or "", hit["faiss_index"])
+
+
+class CollectionIndex:
+    """FAISS index, local metadata and enrichment service for one collection."""
+
+    def __init__(self, spec: CollectionSpec, index, metadata: Dict[str, Any]):
+        self.spec = spec
+        self.index = index
+        self.metadata = metadata
+        self.service = None  # CollectionService, set when MongoDB is enabled
+        
+        # Precomputed k-NN graph, rows aligned with FAISS ids (optional)
+        self.neighbor_indices: Optional[np.ndarray] = None
+        self.neighbor_scores: Optional[np.ndarray] = None
+        # PCA projection the index was built with (optional)
+        self.projection: Optional[PCAProjection] = None
+        
+        # Document id -> first FAISS id holding it
+        self.id_to_row: Dict[str, int] = {}
+        id_column = metadata.column(spec.id_field) if hasattr(metadata, "column") else None
+        if id_column is not None:
+            # Array-backed bundle metadata: walk the column, no per-row dicts
+            for row, doc_id in enumerate(id_column.tolist()):
+                if doc_id:
+                    self.id_to_row.setdefault(doc_id, row)
+        else:
+            for idx_str, meta in metadata.items():
+                doc_id = meta.get(spec.id_field)
+                if doc_id:
+                    self.id_to_row.setdefault(doc_id, int(idx_str))
+        
+        # Grid over metadata coordinates for geographic queries
+        self.spatial_grid = SpatialGrid(metadata)
+
+    @property
+    def name(self) -> str:
+        return self.spec.name
+
+    def project(self, query_embedding: np.ndarray) -> np.ndarray:
+        """Maps a full-width query embedding into this index's vector space."""
+        if self.projection is None:
+            return query_embedding
+        return self.projection.apply(query_embedding)
+
+
 class SearchService:
     """
     Search service that uses FAISS for vector similarity search.
     Supports both local metadata and MongoDB for fetching full place details.
+
+    Each registered collection (places, craftsmen, events) has its own index
+    and metadata. A search encodes the query once and fans out to every
+    selected index in parallel.
+
+    Vectors are L2-normalized and scored by inner product, so every score is a
+    cosine similarity in [-1, 1] where higher means more relevant.
     """
+
+    # Threshold used by range search when the caller does not pass min_score
+    DEFAULT_RANGE_MIN_SCORE = 0.3
+    
+    # Enrichment is skipped when less than this is left of the request budget
+    MIN_ENRICHMENT_BUDGET_S = 0.02
     
-    def __init__(self, faiss_index_path: str, metadata_path: str, 
+    def __init__(self, faiss_index_path: Optional[str], metadata_path: Optional[str], 
                  model_name: str = 'all-MiniLM-L6-v2', 
-                 use_mongodb: bool = True):
+                 use_mongodb: bool = True,
+                 latency_budget_s: float = 1.0,
+                 enrichment_breaker: Optional[CircuitBreaker] = None,
+                 embedding_store_dir: Optional[str] = None,
+                 bundle_dir: Optional[str] = None,
+                 verify_checksums: bool = False,
+                 thread_budget: Optional[ThreadBudget] = None):
         """
         Initialize the search service.
         
         Args:
-            faiss_index_path: Path to the FAISS index file
-            metadata_path: Path to the metadata JSON file
+            faiss_index_path: Path to the places FAISS index file (legacy layout)
+            metadata_path: Path to the places metadata JSON file (legacy layout)
             model_name: Name of the SentenceTransformer model
             use_mongodb: Whether to fetch full details from MongoDB
+            latency_budget_s: Default per-request budget when callers pass none
+            enrichment_breaker: Circuit breaker guarding MongoDB calls
+            embedding_store_dir: Directory of the persistent query embedding
+                store (None disables it)
+            bundle_dir: Versioned artifact bundle to load every collection from.
+                Takes precedence over faiss_index_path/metadata_path.
+            verify_checksums: Check bundle file checksums against the manifest
+                on load (hashes every artifact, so startup takes longer)
+            thread_budget: Inference concurrency and encoder/FAISS thread
+                counts. Defaults to ThreadBudget.for_host().
         """
         self.faiss_index_path = faiss_index_path
         self.metadata_path = metadata_path
         self.model_name = model_name
         self.use_mongodb = use_mongodb and MONGODB_AVAILABLE
+        self.latency_budget_s = latency_budget_s
+        self.enrichment_breaker = enrichment_breaker or CircuitBreaker("mongodb")
+        self.embedding_store_dir = embedding_store_dir
+        self.bundle_dir = bundle_dir
+        self.verify_checksums = verify_checksums
+        self.bundle_manifest: Optional[Dict[str, Any]] = None
         
+        # Places index/metadata, kept as attributes for existing callers
         self.index = None
         self.metadata = None
         self.model = None
         self.place_service = None
+        self.embedding_store: Optional[QueryEmbeddingStore] = None
+        
+        # Registry of searchable collections, keyed by collection name
+        self.collections: Dict[str, CollectionIndex] = {}
+        # I/O fan-out (MongoDB enrichment); CPU work goes to inference_executor
+        self.executor = ThreadPoolExecutor(thread_name_prefix="search")
+        self.thread_budget: Optional[ThreadBudget] = None
+        self.inference_executor: Optional[ThreadPoolExecutor] = None
+        self.configure_threads(thread_budget or ThreadBudget.for_host())
         
         self.load_resources()
 
+    def configure_threads(self, thread_budget: ThreadBudget):
+        """
+        Applies a thread budget: the process-wide encoder intra-op thread
+        count, and a fixed-size executor whose threads run every encode and
+        FAISS search with the configured OpenMP thread count. Can be called
+        again to re-tune.
+        """
+        previous = self.inference_executor
+        apply_encoder_threads(thread_budget.encoder_threads)
+        self.inference_executor = ThreadPoolExecutor(
+            max_workers=thread_budget.inference_workers,
+            thread_name_prefix="inference",
+            initializer=init_inference_thread,
+            initargs=(thread_budget.faiss_threads,)
+        )
+        self.thread_budget = thread_budget
+        if previous is not None:
+            previous.shutdown(wait=True)
+        print(f"🧵 Thread budget: {thread_budget.inference_workers} inference worker(s), "
+              f"{thread_budget.encoder_threads} encoder / {thread_budget.faiss_threads} FAISS threads each "
+              f"({thread_budget.total_threads} in total)")
+
+    def _infer(self, fn, *args):
+        """Runs CPU-bound work on the inference executor and waits for it."""
+        if in_inference_thread():
+            return fn(*args)
+        return self.inference_executor.submit(profiled(fn), *args).result()
+
     def load_resources(self):
         """Loads the FAISS index, metadata, model, and optionally MongoDB connection."""
-        if not os.path.exists(self.faiss_index_path):
-            raise FileNotFoundError(f"FAISS index not found at {self.faiss_index_path}")
-        
-        if not os.path.exists(self.metadata_path):
-            raise FileNotFoundError(f"Metadata file not found at {self.metadata_path}")
-
-        print(f"Loading FAISS index from {self.faiss_index_path}...")
-        self.index = faiss.read_index(self.faiss_index_path)
-        
-        print(f"Loading metadata from {self.metadata_path}...")
-        with open(self.metadata_path, 'r', encoding='utf-8') as f:
-            self.metadata = json.load(f)
-            
         print(f"Loading SentenceTransformer model {self.model_name}...")
         self.model = SentenceTransformer(self.model_name)
         
+        if self.bundle_dir:
+            self.load_bundle(self.bundle_dir)
+        else:
+            self.register_collection("places", self.faiss_index_path, self.metadata_path)
+        
+        places = self.collections.get("places")
+        if places is None:
+            raise FileNotFoundError("No places index found in the loaded artifacts")
+        self.index = places.index
+        self.metadata = places.metadata
+        
+        if self.embedding_store_dir:
+            self.embedding_store = QueryEmbeddingStore(
+                self.embedding_store_dir,
+                self.model_name,
+                self.model.get_sentence_embedding_dimension()
+            )
+        
         # Initialize MongoDB connection if enabled
         if self.use_mongodb:
             try:
                 self.place_service = PlaceService()
+                places.service = self.place_service
                 print("✅ MongoDB service initialized for enriched results.")
             except Exception as e:
                 print(f"⚠️  Could not initialize MongoDB: {e}")
                 print("   Falling back to local metadata only.")
                 self.use_mongodb = False
 
+    def load_bundle(self, bundle_dir: str):
+        """
+        Loads every collection from a versioned artifact bundle.
+        
+        Raises:
+            artifact_bundle.BundleMismatchError: If the bundle was built with a
+                different model or dimension, or (with verify_checksums) a file
+                fails its checksum.
+        """
+        manifest = artifact_bundle.read_manifest(bundle_dir)
+        artifact_bundle.check_compatible(
+            manifest, self.model_name, self.model.get_sentence_embedding_dimension()
+        )
+        print(f"Loading artifact bundle {manifest['version']} (built {manifest['built_at']})...")
+        
+        for name in manifest["collections"]:
+            index, metadata, neighbors = artifact_bundle.load_collection(
+                bundle_dir, manifest, name, verify_checksums=self.verify_checksums
+            )
+            entry = self._add_collection(get_collection_spec(name), index, metadata)
+            if neighbors is not None:
+                entry.neighbor_indices, entry.neighbor_scores = neighbors
+            entry.projection = artifact_bundle.load_projection(bundle_dir, manifest, name)
+            projected = f" (projected to {index.d}d)" if entry.projection is not None else ""
+            print(f"   {name}: {index.ntotal} vectors{projected}")
+        
+        self.bundle_manifest = manifest
+
+    def register_collection(self, name: str, faiss_index_path: str,
+                            metadata_path: str,
+                            neighbors_path: Optional[str] = None) -> CollectionIndex:
+        """
+        Loads the index and metadata for a collection and adds it to the registry.
+        
+        Args:
+            name: Collection name from search_collections.COLLECTION_SPECS
+            faiss_index_path: Path to the collection's FAISS index file
+            metadata_path: Path to the collection's metadata JSON file
+            neighbors_path: Path to the precomputed neighbor graph. Defaults to
+                the spec's neighbors_file next to the index, if it exists.
+            
+        Returns:
+            The registered CollectionIndex.
+        """
+        spec = get_collection_spec(name)
+        
+        if not os.path.exists(faiss_index_path):
+            raise FileNotFoundError(f"FAISS index not found at {faiss_index_path}")
+        
+        if not os.path.exists(metadata_path):
+            raise FileNotFoundError(f"Metadata file not found at {metadata_path}")
+
+        print(f"Loading FAISS index from {faiss_index_path}...")
+        index = self._ensure_cosine_index(faiss.read_index(faiss_index_path))
+        
+        print(f"Loading metadata from {metadata_path}...")
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        
+        entry = self._add_collection(spec, index, metadata)
+        
+        if neighbors_path is None and spec.neighbors_file:
+            neighbors_path = os.path.join(os.path.dirname(faiss_index_path), spec.neighbors_file)
+        if neighbors_path and os.path.exists(neighbors_path):
+            print(f"Loading neighbor graph from {neighbors_path}...")
+            with np.load(neighbors_path) as graph:
+                entry.neighbor_indices = graph["indices"]
+                entry.neighbor_scores = graph["scores"]
+        return entry
+
+    def _add_collection(self, spec: CollectionSpec, index, metadata) -> CollectionIndex:
+        """Wraps loaded artifacts in a CollectionIndex and adds it to the registry."""
+        entry = CollectionIndex(spec, index, metadata)
+        if self.use_mongodb and spec.name != "places":
+            try:
+                entry.service = CollectionService(spec.name)
+            except Exception as e:
+                print(f"⚠️  Could not initialize MongoDB for {spec.name}: {e}")
+        
+        self.collections[spec.name] = entry
+        return entry
+
+    @staticmethod
+    def _ensure_cosine_index(index):
+        """
+        Returns an inner-product index over normalized vectors.
+
+        Indexes built before cosine scoring are IndexFlatL2 over raw vectors;
+        those are converted in memory so old artifacts keep working until the
+        next sync_embeddings run.
+        """
+        if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            return index
+
+        print("   Legacy L2 index detected, converting to normalized inner product...")
+        vectors = index.reconstruct_n(0, index.ntotal)
+        faiss.normalize_L2(vectors)
+        cosine_index = faiss.IndexFlatIP(index.d)
+        cosine_index.add(vectors)
+        return cosine_index
+
+    def encode_query(self, query: str) -> np.ndarray:
+        """
+        Encodes a query into a normalized (1, dim) float32 array.
+        Served from the persistent embedding store when the query is known.
+
+        Args:
+            query: The search query.
+
+        Returns:
+            Query embedding ready for an inner-product FAISS search.
+        """
+        if self.embedding_store is not None:
+            cached = self.embedding_store.get(query)
+            if cached is not None:
+                return cached.reshape(1, -1).copy()
+        
+        query_embedding = self._infer(self._encode, query)
+        
+        if self.embedding_store is not None:
+            self.embedding_store.put(query, query_embedding)
+        return query_embedding
+
+    def _encode(self, query: str) -> np.ndarray:
+        query_embedding = self.model.encode([query])
+        query_embedding = np.array(query_embedding).astype('float32')
+        faiss.normalize_L2(query_embedding)
+        return query_embedding
+
     def search(self, query: str, top_k: int = 50, 
-               include_full_details: bool = False) -> List[Dict[str, Any]]:
+               include_full_details: bool = False,
+               min_score: Optional[float] = None,
+               range_search: bool = False,
+               collections: Optional[List[str]] = None,
+               budget: Optional[RequestBudget] = None) -> List[Dict[str, Any]]:
         """
         Encodes the query, performs a FAISS search, and returns the closest results.
         
@@ -81,89 +355,492 @@ class SearchService:
             query: The search query.
             top_k: Number of top results to return.
             include_full_details: If True and MongoDB is available, fetch full place details.
+            min_score: Drop hits whose cosine similarity is below this value.
+            range_search: If True, return every hit above min_score (capped at
+                top_k) instead of a fixed-size top-k list.
+            collections: Collections to search. None searches every registered one.
+            budget: Latency budget for this request; enrichment only uses what
+                is left of it. Defaults to a fresh budget of latency_budget_s.
 
         Returns:
-            List of result dictionaries containing place_id, score, and metadata.
+            List of result dictionaries containing collection, id, score, and
+            metadata, ordered by descending score across all collections.
         """
         if not query:
             return []
+        
+        budget = budget or RequestBudget(self.latency_budget_s)
+        self._select_collections(collections)
 
-        # Generate embedding
-        query_embedding = self.model.encode([query])
-        query_embedding = np.array(query_embedding).astype('float32')
+        # Generate embedding once, shared by every index
+        query_embedding = self.encode_query(query)
+        results = self.search_embedding(query_embedding, top_k, min_score, range_search,
+                                        collections, budget)
+        
+        # Optionally enrich with MongoDB data
+        if include_full_details and self.use_mongodb:
+            results = self._enrich_with_mongodb(results, budget)
+        
+        return results
+
+    def search_embedding(self, query_embedding: np.ndarray, top_k: int = 50,
+                         min_score: Optional[float] = None,
+                         range_search: bool = False,
+                         collections: Optional[List[str]] = None,
+                         budget: Optional[RequestBudget] = None) -> List[Dict[str, Any]]:
+        """
+        FAISS part of search() for an already encoded query: searches every
+        selected index and merges the hits by score. Shard workers answer the
+        coordinator with this.
+        
+        Args:
+            query_embedding: Normalized (1, dim) float32 query vector.
+            top_k, min_score, range_search, collections: As in search().
+            budget: Latency budget (used by the shard coordinator).
+        
+        Returns:
+            Result dictionaries without MongoDB details.
+        """
+        entries = self._select_collections(collections)
+        
+        if len(entries) == 1 or in_inference_thread():
+            per_collection = [self._infer(
+                self._search_collection, entry, query_embedding, top_k, min_score,
+                range_search) for entry in entries]
+        else:
+            per_collection = list(self.inference_executor.map(
+                profiled(lambda entry: self._search_collection(
+                    entry, query_embedding, top_k, min_score, range_search)),
+                entries
+            ))
+        
+        results = [hit for hits in per_collection for hit in hits]
+        results.sort(key=lambda hit: hit["score"], reverse=True)
+        return results[:top_k]
+
+    def _select_collections(self, collections: Optional[List[str]]) -> List[CollectionIndex]:
+        """Resolves requested collection names, raising ValueError for unknown ones."""
+        if not collections:
+            return list(self.collections.values())
+        
+        missing = [name for name in collections if name not in self.collections]
+        if missing:
+            raise ValueError(
+                f"Collections not loaded: {', '.join(missing)}. "
+                f"Available: {', '.join(self.collections)}"
+            )
+        return [self.collections[name] for name in dict.fromkeys(collections)]
+
+    def _search_collection(self, entry: CollectionIndex, query_embedding: np.ndarray,
+                           top_k: int, min_score: Optional[float],
+                           range_search: bool) -> List[Dict[str, Any]]:
+        """Searches a single collection's index and maps hits to result dicts."""
+        query_embedding = entry.project(query_embedding)
         
         # Search FAISS index
-        distances, indices = self.index.search(query_embedding, top_k)
+        if range_search:
+            threshold = self.DEFAULT_RANGE_MIN_SCORE if min_score is None else min_score
+            query_distances, query_indices = self._range_search(
+                entry.index, query_embedding, threshold, top_k)
+        else:
+            distances, indices = entry.index.search(query_embedding, top_k)
+            # Support single query batch (first element)
+            query_indices = indices[0]
+            query_distances = distances[0]
         
         results = []
-        place_ids_to_fetch = []
-        
-        # Support single query batch (first element)
-        query_indices = indices[0]
-        query_distances = distances[0]
+        id_field = entry.spec.id_field
 
         for i, idx in enumerate(query_indices):
+            if min_score is not None and query_distances[i] < min_score:
+                # Hits are sorted by score, nothing after this one qualifies
+                break
             idx_str = str(idx)  # JSON keys are strings
-            if idx != -1 and idx_str in self.metadata:
-                meta = self.metadata[idx_str]
-                place_id = meta.get("place_id")
+            if idx != -1 and idx_str in entry.metadata:
+                meta = entry.metadata[idx_str]
+                doc_id = meta.get(id_field)
                 results.append({
-                    "place_id": place_id,
+                    "collection": entry.name,
+                    "id": doc_id,
+                    id_field: doc_id,
                     "score": float(query_distances[i]),
                     "metadata": meta,
                     "faiss_index": idx
                 })
-                if place_id:
-                    place_ids_to_fetch.append(place_id)
-        
-        # Optionally enrich with MongoDB data
-        if include_full_details and self.use_mongodb and self.place_service:
-            results = self._enrich_with_mongodb(results, place_ids_to_fetch)
         
         return results
 
-    def _enrich_with_mongodb(self, results: List[Dict[str, Any]], 
-                              place_ids: List[str]) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _range_search(index, query_embedding: np.ndarray, threshold: float,
+                      limit: int):
+        """
+        Returns (scores, indices) of all vectors scoring above threshold,
+        sorted by descending score and truncated to limit.
+        """
+        lims, distances, indices = index.range_search(query_embedding, threshold)
+        distances = distances[lims[0]:lims[1]]
+        indices = indices[lims[0]:lims[1]]
+        order = np.argsort(-distances)[:limit]
+        return distances[order], indices[order]
+
+    def _enrich_with_mongodb(self, results: List[Dict[str, Any]],
+                             budget: Optional[RequestBudget] = None) -> List[Dict[str, Any]]:
         """
-        Enriches search results with full place details from MongoDB.
+        Enriches search results with full details from MongoDB.
+        Issues one query per collection present in the results, in parallel,
+        bounded by what is left of the request budget.
+        
+        Enrichment is skipped (results returned as-is, budget marked degraded)
+        when the circuit breaker is open or the budget is nearly spent.
+        Timeouts, errors and slow calls are reported to the breaker.
         
         Args:
             results: List of search results with basic metadata
-            place_ids: List of place IDs to fetch
+            budget: Latency budget for the request
             
         Returns:
-            Enriched results with full place details
+            Enriched results with full details
         """
-        try:
-            # Fetch all places in one query
-            places = self.place_service.get_places_by_ids(place_ids)
-            
-            # Create a lookup map
-            places_map = {place['_id']: place for place in places}
-            
-            # Enrich results
-            for result in results:
-                place_id = result.get('place_id')
-                if place_id and place_id in places_map:
-                    result['full_details'] = places_map[place_id]
-            
+        budget = budget or RequestBudget(self.latency_budget_s)
+        
+        ids_by_collection: Dict[str, List[str]] = {}
+        for result in results:
+            entry = self.collections[result["collection"]]
+            if result.get("id") and entry.service:
+                ids_by_collection.setdefault(result["collection"], []).append(result["id"])
+        if not ids_by_collection:
             return results
-        except Exception as e:
-            print(f"Error enriching results from MongoDB: {e}")
+        
+        remaining = budget.remaining()
+        if remaining < self.MIN_ENRICHMENT_BUDGET_S:
+            budget.mark_degraded("enrichment_budget_exhausted")
+            return results
+        
+        if not self.enrichment_breaker.allow_request():
+            budget.mark_degraded("enrichment_circuit_open")
             return results
+        
+        def fetch(name: str) -> Dict[str, Dict[str, Any]]:
+            entry = self.collections[name]
+            # Fetch all documents of this collection in one query
+            docs = entry.service.get_documents_by_ids(
+                ids_by_collection[name], entry.spec.enrich_projection, timeout=remaining)
+            return {doc['_id']: doc for doc in docs}
+        
+        started = time.monotonic()
+        futures = {name: self.executor.submit(profiled(fetch), name) for name in ids_by_collection}
+        done, pending = wait(futures.values(), timeout=remaining)
+        elapsed = time.monotonic() - started
+        
+        lookups: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        failed = False
+        for name, future in futures.items():
+            if future not in done:
+                future.cancel()
+                failed = True
+                budget.mark_degraded("enrichment_timeout")
+            elif future.exception() is not None:
+                failed = True
+                budget.mark_degraded("enrichment_error")
+                print(f"Error enriching {name} results from MongoDB: {future.exception()}")
+            else:
+                lookups[name] = future.result()
+        
+        if failed:
+            self.enrichment_breaker.record_failure(f"enrichment failure after {elapsed * 1000:.0f}ms")
+        else:
+            self.enrichment_breaker.record_success(elapsed)
+        
+        # Enrich results
+        for result in results:
+            docs_map = lookups.get(result["collection"], {})
+            doc_id = result.get("id")
+            if doc_id and doc_id in docs_map:
+                result['full_details'] = docs_map[doc_id]
+        
+        return results
 
-    def search_with_full_details(self, query: str, top_k: int = 50) -> List[Dict[str, Any]]:
+    def search_with_full_details(self, query: str, top_k: int = 50,
+                                 collections: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         Convenience method that always includes full MongoDB details.
         
         Args:
             query: The search query.
             top_k: Number of top results to return.
+            collections: Collections to search. None searches every registered one.
+            
+        Returns:
+            List of results with full details from MongoDB.
+        """
+        return self.search(query, top_k=top_k, include_full_details=True,
+                           collections=collections)
+
+    def similar(self, doc_id: str, limit: int = 10, collection: str = "places",
+                category: Optional[str] = None,
+                max_distance_km: Optional[float] = None,
+                include_full_details: bool = False,
+                budget: Optional[RequestBudget] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns documents similar to doc_id from the precomputed neighbor graph.
+        No query encoding or FAISS search happens here.
+        
+        Args:
+            doc_id: MongoDB id of the source document.
+            limit: Maximum number of similar documents to return.
+            collection: Collection the document belongs to.
+            category: Only keep neighbors in this category (case-insensitive).
+            max_distance_km: Only keep neighbors within this distance of the source.
+            include_full_details: If True and MongoDB is available, fetch full details.
+            budget: Latency budget for enrichment (see search()).
+            
+        Returns:
+            Result dictionaries shaped like search() results, or None if the
+            document is not in the index.
+        
+        Raises:
+            ValueError: If the collection has no neighbor graph loaded.
+        """
+        results = self.similar_hits(doc_id, limit, collection, category, max_distance_km, budget)
+        
+        if results and include_full_details and self.use_mongodb:
+            results = self._enrich_with_mongodb(results, budget)
+        
+        return results
+
+    def similar_hits(self, doc_id: str, limit: int = 10, collection: str = "places",
+                     category: Optional[str] = None,
+                     max_distance_km: Optional[float] = None,
+                     budget: Optional[RequestBudget] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Neighbor-graph lookup behind similar(), without MongoDB details.
+        The budget only matters for the shard coordinator's remote lookup.
+        """
+        entry = self._select_collections([collection])[0]
+        if entry.neighbor_indices is None:
+            raise ValueError(
+                f"No neighbor graph loaded for {collection}. Run sync_embeddings.py."
+            )
+        
+        row = entry.id_to_row.get(doc_id)
+        if row is None:
+            return None
+        
+        source = entry.metadata.get(str(row), {})
+        id_field = entry.spec.id_field
+        wanted_category = category.lower() if category else None
+        
+        results = []
+        seen = {doc_id}
+        for idx, score in zip(entry.neighbor_indices[row], entry.neighbor_scores[row]):
+            meta = entry.metadata.get(str(idx))
+            if idx == -1 or not meta:
+                continue
+            neighbor_id = meta.get(id_field)
+            # Skip duplicate rows of the same document (and the source itself)
+            if neighbor_id in seen:
+                continue
+            if wanted_category and (meta.get("category") or "").lower() != wanted_category:
+                continue
+            if max_distance_km is not None:
+                if not (has_coordinates(source.get("lat"), source.get("lon"))
+                        and has_coordinates(meta.get("lat"), meta.get("lon"))):
+                    continue
+                distance = haversine_km(source["lat"], source["lon"], meta["lat"], meta["lon"])
+                if distance > max_distance_km:
+                    continue
+            seen.add(neighbor_id)
+            results.append({
+                "collection": entry.name,
+                "id": neighbor_id,
+                id_field: neighbor_id,
+                "score": float(score),
+                "metadata": meta,
+                "faiss_index": int(idx)
+            })
+            if len(results) >= limit:
+                break
+        
+        return results
+
+    def search_along_route(self, route: List[List[float]], buffer_m: float,
+                           query: Optional[str] = None, top_k: int = 50,
+                           min_score: Optional[float] = None,
+                           collections: Optional[List[str]] = None,
+                           include_full_details: bool = False,
+                           budget: Optional[RequestBudget] = None) -> List[Dict[str, Any]]:
+        """
+        Finds documents within buffer_m metres of a route, optionally ranked by a query.
+        
+        The corridor candidates come from each collection's spatial grid; only
+        those candidates are scored against the query, so no full-index search
+        is needed.
+        
+        Args:
+            route: Ordered [[lat, lon], ...] polyline.
+            buffer_m: Corridor half-width in metres.
+            query: Optional semantic query. Without it, results follow the route order.
+            top_k: Number of results to return.
+            min_score: Drop hits whose cosine similarity is below this value (needs query).
+            collections: Collections to search. None searches every registered one.
+            include_full_details: If True and MongoDB is available, fetch full details.
+            budget: Latency budget for enrichment (see search()).
+            
+        Returns:
+            Result dictionaries like search(), plus distance_m (from the route)
+            and route_offset_m (distance along the route to the closest point).
+        """
+        self._select_collections(collections)
+        polyline = [(float(lat), float(lon)) for lat, lon in route]
+        query_embedding = self.encode_query(query) if query else None
+        
+        results = self.route_hits(polyline, buffer_m, query_embedding, top_k, min_score,
+                                  collections, budget)
+        
+        if include_full_details and self.use_mongodb:
+            results = self._enrich_with_mongodb(results, budget)
+        
+        return results
+
+    def route_hits(self, polyline: List[Tuple[float, float]], buffer_m: float,
+                   query_embedding: Optional[np.ndarray] = None, top_k: int = 50,
+                   min_score: Optional[float] = None,
+                   collections: Optional[List[str]] = None,
+                   budget: Optional[RequestBudget] = None) -> List[Dict[str, Any]]:
+        """
+        Corridor lookup behind search_along_route() for an already encoded
+        (or absent) query, without MongoDB details.
+        """
+        results = []
+        for entry in self._select_collections(collections):
+            corridor = entry.spatial_grid.rows_near_polyline(polyline, buffer_m)
+            if not corridor:
+                continue
             
+            rows = np.fromiter(corridor.keys(), dtype='int64', count=len(corridor))
+            if query_embedding is not None:
+                # Vectors are normalized, so the dot product is the cosine score
+                scores = entry.index.reconstruct_batch(rows) @ entry.project(query_embedding)[0]
+            else:
+                scores = np.zeros(len(rows), dtype='float32')
+            
+            id_field = entry.spec.id_field
+            for row, score in zip(rows, scores):
+                if min_score is not None and query_embedding is not None and score < min_score:
+                    continue
+                meta = entry.metadata.get(str(row), {})
+                distance_m, route_offset_m = corridor[int(row)]
+                results.append({
+                    "collection": entry.name,
+                    "id": meta.get(id_field),
+                    id_field: meta.get(id_field),
+                    "score": float(score),
+                    "metadata": meta,
+                    "faiss_index": int(row),
+                    "distance_m": distance_m,
+                    "route_offset_m": route_offset_m
+                })
+        
+        return self._order_route_hits(results, query_embedding is not None, top_k)
+
+    @staticmethod
+    def _order_route_hits(results: List[Dict[str, Any]], ranked: bool,
+                          top_k: int) -> List[Dict[str, Any]]:
+        """Ranked by score with a query, otherwise in route order."""
+        if ranked:
+            results.sort(key=lambda hit: hit["score"], reverse=True)
+        else:
+            results.sort(key=lambda hit: hit["route_offset_m"])
+        return results[:top_k]
+
+    def places_in_bounds(self, south: float, west: float, north: float, east: float,
+                         zoom: int, collection: str = "places", limit: int = 500,
+                         include_full_details: bool = False,
+                         budget: Optional[RequestBudget] = None) -> Dict[str, Any]:
+        """
+        Map viewport query: what a map showing the bounding box at this zoom
+        should draw.
+        
+        Up to CLUSTER_MAX_ZOOM, points are answered from the spatial grid's
+        precomputed clusters; cells holding a single point are returned as
+        places. Above it, every place in the box is returned.
+        
+        Args:
+            south, west, north, east: Bounding box in degrees (west > east
+                means the box crosses the antimeridian)
+            zoom: Web-map zoom level (0 = whole world)
+            collection: Collection to show
+            limit: Maximum clusters, and maximum places, returned
+            include_full_details: Whether to fetch the places' MongoDB documents
+            budget: Latency budget for the request
+        
         Returns:
-            List of results with full place details from MongoDB.
+            {"clustered", "total" (points in the box), "truncated",
+             "clusters": [{"lat", "lon", "count", "category", ...}],
+             "places": [result dicts like search(), without a score]}
+        """
+        found = self.bounds_hits(south, west, north, east, zoom, collection, limit, budget)
+        if found["clustered"]:
+            found["places"] = [cluster["place"] for cluster in found["clusters"]
+                               if cluster["count"] == 1]
+            found["clusters"] = [cluster for cluster in found["clusters"] if cluster["count"] > 1]
+        for cluster in found["clusters"]:
+            cluster.pop("place", None)
+        
+        if found["places"] and include_full_details and self.use_mongodb:
+            found["places"] = self._enrich_with_mongodb(found["places"], budget)
+        
+        return found
+
+    def bounds_hits(self, south: float, west: float, north: float, east: float,
+                    zoom: int, collection: str = "places", limit: int = 500,
+                    budget: Optional[RequestBudget] = None) -> Dict[str, Any]:
         """
-        return self.search(query, top_k=top_k, include_full_details=True)
+        Grid lookup behind places_in_bounds(), without MongoDB details.
+        Clustered answers list every cell, single points included (their
+        result dict is in the cluster's "place"), largest first with ties
+        broken by cell. Unclustered answers list points ordered by id, so
+        shard answers merge into the same order.
+        """
+        entry = self._select_collections([collection])[0]
+        # A box crossing the antimeridian is looked up as two boxes
+        lon_ranges = [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+        
+        if zoom <= CLUSTER_MAX_ZOOM:
+            clusters = [cluster for lon_min, lon_max in lon_ranges
+                        for cluster in entry.spatial_grid.clusters_in_bbox(
+                            south, lon_min, north, lon_max, zoom)]
+            clusters.sort(key=lambda cluster: (-cluster["count"], cluster["cell"]))
+            total = sum(cluster["count"] for cluster in clusters)
+            truncated = len(clusters) > limit
+            clusters = clusters[:limit]
+            for cluster in clusters:
+                row = cluster.pop("row")
+                cluster["place"] = self._bounds_hit(entry, row) if cluster["count"] == 1 else None
+            return {"clustered": True, "total": total, "truncated": truncated,
+                    "clusters": clusters, "places": []}
+        
+        places = [self._bounds_hit(entry, row) for lon_min, lon_max in lon_ranges
+                  for row in entry.spatial_grid.rows_in_bbox(south, lon_min, north, lon_max)]
+        places.sort(key=bounds_place_order)
+        return {"clustered": False, "total": len(places), "truncated": len(places) > limit,
+                "clusters": [], "places": places[:limit]}
+
+    @staticmethod
+    def _bounds_hit(entry: CollectionIndex, row: int) -> Dict[str, Any]:
+        meta = entry.metadata.get(str(row), {})
+        id_field = entry.spec.id_field
+        return {
+            "collection": entry.name,
+            "id": meta.get(id_field),
+            id_field: meta.get(id_field),
+            "metadata": meta,
+            "faiss_index": int(row)
+        }
+
+    def collection_sizes(self) -> Dict[str, int]:
+        """Vectors per loaded collection."""
+        return {name: entry.index.ntotal for name, entry in self.collections.items()}
 
     def get_closest(self, query: str, include_full_details: bool = False) -> Optional[Dict[str, Any]]:
         """
@@ -181,17 +858,45 @@ class SearchService:
             return results[0]
         return None
 
-    def get_place_details(self, place_id: str) -> Optional[Dict[str, Any]]:
+    def get_place_details(self, place_id: str,
+                          budget: Optional[RequestBudget] = None) -> Optional[Dict[str, Any]]:
         """
         Fetches full place details from MongoDB by ID.
         
+        The lookup is bounded by the request budget and reported to the
+        enrichment circuit breaker like the search enrichment.
+        
         Args:
             place_id: The place's MongoDB ObjectId as string.
+            budget: Latency budget for the request
             
         Returns:
             Full place document or None if not found.
+        
+        Raises:
+            CircuitOpenError: If MongoDB calls are currently being skipped.
+            DependencyUnavailableError: If the lookup failed or timed out.
         """
         if not self.use_mongodb or not self.place_service:
             return None
         
-        return self.place_service.get_place_by_id(place_id)
+        budget = budget or RequestBudget(self.latency_budget_s)
+        if not self.enrichment_breaker.allow_request():
+            raise CircuitOpenError(self.enrichment_breaker.retry_after())
+        
+        started = time.monotonic()
+        try:
+            docs = self.place_service.get_documents_by_ids([place_id], timeout=budget.remaining())
+        except Exception as e:
+            elapsed = time.monotonic() - started
+            self.enrichment_breaker.record_failure(f"place lookup failure after {elapsed * 1000:.0f}ms")
+            raise DependencyUnavailableError(f"Place lookup failed: {e}") from e
+        self.enrichment_breaker.record_success(time.monotonic() - started)
+        return docs[0] if docs else None
+
+    def close(self):
+        """Flushes background work and releases worker threads."""
+        if self.embedding_store is not None:
+            self.embedding_store.close()
+        self.executor.shutdown(wait=False)
+        self.inference_executor.shutdown(wait=False)
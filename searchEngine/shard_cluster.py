@@ -0,0 +1,116 @@
+"""
+Run a sharded search deployment on one host: one worker process per shard
+plus a coordinator serving the public API.
+
+Usage:
+    python sync_embeddings.py --shards 3      # build the shard bundles first
+    python shard_cluster.py --shards 3        # coordinator on :8000, workers on :8101-8103
+    python shard_cluster.py --shards 3 --port 9000 --worker-port 9100
+
+Each worker is a regular main.py process with SEARCH_SHARD_ROLE=worker and
+SEARCH_BUNDLES_DIR set to its shard directory; the coordinator gets the worker
+URLs in SEARCH_SHARD_URLS. Other settings (MONGODB_URI, thread budget, ...)
+are inherited from the environment. Workers can equally run on other hosts:
+start them the same way and point SEARCH_SHARD_URLS at them.
+
+The host's cores are split evenly between the coordinator (which encodes the
+queries) and the workers (which run the FAISS searches): each process gets
+SEARCH_CPUS = cores // (shards + 1) and derives its thread budget from that,
+unless SEARCH_CPUS is already set.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from sharding import shard_bundles_dir
+from thread_budget import available_cpus
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BUNDLES_DIR = os.getenv("SEARCH_BUNDLES_DIR", os.path.join(BASE_DIR, 'data', 'bundles'))
+
+
+def start_server(host: str, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    """Starts main:app under uvicorn with extra environment variables."""
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", host, "--port", str(port)],
+        cwd=BASE_DIR,
+        env={**os.environ, **env}
+    )
+
+
+def wait_healthy(url: str, process: subprocess.Popen, timeout_s: float = 300.0) -> bool:
+    """Polls /health until the service reports healthy or the process exits."""
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            if httpx.get(f"{url}/health", timeout=2.0).json().get("status") == "healthy":
+                return True
+        except (httpx.HTTPError, ValueError):
+            pass
+        time.sleep(0.5)
+    return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run shard workers and a coordinator locally.")
+    parser.add_argument("--shards", type=int, default=int(os.getenv("SYNC_SHARDS", 2)),
+                        help="Number of shards (as built by sync_embeddings.py --shards)")
+    parser.add_argument("--bundles-dir", default=BUNDLES_DIR,
+                        help="Directory holding the shard-<i>-of-<n> bundle directories")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)),
+                        help="Coordinator port")
+    parser.add_argument("--worker-port", type=int, default=8100,
+                        help="Workers listen on worker-port + 1 ... worker-port + shards")
+    args = parser.parse_args()
+
+    # Share of the host for each process; an explicit SEARCH_CPUS is inherited as is
+    cpu_env = {} if os.getenv("SEARCH_CPUS") else {
+        "SEARCH_CPUS": str(max(1, available_cpus() // (args.shards + 1)))}
+
+    processes: List[subprocess.Popen] = []
+    try:
+        urls = []
+        for shard in range(args.shards):
+            shard_dir = shard_bundles_dir(args.bundles_dir, shard, args.shards)
+            if not os.path.isdir(shard_dir):
+                print(f"❌ {shard_dir} not found. Run: python sync_embeddings.py --shards {args.shards}")
+                sys.exit(1)
+            port = args.worker_port + shard + 1
+            print(f"🧩 Starting shard {shard + 1}/{args.shards} on :{port} ({shard_dir})")
+            processes.append(start_server("127.0.0.1", port, {
+                "SEARCH_SHARD_ROLE": "worker",
+                "SEARCH_BUNDLES_DIR": shard_dir,
+                # The coordinator caches query embeddings; workers only get vectors
+                "QUERY_EMBEDDING_STORE_DIR": "",
+                "SEARCH_TRAFFIC_LOG": "",
+                "RESPONSE_COMPRESSION": "0",
+                **cpu_env
+            }))
+            urls.append(f"http://127.0.0.1:{port}")
+
+        for url, process in zip(urls, processes):
+            if not wait_healthy(url, process):
+                print(f"❌ Shard worker at {url} did not become healthy")
+                sys.exit(1)
+
+        print(f"🚀 Starting coordinator on :{args.port}")
+        coordinator = start_server("0.0.0.0", args.port,
+                                   {"SEARCH_SHARD_URLS": ",".join(urls), **cpu_env})
+        processes.append(coordinator)
+        coordinator.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
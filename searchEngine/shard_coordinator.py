@@ -0,0 +1,329 @@
+"""
+Shard Coordinator
+Scatter-gather front end for a corpus split across shard workers (see
+sharding.py). The coordinator encodes each query once, sends the vector to
+every shard, merges the per-shard top-k by score and enriches the merged
+results from MongoDB like a single-node SearchService.
+
+Each shard is a regular main.py instance started with SEARCH_SHARD_ROLE=worker
+and SEARCH_BUNDLES_DIR pointing at its shard directory. A shard that does not
+answer within the per-shard timeout is left out and the response is marked
+degraded ("shard_timeout" / "shard_error") instead of failing the request.
+"""
+from concurrent.futures import wait
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from artifact_bundle import BundleMismatchError
+from embedding_store import QueryEmbeddingStore
+from profiling import profiled
+from resilience import RequestBudget
+from search_collections import CollectionSpec, get_collection_spec
+from search_service import MONGODB_AVAILABLE, SearchService, bounds_place_order
+from sharding import ShardUnavailableError, encode_vector, shard_for_id
+from spatial_index import CLUSTER_MAX_ZOOM
+
+if MONGODB_AVAILABLE:
+    from mongodb_service import CollectionService, PlaceService
+
+
+class RemoteCollection:
+    """A collection served by the shard workers; stands in for CollectionIndex."""
+
+    def __init__(self, spec: CollectionSpec, count: int = 0):
+        self.spec = spec
+        self.count = count  # Vectors across every shard
+        self.service = None  # CollectionService, set when MongoDB is enabled
+
+    @property
+    def name(self) -> str:
+        return self.spec.name
+
+
+class ShardedSearchService(SearchService):
+    """
+    SearchService whose FAISS lookups run on remote shard workers.
+
+    Query encoding, the embedding store and MongoDB enrichment stay in the
+    coordinator; search_embedding(), route_hits(), similar_hits() and
+    bounds_hits() are answered by the shards.
+    """
+
+    # Per-shard timeout when the request budget allows more
+    DEFAULT_SHARD_TIMEOUT_S = 0.5
+    # Clusters requested from each shard per viewport. Cells are merged across
+    # shards before the response limit is applied, so shards must not cut
+    # them at that limit; a viewport rarely covers more than a few hundred cells.
+    SHARD_CLUSTER_LIMIT = 10000
+
+    def __init__(self, shard_urls: List[str], shard_timeout_s: float = DEFAULT_SHARD_TIMEOUT_S,
+                 **kwargs):
+        """
+        Args:
+            shard_urls: Base URLs of the shard workers, in any order
+            shard_timeout_s: Longest wait for any one shard per request
+                (capped by what is left of the request budget)
+            **kwargs: Passed to SearchService (model_name, use_mongodb, ...)
+        """
+        self.shard_urls = [url.rstrip("/") for url in shard_urls]
+        self.shard_timeout_s = shard_timeout_s
+        # Shard workers ordered by shard index, filled in by load_resources()
+        self.shards: List[httpx.Client] = []
+        self.shard_info: List[Dict[str, Any]] = []
+        super().__init__(None, None, **kwargs)
+
+    def load_resources(self):
+        """Loads the model and MongoDB services and discovers the shard workers."""
+        print(f"Loading SentenceTransformer model {self.model_name}...")
+        self.model = SentenceTransformer(self.model_name)
+        dimension = self.model.get_sentence_embedding_dimension()
+
+        self._connect_shards(dimension)
+
+        if self.embedding_store_dir:
+            self.embedding_store = QueryEmbeddingStore(
+                self.embedding_store_dir, self.model_name, dimension
+            )
+
+        if self.use_mongodb:
+            try:
+                self.place_service = PlaceService()
+                for entry in self.collections.values():
+                    entry.service = (self.place_service if entry.name == "places"
+                                     else CollectionService(entry.name))
+                print("✅ MongoDB service initialized for enriched results.")
+            except Exception as e:
+                print(f"⚠️  Could not initialize MongoDB: {e}")
+                print("   Falling back to local metadata only.")
+                self.use_mongodb = False
+
+    def _connect_shards(self, dimension: int):
+        """
+        Fetches /internal/shard/info from every worker and checks that together
+        they form one complete, compatible set of shards.
+
+        Raises:
+            BundleMismatchError: If a shard was built with another model or
+                dimension, or the shard set is incomplete.
+        """
+        by_index: Dict[int, Tuple[httpx.Client, Dict[str, Any]]] = {}
+        for url in self.shard_urls:
+            # Hits are small and the link is local: skip response compression
+            client = httpx.Client(base_url=url, timeout=self.shard_timeout_s,
+                                  headers={"Accept-Encoding": "identity"})
+            info = client.get("/internal/shard/info", timeout=10.0).raise_for_status().json()
+            if info["model_name"] != self.model_name or info["dimension"] != dimension:
+                raise BundleMismatchError(
+                    f"Shard {url} serves {info['model_name']} ({info['dimension']}d), "
+                    f"coordinator uses {self.model_name} ({dimension}d)"
+                )
+            shard = info.get("shard") or {"index": 0, "count": 1}
+            if shard["count"] != len(self.shard_urls) or shard["index"] in by_index:
+                raise BundleMismatchError(
+                    f"Shard {url} is shard {shard['index']} of {shard['count']}, "
+                    f"but {len(self.shard_urls)} shard URLs were configured"
+                )
+            by_index[shard["index"]] = (client, info)
+            print(f"   Shard {shard['index'] + 1}/{shard['count']} at {url}: "
+                  f"bundle {info.get('bundle_version')}, {sum(info['collections'].values())} vectors")
+
+        self.shards = [by_index[index][0] for index in sorted(by_index)]
+        self.shard_info = [by_index[index][1] for index in sorted(by_index)]
+
+        for info in self.shard_info:
+            for name, count in info["collections"].items():
+                entry = self.collections.get(name)
+                if entry is None:
+                    entry = self.collections[name] = RemoteCollection(get_collection_spec(name))
+                entry.count += count
+        if "places" not in self.collections:
+            raise FileNotFoundError("No shard serves a places index")
+        self.bundle_manifest = {
+            "version": ",".join(str(info.get("bundle_version")) for info in self.shard_info)
+        }
+
+    def _scatter(self, method: str, path: str, budget: Optional[RequestBudget],
+                 **request_kwargs) -> List[Any]:
+        """
+        Sends the same request to every shard in parallel and returns the
+        decoded responses of the shards that answered in time.
+
+        Raises:
+            ShardUnavailableError: If no shard answered.
+        """
+        budget = budget or RequestBudget(self.latency_budget_s)
+        timeout = min(self.shard_timeout_s, budget.remaining())
+        if timeout <= 0:
+            budget.mark_degraded("shard_timeout")
+            raise ShardUnavailableError("Request budget exhausted before the shard fan-out")
+
+        def call(client: httpx.Client):
+            return client.request(method, path, timeout=timeout, **request_kwargs).raise_for_status().json()
+
+        futures = [self.executor.submit(profiled(call), client) for client in self.shards]
+        done, _ = wait(futures, timeout=timeout)
+
+        answers = []
+        for shard, future in enumerate(futures):
+            if future not in done:
+                future.cancel()
+                budget.mark_degraded("shard_timeout")
+                print(f"⚠️  Shard {shard} timed out after {timeout * 1000:.0f}ms")
+            elif future.exception() is not None:
+                error = future.exception()
+                if isinstance(error, httpx.TimeoutException):
+                    budget.mark_degraded("shard_timeout")
+                else:
+                    budget.mark_degraded("shard_error")
+                print(f"⚠️  Shard {shard} failed: {error}")
+            else:
+                answers.append(future.result())
+
+        if not answers:
+            raise ShardUnavailableError(f"None of the {len(self.shards)} shards answered")
+        return answers
+
+    def search_embedding(self, query_embedding: np.ndarray, top_k: int = 50,
+                         min_score: Optional[float] = None,
+                         range_search: bool = False,
+                         collections: Optional[List[str]] = None,
+                         budget: Optional[RequestBudget] = None) -> List[Dict[str, Any]]:
+        """Searches every shard with the query vector and merges the hits by score."""
+        names = [entry.name for entry in self._select_collections(collections)]
+        answers = self._scatter("POST", "/internal/shard/search", budget, json={
+            "vector": encode_vector(query_embedding),
+            "top_k": top_k,
+            "min_score": min_score,
+            "range_search": range_search,
+            "collections": names
+        })
+        results = [hit for hits in answers for hit in hits]
+        results.sort(key=lambda hit: hit["score"], reverse=True)
+        return results[:top_k]
+
+    def route_hits(self, polyline: List[Tuple[float, float]], buffer_m: float,
+                   query_embedding: Optional[np.ndarray] = None, top_k: int = 50,
+                   min_score: Optional[float] = None,
+                   collections: Optional[List[str]] = None,
+                   budget: Optional[RequestBudget] = None) -> List[Dict[str, Any]]:
+        """Runs the corridor lookup on every shard and merges the hits."""
+        names = [entry.name for entry in self._select_collections(collections)]
+        answers = self._scatter("POST", "/internal/shard/along-route", budget, json={
+            "route": [list(point) for point in polyline],
+            "buffer_m": buffer_m,
+            "vector": encode_vector(query_embedding) if query_embedding is not None else None,
+            "top_k": top_k,
+            "min_score": min_score,
+            "collections": names
+        })
+        results = [hit for hits in answers for hit in hits]
+        return self._order_route_hits(results, query_embedding is not None, top_k)
+
+    def similar_hits(self, doc_id: str, limit: int = 10, collection: str = "places",
+                     category: Optional[str] = None,
+                     max_distance_km: Optional[float] = None,
+                     budget: Optional[RequestBudget] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Asks the shard owning doc_id for its neighbors. Neighbor graphs are
+        built per shard, so recommendations come from the same shard.
+
+        If the owning shard does not answer within the budget, the budget is
+        marked degraded and no recommendations are returned.
+        """
+        self._select_collections([collection])
+        budget = budget or RequestBudget(self.latency_budget_s)
+        shard = shard_for_id(doc_id, len(self.shards))
+        params = {"limit": limit}
+        if category:
+            params["category"] = category
+        if max_distance_km is not None:
+            params["max_distance_km"] = max_distance_km
+
+        timeout = min(self.shard_timeout_s, budget.remaining())
+        if timeout <= 0:
+            budget.mark_degraded("shard_timeout")
+            return []
+        try:
+            response = self.shards[shard].get(f"/internal/shard/similar/{collection}/{doc_id}",
+                                              params=params, timeout=timeout)
+        except httpx.TimeoutException:
+            budget.mark_degraded("shard_timeout")
+            print(f"⚠️  Shard {shard} timed out after {timeout * 1000:.0f}ms")
+            return []
+        except httpx.HTTPError as e:
+            budget.mark_degraded("shard_error")
+            print(f"⚠️  Shard {shard} failed: {e}")
+            return []
+        if response.status_code == 404:
+            return None
+        if response.status_code == 400:
+            raise ValueError(response.json().get("detail"))
+        return response.raise_for_status().json()
+
+    def bounds_hits(self, south: float, west: float, north: float, east: float,
+                    zoom: int, collection: str = "places", limit: int = 500,
+                    budget: Optional[RequestBudget] = None) -> Dict[str, Any]:
+        """
+        Runs the viewport lookup on every shard and merges the answers.
+
+        Points come back from each shard ordered by id, so merging them by id
+        and keeping the first `limit` gives the single-node answer. Shards use
+        the same cluster cells, so clusters are merged per cell (summed counts,
+        weighted centroid) before `limit` is applied; shards return up to
+        SHARD_CLUSTER_LIMIT cells each, and counts are only partial when one
+        of them had more (truncated is set). The dominant category is picked
+        from the shards' dominant categories, so it is approximate for mixed
+        cells.
+        """
+        self._select_collections([collection])
+        clustered = zoom <= CLUSTER_MAX_ZOOM
+        answers = self._scatter("GET", "/internal/shard/in-bounds", budget, params={
+            "south": south, "west": west, "north": north, "east": east,
+            "zoom": zoom, "collection": collection,
+            "limit": max(limit, self.SHARD_CLUSTER_LIMIT) if clustered else limit
+        })
+        total = sum(answer["total"] for answer in answers)
+        truncated = any(answer["truncated"] for answer in answers)
+
+        if not clustered:
+            places = sorted((hit for answer in answers for hit in answer["places"]),
+                            key=bounds_place_order)
+            return {"clustered": False, "total": total, "truncated": truncated or len(places) > limit,
+                    "clusters": [], "places": places[:limit]}
+
+        merged: Dict[Tuple[int, ...], Dict[str, Any]] = {}
+        for answer in answers:
+            for cluster in answer["clusters"]:
+                key = tuple(cluster["cell"])
+                current = merged.get(key)
+                if current is None:
+                    merged[key] = cluster
+                    continue
+                count = current["count"] + cluster["count"]
+                for axis in ("lat", "lon"):
+                    current[axis] = round((current[axis] * current["count"] +
+                                           cluster[axis] * cluster["count"]) / count, 6)
+                if cluster["category"] == current["category"]:
+                    current["category_count"] += cluster["category_count"]
+                elif cluster["category_count"] > current["category_count"]:
+                    current["category"] = cluster["category"]
+                    current["category_count"] = cluster["category_count"]
+                current["count"] = count
+                current["place"] = None
+
+        clusters = sorted(merged.values(), key=lambda cluster: (-cluster["count"], cluster["cell"]))
+        return {"clustered": True, "total": total, "truncated": truncated or len(clusters) > limit,
+                "clusters": clusters[:limit], "places": []}
+
+    def collection_sizes(self) -> Dict[str, int]:
+        """Vectors per collection, summed over the shards."""
+        return {name: entry.count for name, entry in self.collections.items()}
+
+    def close(self):
+        """Closes the shard connections, then the local resources."""
+        for client in self.shards:
+            client.close()
+        super().close()
@@ -0,0 +1,43 @@
+"""
+Corpus Sharding
+Deterministic assignment of documents to shards, the on-disk layout of
+sharded bundles, and the wire format for query vectors sent to shard workers.
+
+Layout (sync_embeddings.py --shards 3):
+    bundles/
+        shard-0-of-3/    a regular bundle directory (CURRENT + versions)
+        shard-1-of-3/
+        shard-2-of-3/
+"""
+import base64
+import hashlib
+import os
+
+import numpy as np
+
+
+def shard_for_id(doc_id: str, shard_count: int) -> int:
+    """Shard holding a document (stable across processes and Python versions)."""
+    if shard_count <= 1:
+        return 0
+    digest = hashlib.sha1(str(doc_id).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+def shard_bundles_dir(bundles_dir: str, shard: int, shard_count: int) -> str:
+    """Bundles directory of one shard."""
+    return os.path.join(bundles_dir, f"shard-{shard}-of-{shard_count}")
+
+
+def encode_vector(vector: np.ndarray) -> str:
+    """Packs a float32 query vector as base64 (compact and exact, unlike JSON floats)."""
+    return base64.b64encode(np.ascontiguousarray(vector, dtype='<f4').tobytes()).decode("ascii")
+
+
+def decode_vector(payload: str) -> np.ndarray:
+    """Unpacks encode_vector() output into a (1, dim) float32 array."""
+    return np.frombuffer(base64.b64decode(payload), dtype='<f4').astype('float32').reshape(1, -1)
+
+
+class ShardUnavailableError(Exception):
+    """Raised by the coordinator when no shard answered a request in time."""
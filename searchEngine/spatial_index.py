@@ -0,0 +1,244 @@
+"""
+Spatial Grid Index
+Buckets the lat/lon stored in metadata into fixed-size grid cells so geographic
+queries only look at nearby points instead of scanning the whole catalogue.
+
+For map views the grid also keeps pre-aggregated clusters per zoom level
+(count, centroid and dominant category per cell), so a viewport at low zoom
+is answered from a few hundred cells instead of every point inside it.
+"""
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from geo_utils import EARTH_RADIUS_KM, has_coordinates
+
+METERS_PER_DEGREE = EARTH_RADIUS_KM * 1000 * math.pi / 180
+
+# ~1.1 km of latitude; a handful of cells covers a typical heritage walk buffer
+DEFAULT_CELL_DEG = 0.01
+
+# Clusters are precomputed for zoom levels 0..CLUSTER_MAX_ZOOM (web-map zooms)
+CLUSTER_MAX_ZOOM = 14
+# Cluster cell edge at zoom 0: a quarter of a 256px tile, halved at every zoom level
+CLUSTER_CELL_DEG_Z0 = 90.0
+
+
+def cluster_cell_deg(zoom: int) -> float:
+    """Cluster cell size in degrees at a map zoom level."""
+    return CLUSTER_CELL_DEG_Z0 / (2 ** zoom)
+
+
+class SpatialGrid:
+    """Uniform lat/lon grid over the FAISS ids of one collection."""
+
+    def __init__(self, metadata: Dict[str, Dict], cell_deg: float = DEFAULT_CELL_DEG):
+        """
+        Builds the grid from a metadata map ({faiss_id: {"lat", "lon", ...}}).
+
+        Args:
+            metadata: Collection metadata keyed by FAISS id (string keys)
+            cell_deg: Cell size in degrees
+        """
+        self.cell_deg = cell_deg
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+
+        rows, lats, lons, categories = [], [], [], []
+        if hasattr(metadata, "column"):
+            # Array-backed bundle metadata: read the coordinate columns directly
+            lat_column, lon_column = metadata.column("lat"), metadata.column("lon")
+            category_column = metadata.column("category")
+            points = [] if lat_column is None or lon_column is None else zip(
+                range(len(metadata)), lat_column.tolist(), lon_column.tolist(),
+                category_column.tolist() if category_column is not None else [""] * len(metadata)
+            )
+        else:
+            points = ((int(idx_str), meta.get("lat"), meta.get("lon"), meta.get("category"))
+                      for idx_str, meta in metadata.items())
+        
+        for row, lat, lon, category in points:
+            if not has_coordinates(lat, lon) or math.isnan(lat) or math.isnan(lon):
+                continue
+            self.cells.setdefault(self._cell_of(lat, lon), []).append(row)
+            rows.append(row)
+            lats.append(lat)
+            lons.append(lon)
+            categories.append(category or "")
+
+        self.rows = np.array(rows, dtype='int64')
+        self.lats = np.array(lats, dtype='float64')
+        self.lons = np.array(lons, dtype='float64')
+        # Category of each point as an index into category_names
+        self.category_names, self.category_codes = np.unique(
+            np.array(categories, dtype=str), return_inverse=True)
+        # FAISS id -> position in the coordinate arrays
+        self._position = {row: pos for pos, row in enumerate(rows)}
+        
+        self.cluster_levels = [self._build_cluster_level(zoom)
+                               for zoom in range(CLUSTER_MAX_ZOOM + 1)]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _cell_of(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def rows_in_bbox(self, south: float, west: float, north: float, east: float) -> List[int]:
+        """Returns FAISS ids of points inside the bounding box (inclusive)."""
+        min_i, min_j = self._cell_of(south, west)
+        max_i, max_j = self._cell_of(north, east)
+        if (max_i - min_i + 1) * (max_j - min_j + 1) > len(self.cells):
+            # Box spans more cells than are occupied (zoomed-out map): scan the points
+            inside = (self.lats >= south) & (self.lats <= north) & \
+                     (self.lons >= west) & (self.lons <= east)
+            return self.rows[inside].tolist()
+        found = []
+        for i in range(min_i, max_i + 1):
+            for j in range(min_j, max_j + 1):
+                for row in self.cells.get((i, j), ()):
+                    pos = self._position[row]
+                    if south <= self.lats[pos] <= north and west <= self.lons[pos] <= east:
+                        found.append(row)
+        return found
+
+    def _build_cluster_level(self, zoom: int) -> Dict[str, np.ndarray]:
+        """
+        Aggregates every point into the cluster cells of one zoom level.
+
+        Returns:
+            Column arrays, one entry per occupied cell sorted by (cell_i, cell_j):
+            cell_i/cell_j, count, lat/lon (centroid), category (code of the most
+            common category), category_count and row (FAISS id of one point).
+        """
+        cell_deg = cluster_cell_deg(zoom)
+        cell_i = np.floor(self.lats / cell_deg).astype('int64')
+        cell_j = np.floor(self.lons / cell_deg).astype('int64')
+        # One sortable key per cell; |cell_j| < 2**31 at every precomputed zoom
+        keys = cell_i * (2 ** 32) + cell_j
+        _, first, inverse, counts = np.unique(keys, return_index=True,
+                                              return_inverse=True, return_counts=True)
+
+        # Dominant category: count (cell, category) pairs and keep the largest per cell
+        category_count = max(len(self.category_names), 1)
+        pairs, pair_counts = np.unique(inverse * category_count + self.category_codes,
+                                       return_counts=True)
+        pair_cells = pairs // category_count
+        order = np.lexsort((-pair_counts, pair_cells))
+        best = order[np.diff(pair_cells[order], prepend=-1) != 0]
+
+        # Compact dtypes: high zoom levels have about one cell per point
+        return {
+            "cell_i": cell_i[first].astype('int32'),
+            "cell_j": cell_j[first].astype('int32'),
+            "count": counts.astype('int32'),
+            "lat": (np.bincount(inverse, weights=self.lats) / np.maximum(counts, 1)).astype('float32'),
+            "lon": (np.bincount(inverse, weights=self.lons) / np.maximum(counts, 1)).astype('float32'),
+            "category": (pairs[best] % category_count).astype('int32'),
+            "category_count": pair_counts[best].astype('int32'),
+            "row": self.rows[first]
+        }
+
+    def clusters_in_bbox(self, south: float, west: float, north: float, east: float,
+                         zoom: int) -> List[Dict]:
+        """
+        Returns the precomputed clusters whose centroid lies in the bounding box.
+
+        Args:
+            south, west, north, east: Bounding box in degrees
+            zoom: Map zoom level, clamped to 0..CLUSTER_MAX_ZOOM
+
+        Returns:
+            [{"cell", "lat", "lon", "count", "category", "category_count", "row"}]
+            where row is the FAISS id of a point in the cell (the point itself
+            when count is 1).
+        """
+        zoom = min(max(int(zoom), 0), CLUSTER_MAX_ZOOM)
+        level = self.cluster_levels[zoom]
+        # Cells are sorted by cell_i, so the latitude band is a contiguous slice
+        cell_deg = cluster_cell_deg(zoom)
+        start, stop = np.searchsorted(
+            level["cell_i"], [math.floor(south / cell_deg), math.floor(north / cell_deg) + 1])
+        lat, lon = level["lat"][start:stop], level["lon"][start:stop]
+        inside = start + np.flatnonzero((lat >= south) & (lat <= north) &
+                                        (lon >= west) & (lon <= east))
+        return [{
+            "cell": [zoom, int(level["cell_i"][pos]), int(level["cell_j"][pos])],
+            "lat": round(float(level["lat"][pos]), 6),
+            "lon": round(float(level["lon"][pos]), 6),
+            "count": int(level["count"][pos]),
+            "category": str(self.category_names[level["category"][pos]]) or None,
+            "category_count": int(level["category_count"][pos]),
+            "row": int(level["row"][pos])
+        } for pos in inside]
+
+    def rows_near_polyline(self, polyline: List[Tuple[float, float]],
+                           buffer_m: float) -> Dict[int, Tuple[float, float]]:
+        """
+        Finds every point within buffer_m metres of a polyline.
+
+        Each segment only tests the points in the grid cells its buffered
+        bounding box touches, so cost grows with the route length rather than
+        the catalogue size.
+
+        Args:
+            polyline: Ordered [(lat, lon), ...] route vertices (one vertex = a circle)
+            buffer_m: Corridor half-width in metres
+
+        Returns:
+            {faiss_id: (distance_from_route_m, offset_along_route_m)} where the
+            offset is measured from the first vertex to the closest route point.
+        """
+        if not polyline or len(self.rows) == 0:
+            return {}
+
+        # Local equirectangular projection around the route, in metres
+        lat0 = math.radians(sum(lat for lat, _ in polyline) / len(polyline))
+        x_scale = METERS_PER_DEGREE * max(math.cos(lat0), 1e-6)
+        y_scale = METERS_PER_DEGREE
+        buffer_lat = buffer_m / y_scale
+        buffer_lon = buffer_m / x_scale
+
+        points = polyline if len(polyline) > 1 else [polyline[0], polyline[0]]
+        best: Dict[int, Tuple[float, float]] = {}
+        route_offset = 0.0
+
+        for (lat1, lon1), (lat2, lon2) in zip(points, points[1:]):
+            ax, ay = lon1 * x_scale, lat1 * y_scale
+            bx, by = lon2 * x_scale, lat2 * y_scale
+            dx, dy = bx - ax, by - ay
+            seg_len_sq = dx * dx + dy * dy
+            seg_len = math.sqrt(seg_len_sq)
+
+            candidates = self.rows_in_bbox(
+                min(lat1, lat2) - buffer_lat, min(lon1, lon2) - buffer_lon,
+                max(lat1, lat2) + buffer_lat, max(lon1, lon2) + buffer_lon
+            )
+            if candidates:
+                positions = np.array([self._position[row] for row in candidates])
+                px = self.lons[positions] * x_scale
+                py = self.lats[positions] * y_scale
+
+                if seg_len_sq > 0:
+                    t = np.clip(((px - ax) * dx + (py - ay) * dy) / seg_len_sq, 0.0, 1.0)
+                else:
+                    t = np.zeros(len(positions))
+                distances = np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+                for row, distance, frac in zip(candidates, distances, t):
+                    if distance > buffer_m:
+                        continue
+                    current = best.get(row)
+                    if current is None or distance < current[0]:
+                        best[row] = (float(distance), route_offset + float(frac) * seg_len)
+
+            route_offset += seg_len
+
+        return best
+
+    def coordinates_of(self, row: int) -> Optional[Tuple[float, float]]:
+        """Returns (lat, lon) for a FAISS id, or None if it has no coordinates."""
+        pos = self._position.get(row)
+        if pos is None:
+            return None
+        return float(self.lats[pos]), float(self.lons[pos])
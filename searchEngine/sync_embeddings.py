@@ -1,11 +1,30 @@
 """
 Script to regenerate FAISS embeddings from MongoDB data.
 Run this script whenever your MongoDB data changes significantly.
+
+Every run publishes a new versioned bundle under data/bundles (see
+artifact_bundle.py). Collections that are not rebuilt are carried over from
+the current bundle.
+
+Usage:
+    python sync_embeddings.py                 # places, craftsmen and events
+    python sync_embeddings.py places events   # only the listed collections
+    python sync_embeddings.py --workers 4 --batch-size 256
+    python sync_embeddings.py --shards 3      # one bundle per shard (see sharding.py)
+    python sync_embeddings.py --project-dim 128   # PCA-projected indexes (see projection.py)
+
+Documents are streamed from the cursor in batches and encoded by one worker
+process per CPU core (SYNC_ENCODE_WORKERS) while the next batches are fetched.
 """
-import json
+import argparse
+import multiprocessing
 import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import faiss
 import numpy as np
+from typing import List, Optional, Tuple
 from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
 
@@ -13,121 +32,425 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import MongoDB service
-from mongodb_service import PlaceService
+from mongodb_service import CollectionService, PlaceService
+from search_collections import CollectionSpec, get_collection_spec, list_collection_names
+from artifact_bundle import (DEFAULT_KEEP_BUNDLES, BundleMismatchError, BundleWriter,
+                             check_compatible, read_manifest, resolve_current_bundle)
+from sharding import shard_bundles_dir, shard_for_id
+from embedding_store import QueryEmbeddingStore
+from projection import (RECALL_K, evaluate_projection, fit_projection, project_index,
+                        recall_queries)
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Neighbors stored per document for "similar" lookups (extra headroom for filtering)
+NEIGHBOR_K = 20
+
+# Documents fetched from the cursor and encoded per batch
+DEFAULT_BATCH_SIZE = 512
+
+
+def build_neighbor_graph(index, embeddings: np.ndarray, k: int = NEIGHBOR_K):
+    """
+    Computes the k nearest neighbors of every indexed vector in one batched search.
+
+    Args:
+        index: FAISS index containing the embeddings
+        embeddings: Normalized (n, dim) float32 array, row i = index id i
+        k: Number of neighbors to keep per row
+
+    Returns:
+        (indices, scores) arrays of shape (n, k'), k' = min(k, n - 1),
+        with each row's own id removed and -1 padding where fewer exist.
+    """
+    n = embeddings.shape[0]
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.empty((n, 0), dtype='int32'), np.empty((n, 0), dtype='float32')
+
+    scores, indices = index.search(embeddings, k + 1)
+
+    # Move each row's self-match to the end (stable, keeps score order) and drop it
+    is_self = indices == np.arange(n)[:, None]
+    order = np.argsort(is_self, axis=1, kind='stable')[:, :k]
+    indices = np.take_along_axis(indices, order, axis=1).astype('int32')
+    scores = np.take_along_axis(scores, order, axis=1).astype('float32')
+    return indices, scores
+
+
+class _StageStats:
+    """Items processed and busy time of one build stage (fetch, encode, index)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.seconds = 0.0
+
+    def add(self, items: int, seconds: float):
+        self.items += items
+        self.seconds += seconds
+
+    @property
+    def rate(self) -> float:
+        return self.items / self.seconds if self.seconds > 0 else 0.0
 
 
-def sync_embeddings_from_mongodb(output_dir: str = None):
+# Encoder loaded once per worker process by _init_encode_worker
+_worker_model = None
+
+
+def _init_encode_worker(model_name: str, torch_threads: int):
+    global _worker_model
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _encode_batch(texts: List[str]) -> Tuple[np.ndarray, float]:
+    """Encodes one batch inside a worker process; returns (embeddings, seconds)."""
+    started = time.perf_counter()
+    embeddings = np.asarray(_worker_model.encode(texts), dtype='float32')
+    return embeddings, time.perf_counter() - started
+
+
+def _worker_dimension() -> int:
+    """Embedding dimension of the encoder loaded in a worker process."""
+    return _worker_model.get_sentence_embedding_dimension()
+
+
+def start_encode_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Starts worker processes that each load the encoder once.
+
+    CPU threads are split between workers so they do not oversubscribe the
+    machine. Workers are spawned rather than forked, since forking a process
+    with an initialized torch runtime can deadlock.
     """
-    Fetches all places from MongoDB and regenerates FAISS index and metadata.
-    
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_encode_worker,
+        initargs=(MODEL_NAME, max(1, (os.cpu_count() or 1) // workers))
+    )
+
+
+def sync_collection(spec: CollectionSpec, model: Optional[SentenceTransformer],
+                    bundles: List[BundleWriter], pool: Optional[ProcessPoolExecutor] = None,
+                    workers: int = 1, batch_size: int = DEFAULT_BATCH_SIZE,
+                    project_dim: int = 0,
+                    stored_queries: Optional[np.ndarray] = None) -> bool:
+    """
+    Streams one collection from MongoDB and adds its FAISS index, metadata and
+    neighbor graph to the bundles being built (one per shard).
+
+    With project_dim, a PCA projection is fitted on the collection's vectors
+    and the indexes store projected vectors; recall@10 against the
+    full-width index is measured (on stored_queries when there are enough)
+    and recorded in the manifest. Neighbor graphs use the full-width vectors.
+
+    The cursor is read batch_size documents at a time. With a pool, each batch
+    is encoded in a worker process while the next ones are fetched; at most
+    two batches per worker are in flight, and results are indexed in cursor
+    order so FAISS ids match metadata rows. With several bundles, each
+    document goes to the shard picked by sharding.shard_for_id; neighbor
+    graphs only link documents within the same shard.
+
     Args:
-        output_dir: Directory to save the index and metadata files.
-                   Defaults to ./data directory.
+        spec: Collection settings from search_collections.COLLECTION_SPECS
+        model: Loaded SentenceTransformer (required when there is no pool)
+        bundles: Bundles the artifacts are written into, indexed by shard
+        pool: Encode worker pool from start_encode_pool, or None to encode in-process
+        workers: Number of processes in the pool
+        batch_size: Documents fetched and encoded per batch
+        project_dim: Dimensions to project the vectors to (0 keeps full width)
+        stored_queries: Real query embeddings used to measure projection recall
+
+    Returns:
+        True if the collection was indexed, False if it is empty.
+    """
+    print("\n" + "-" * 60)
+    print(f"📚 Collection: {spec.name}")
+    print("-" * 60)
+
+    service = PlaceService() if spec.name == "places" else CollectionService(spec.name)
+    expected = service.count_documents()
+    print(f"\n📦 Streaming ~{expected} {spec.name} from MongoDB in batches of {batch_size}"
+          f" ({workers if pool else 1} encode worker(s))...")
+
+    shard_count = len(bundles)
+    dimension = bundles[0].dimension
+    indexes = [faiss.IndexFlatIP(dimension) for _ in bundles]
+    metadata_maps = [{} for _ in bundles]
+    fetch, encode, add = _StageStats("fetch"), _StageStats("encode"), _StageStats("index")
+    in_flight = deque()
+    max_in_flight = 2 * workers
+    started = last_report = time.perf_counter()
+
+    def indexed() -> int:
+        return sum(index.ntotal for index in indexes)
+
+    def index_batch(encoded: Tuple[np.ndarray, float], shards: np.ndarray):
+        embeddings, seconds = encoded
+        encode.add(len(embeddings), seconds)
+        add_started = time.perf_counter()
+        # Normalized vectors + inner product = cosine similarity scores
+        faiss.normalize_L2(embeddings)
+        for shard, index in enumerate(indexes):
+            rows = embeddings if shard_count == 1 else embeddings[shards == shard]
+            if len(rows):
+                index.add(rows)
+        add.add(len(embeddings), time.perf_counter() - add_started)
+
+    def report_progress(force: bool = False):
+        nonlocal last_report
+        now = time.perf_counter()
+        if not force and now - last_report < 2.0:
+            return
+        last_report = now
+        print(f"   ⏳ fetched {fetch.items}/{expected}  encoded {encode.items}  "
+              f"indexed {indexed()}  ({indexed() / (now - started):.0f} docs/s)")
+
+    batches = service.iter_documents_for_embedding(spec.embedding_projection, batch_size)
+    while True:
+        fetch_started = time.perf_counter()
+        docs = next(batches, None)
+        if docs is None:
+            break
+        texts = []
+        shards = np.empty(len(docs), dtype='int64')
+        for i, doc in enumerate(docs):
+            shard = shards[i] = shard_for_id(doc['id'], shard_count)
+            metadata_maps[shard][len(metadata_maps[shard])] = spec.build_metadata(doc)
+            texts.append(spec.build_text(doc))
+        fetch.add(len(docs), time.perf_counter() - fetch_started)
+
+        if pool is None:
+            encode_started = time.perf_counter()
+            embeddings = np.asarray(model.encode(texts), dtype='float32')
+            index_batch((embeddings, time.perf_counter() - encode_started), shards)
+        else:
+            in_flight.append((pool.submit(_encode_batch, texts), shards))
+            # Drain finished batches in order; block only when the pipeline is full
+            while in_flight and (len(in_flight) >= max_in_flight or in_flight[0][0].done()):
+                future, batch_shards = in_flight.popleft()
+                index_batch(future.result(), batch_shards)
+        report_progress()
+
+    while in_flight:
+        future, batch_shards = in_flight.popleft()
+        index_batch(future.result(), batch_shards)
+
+    total = indexed()
+    if total == 0:
+        print(f"❌ No {spec.name} found in MongoDB!")
+        return False
+
+    wall = time.perf_counter() - started
+    report_progress(force=True)
+    print(f"\n📊 Stage throughput for {spec.name} (wall {wall:.1f}s, "
+          f"{total / wall:.0f} docs/s end-to-end):")
+    for stage in (fetch, encode, add):
+        print(f"   {stage.name:<7} {stage.items} docs in {stage.seconds:.1f}s busy "
+              f"({stage.rate:.0f} docs/s while busy)")
+
+    projection = None
+    if project_dim:
+        print(f"\n📐 Fitting PCA projection {dimension} -> {project_dim} dimensions...")
+        projection = fit_projection(indexes, project_dim)
+        print(f"   Explained variance: {projection.explained_variance:.1%}")
+
+    for shard, (bundle, index, metadata_map) in enumerate(zip(bundles, indexes, metadata_maps)):
+        label = f" (shard {shard + 1}/{shard_count})" if shard_count > 1 else ""
+        print(f"   Created index with {index.ntotal} vectors (dimension: {index.d}){label}")
+
+        # Precompute nearest-neighbor graph
+        neighbor_indices = neighbor_scores = None
+        if spec.neighbors_file:
+            print(f"\n🕸️  Computing {NEIGHBOR_K}-nearest-neighbor graph{label}...")
+            embeddings = index.reconstruct_n(0, index.ntotal)
+            neighbor_indices, neighbor_scores = build_neighbor_graph(index, embeddings)
+            del embeddings
+            print(f"   Neighbor graph shape: {neighbor_indices.shape}")
+
+        projection_stats = None
+        if projection is not None:
+            projected = project_index(index, projection)
+            if index.ntotal:
+                queries, query_ids, source = recall_queries(index, stored_queries)
+                measured = evaluate_projection(index, projected, projection, queries,
+                                               query_ids=query_ids)
+                projection_stats = {
+                    f"recall_at_{RECALL_K}": round(measured["recall"], 4),
+                    "recall_queries": f"{len(queries)} {source}"
+                }
+                print(f"\n📐 Projection{label}: recall@{RECALL_K} {measured['recall']:.3f} "
+                      f"on {len(queries)} {source}; index "
+                      f"{index.ntotal * index.d * 4 / 1e6:.1f} MB -> "
+                      f"{projected.ntotal * projected.d * 4 / 1e6:.1f} MB, search "
+                      f"{measured['full_ms']:.3f} -> {measured['projected_ms']:.3f} ms/query (batched)")
+            index = projected
+
+        # Stage artifacts in the bundle
+        print(f"\n💾 Writing artifacts to bundle{label}...")
+        bundle.add_collection(spec.name, index, metadata_map, neighbor_indices, neighbor_scores,
+                              projection, projection_stats)
+
+    print(f"\n✅ {spec.name}: {total} documents indexed")
+    return True
+
+
+def sync_embeddings_from_mongodb(output_dir: str = None,
+                                 collections: Optional[List[str]] = None,
+                                 workers: Optional[int] = None,
+                                 batch_size: int = DEFAULT_BATCH_SIZE,
+                                 shards: int = 1,
+                                 project_dim: int = 0,
+                                 keep_bundles: int = DEFAULT_KEEP_BUNDLES):
+    """
+    Fetches documents from MongoDB, rebuilds each collection's artifacts and
+    publishes them as a new versioned bundle.
+
+    With shards > 1, documents are split by sharding.shard_for_id and every
+    shard gets its own bundles directory (output_dir/shard-<i>-of-<n>), each
+    published independently and served by its own worker process.
+
+    Args:
+        output_dir: Directory holding the bundles.
+                   Defaults to ./data/bundles.
+        collections: Collections to rebuild. Defaults to every registered collection.
+        workers: Encode worker processes. Defaults to one per CPU core;
+                 0 or 1 encodes in this process.
+        batch_size: Documents fetched and encoded per batch
+        shards: Number of shards the corpus is split into
+        project_dim: PCA-project every rebuilt collection to this many
+                     dimensions (0 keeps the full embedding width)
+        keep_bundles: Published bundles kept per bundles directory; older
+                      ones are deleted after publishing (minimum 2)
+
+    Returns:
+        True if a bundle containing places was published (for every shard).
     """
     if output_dir is None:
-        output_dir = os.path.join(os.path.dirname(__file__), 'data')
-    
+        output_dir = os.path.join(os.path.dirname(__file__), 'data', 'bundles')
+
     os.makedirs(output_dir, exist_ok=True)
-    
-    faiss_index_file = os.path.join(output_dir, 'places.faiss')
-    metadata_file = os.path.join(output_dir, 'metadata.json')
-    
+
+    specs = [get_collection_spec(name) for name in (collections or list_collection_names())]
+
     print("=" * 60)
     print("🔄 Syncing Embeddings from MongoDB")
+    print(f"   Collections: {', '.join(spec.name for spec in specs)}")
+    if shards > 1:
+        print(f"   Shards: {shards}")
+    if project_dim:
+        print(f"   Projection: {project_dim} dimensions")
     print("=" * 60)
-    
-    # 1. Fetch data from MongoDB
-    print("\n📦 Fetching places from MongoDB...")
-    place_service = PlaceService()
-    places = place_service.get_places_for_embedding()
-    
-    if not places:
-        print("❌ No places found in MongoDB!")
-        return False
-    
-    print(f"   Found {len(places)} places")
-    
-    # 2. Prepare corpus for embedding
-    print("\n📝 Preparing text corpus for embedding...")
-    corpus = []
-    metadata_map = {}
-    
-    for idx, place in enumerate(places):
-        # Combine fields for embedding
-        name = place.get("name", "")
-        description = place.get("description", "")
-        tags = " ".join(place.get("tags", []))
-        category = place.get("category", "")
-        
-        text_to_embed = f"{name} {description} {tags} {category}".strip()
-        corpus.append(text_to_embed)
-        
-        # Store metadata
-        coords = place.get("coordinates", {})
-        metadata_map[idx] = {
-            "place_id": place.get("_id") or place.get("id"),
-            "lat": coords.get("lat"),
-            "lon": coords.get("lng") or coords.get("lon"),
-            "category": category
-        }
-    
-    print(f"   Created corpus with {len(corpus)} entries")
-    
-    # 3. Generate embeddings
-    print("\n🤖 Loading SentenceTransformer model...")
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    
-    print("   Generating embeddings (this may take a moment)...")
-    embeddings = model.encode(corpus, show_progress_bar=True)
-    embeddings = np.array(embeddings).astype('float32')
-    
-    print(f"   Generated embeddings with shape: {embeddings.shape}")
-    
-    # 4. Create FAISS index
-    print("\n📊 Creating FAISS index...")
-    dimension = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dimension)
-    index.add(embeddings)
-    
-    print(f"   Created index with {index.ntotal} vectors (dimension: {dimension})")
-    
-    # 5. Save artifacts
-    print("\n💾 Saving artifacts...")
-    
-    # Backup existing files
-    if os.path.exists(faiss_index_file):
-        backup_file = faiss_index_file + ".backup"
-        os.rename(faiss_index_file, backup_file)
-        print(f"   Backed up existing index to {backup_file}")
-    
-    if os.path.exists(metadata_file):
-        backup_file = metadata_file + ".backup"
-        os.rename(metadata_file, backup_file)
-        print(f"   Backed up existing metadata to {backup_file}")
-    
-    # Save new files
-    faiss.write_index(index, faiss_index_file)
-    print(f"   Saved FAISS index to {faiss_index_file}")
-    
-    with open(metadata_file, 'w', encoding='utf-8') as f:
-        json.dump(metadata_map, f, indent=4)
-    print(f"   Saved metadata to {metadata_file}")
-    
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    pool = model = None
+    if workers > 1:
+        # Only the workers load the encoder; the dimension comes from one of them
+        print(f"   Starting {workers} encode worker processes...")
+        pool = start_encode_pool(workers)
+        dimension = pool.submit(_worker_dimension).result()
+    else:
+        # The model is loaded once and shared by every collection
+        print("\n🤖 Loading SentenceTransformer model...")
+        model = SentenceTransformer(MODEL_NAME)
+        dimension = model.get_sentence_embedding_dimension()
+
+    # Real queries seen by the API, to measure projection recall on
+    stored_queries = None
+    store_dir = os.getenv("QUERY_EMBEDDING_STORE_DIR",
+                          os.path.join(os.path.dirname(__file__), 'data', 'query_embeddings'))
+    if project_dim and store_dir and os.path.isdir(store_dir):
+        stored_queries = QueryEmbeddingStore(store_dir, MODEL_NAME, dimension).vectors()
+
+    if shards > 1:
+        bundles = [BundleWriter(shard_bundles_dir(output_dir, shard, shards), MODEL_NAME,
+                                dimension, shard={"index": shard, "count": shards},
+                                keep_bundles=keep_bundles)
+                   for shard in range(shards)]
+    else:
+        bundles = [BundleWriter(output_dir, MODEL_NAME, dimension, keep_bundles=keep_bundles)]
+    bundle_dirs = []
+    try:
+        synced = {spec.name: sync_collection(spec, model, bundles, pool, workers, batch_size,
+                                             project_dim, stored_queries)
+                  for spec in specs}
+
+        for bundle in bundles:
+            # Carry over collections that were not rebuilt, if still compatible
+            current_dir = resolve_current_bundle(bundle.bundles_dir)
+            if current_dir:
+                try:
+                    current = read_manifest(current_dir)
+                    check_compatible(current, MODEL_NAME, dimension)
+                    for name in current["collections"]:
+                        if name not in synced:
+                            bundle.carry_over(current_dir, current, name)
+                            print(f"   Carried over {name} from bundle {current['version']}")
+                except BundleMismatchError as e:
+                    print(f"⚠️  Not carrying over collections from {current_dir}: {e}")
+
+        if any("places" not in bundle.collections for bundle in bundles):
+            print("❌ No places indexed; not publishing a bundle.")
+            for bundle in bundles:
+                bundle.abort()
+            return False
+
+        for bundle in bundles:
+            bundle_dirs.append(bundle.publish())
+    except Exception:
+        for bundle in bundles[len(bundle_dirs):]:
+            bundle.abort()
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
     print("\n" + "=" * 60)
     print("✅ Sync complete!")
-    print(f"   Total places indexed: {len(places)}")
-    print(f"   Index file: {faiss_index_file}")
-    print(f"   Metadata file: {metadata_file}")
+    for name, ok in synced.items():
+        print(f"   {name}: {'indexed' if ok else 'skipped (empty)'}")
+    for bundle_dir in bundle_dirs:
+        print(f"   Published bundle: {bundle_dir}")
     print("=" * 60)
-    
+
     return True
 
 
 if __name__ == "__main__":
     import sys
-    
+
+    parser = argparse.ArgumentParser(description="Rebuild search bundles from MongoDB.")
+    parser.add_argument("collections", nargs="*", help="Collections to rebuild (default: all)")
+    parser.add_argument("--workers", type=int,
+                        default=int(os.getenv("SYNC_ENCODE_WORKERS", os.cpu_count() or 1)),
+                        help="Encode worker processes (1 = encode in-process)")
+    parser.add_argument("--batch-size", type=int,
+                        default=int(os.getenv("SYNC_BATCH_SIZE", DEFAULT_BATCH_SIZE)),
+                        help="Documents fetched and encoded per batch")
+    parser.add_argument("--shards", type=int, default=int(os.getenv("SYNC_SHARDS", 1)),
+                        help="Split the corpus into this many shard bundles")
+    parser.add_argument("--project-dim", type=int, default=int(os.getenv("SYNC_PROJECT_DIM", 0)),
+                        help="PCA-project embeddings to this many dimensions (0 = full width)")
+    parser.add_argument("--keep-bundles", type=int,
+                        default=int(os.getenv("SYNC_KEEP_BUNDLES", DEFAULT_KEEP_BUNDLES)),
+                        help="Published bundles to keep on disk (minimum 2)")
+    args = parser.parse_args()
+
     try:
-        success = sync_embeddings_from_mongodb()
+        success = sync_embeddings_from_mongodb(collections=args.collections or None,
+                                               workers=args.workers,
+                                               batch_size=args.batch_size,
+                                               shards=args.shards,
+                                               project_dim=args.project_dim,
+                                               keep_bundles=args.keep_bundles)
         sys.exit(0 if success else 1)
     except Exception as e:
         print(f"\n❌ Error during sync: {e}")
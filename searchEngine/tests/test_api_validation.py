@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def client():
+    # No lifespan: request validation runs before the (unloaded) service is used
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("top_k", [0, -1, None, main.MAX_TOP_K + 1])
+@pytest.mark.parametrize("path, body", [
+    ("/search", {"query": "temple"}),
+    ("/search/along-route", {"route": [[27.7, 85.3]]}),
+])
+def test_invalid_top_k_is_rejected(client, path, body, top_k):
+    response = client.post(path, json={**body, "top_k": top_k})
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("timeout_ms", [0, main.LATENCY_BUDGET_MS + 1])
+def test_timeout_ms_cannot_exceed_server_budget(client, timeout_ms):
+    response = client.post("/search", json={"query": "temple", "timeout_ms": timeout_ms})
+    assert response.status_code == 422
+
+
+def test_request_budget_is_capped():
+    assert main._request_budget().budget_s == pytest.approx(main.LATENCY_BUDGET_MS / 1000)
+    assert main._request_budget(main.LATENCY_BUDGET_MS * 10).budget_s == \
+        pytest.approx(main.LATENCY_BUDGET_MS / 1000)
+    assert main._request_budget(50).budget_s == pytest.approx(0.05)
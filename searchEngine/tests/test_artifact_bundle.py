@@ -0,0 +1,174 @@
+import math
+import os
+
+import faiss
+import numpy as np
+import pytest
+
+import artifact_bundle
+from artifact_bundle import (ArrayMetadata, BundleMismatchError, BundleWriter, check_compatible,
+                             list_bundles, load_collection, load_projection, metadata_to_array,
+                             prune_bundles, read_manifest, resolve_current_bundle)
+from projection import PCAProjection
+
+DIM = 8
+
+
+def make_index(count: int, seed: int = 0):
+    vectors = np.random.default_rng(seed).standard_normal((count, DIM)).astype('float32')
+    faiss.normalize_L2(vectors)
+    index = faiss.IndexFlatIP(DIM)
+    index.add(vectors)
+    return index
+
+
+def make_metadata(count: int):
+    return {str(i): {"place_id": f"place-{i}", "lat": 27.7 + i / 100,
+                     "lon": None if i == 1 else 85.3, "category": "temple"}
+            for i in range(count)}
+
+
+def publish(bundles_dir, collections, shard=None, keep_bundles=3):
+    writer = BundleWriter(str(bundles_dir), "test-model", DIM, shard=shard,
+                          keep_bundles=keep_bundles)
+    for name, count in collections.items():
+        writer.add_collection(name, make_index(count), make_metadata(count))
+    return writer.publish()
+
+
+def test_metadata_array_round_trip():
+    metadata = ArrayMetadata(metadata_to_array(make_metadata(3)))
+    assert len(metadata) == 3
+    assert "2" in metadata and "3" not in metadata and "x" not in metadata
+    assert metadata["0"] == {"place_id": "place-0", "lat": 27.7, "lon": 85.3, "category": "temple"}
+    assert metadata["1"]["lon"] is None
+    assert list(metadata) == ["0", "1", "2"]
+    assert math.isnan(metadata.column("lon")[1])
+    assert metadata.column("missing") is None
+    with pytest.raises(KeyError):
+        metadata["3"]
+
+
+def test_publish_and_load_round_trip(tmp_path):
+    bundle_dir = publish(tmp_path, {"places": 5})
+    assert resolve_current_bundle(str(tmp_path)) == bundle_dir
+
+    manifest = read_manifest(bundle_dir)
+    assert manifest["model_name"] == "test-model" and manifest["dimension"] == DIM
+    assert manifest["collections"]["places"]["count"] == 5
+    check_compatible(manifest, "test-model", DIM)
+
+    index, metadata, neighbors = load_collection(bundle_dir, manifest, "places",
+                                                 verify_checksums=True)
+    assert index.ntotal == 5 and index.d == DIM
+    np.testing.assert_allclose(index.reconstruct(3), make_index(5).reconstruct(3))
+    assert metadata["4"]["place_id"] == "place-4"
+    assert neighbors is None
+    assert load_projection(bundle_dir, manifest, "places") is None
+    # Nothing left behind in the bundles directory but the bundle and CURRENT
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(bundle_dir), "CURRENT"])
+
+
+def test_empty_shard_round_trip(tmp_path):
+    bundle_dir = publish(tmp_path, {"places": 0}, shard={"index": 1, "count": 3})
+    manifest = read_manifest(bundle_dir)
+    assert manifest["shard"] == {"index": 1, "count": 3}
+
+    index, metadata, _ = load_collection(bundle_dir, manifest, "places", verify_checksums=True)
+    assert index.ntotal == 0 and index.d == DIM
+    assert len(metadata) == 0 and list(metadata) == []
+    distances, ids = index.search(np.ones((1, DIM), dtype='float32'), 3)
+    assert (ids == -1).all()
+
+
+def test_neighbors_and_projection_round_trip(tmp_path):
+    index = make_index(20)
+    projection = PCAProjection.fit(index.reconstruct_n(0, 20), 4)
+    projected = faiss.IndexFlatIP(4)
+    projected.add(projection.apply(index.reconstruct_n(0, 20)))
+    neighbor_indices = np.arange(40, dtype='int32').reshape(20, 2) % 20
+    neighbor_scores = np.full((20, 2), 0.5, dtype='float32')
+
+    writer = BundleWriter(str(tmp_path), "test-model", DIM)
+    writer.add_collection("places", projected, make_metadata(20),
+                          neighbor_indices, neighbor_scores, projection=projection)
+    bundle_dir = writer.publish()
+    manifest = read_manifest(bundle_dir)
+
+    loaded, _, neighbors = load_collection(bundle_dir, manifest, "places")
+    assert loaded.d == 4
+    np.testing.assert_array_equal(neighbors[0], neighbor_indices)
+    np.testing.assert_array_equal(neighbors[1], neighbor_scores)
+    loaded_projection = load_projection(bundle_dir, manifest, "places")
+    np.testing.assert_allclose(loaded_projection.components, projection.components)
+
+
+def test_checksum_mismatch_is_detected_on_request(tmp_path):
+    bundle_dir = publish(tmp_path, {"places": 3})
+    manifest = read_manifest(bundle_dir)
+    with open(os.path.join(bundle_dir, "places.meta.npy"), "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b"X")
+
+    load_collection(bundle_dir, manifest, "places")
+    with pytest.raises(BundleMismatchError):
+        load_collection(bundle_dir, manifest, "places", verify_checksums=True)
+
+
+def test_carry_over_links_unchanged_collections(tmp_path):
+    first = publish(tmp_path, {"places": 3, "events": 2})
+    first_manifest = read_manifest(first)
+
+    writer = BundleWriter(str(tmp_path), "test-model", DIM)
+    writer.add_collection("places", make_index(4, seed=1), make_metadata(4))
+    writer.carry_over(first, first_manifest, "events")
+    second = writer.publish()
+
+    assert second != first
+    assert resolve_current_bundle(str(tmp_path)) == second
+    manifest = read_manifest(second)
+    assert manifest["collections"]["events"] == first_manifest["collections"]["events"]
+    index, _, _ = load_collection(second, manifest, "events", verify_checksums=True)
+    assert index.ntotal == 2
+
+
+def test_publish_keeps_only_the_newest_bundles(tmp_path):
+    published = [os.path.basename(publish(tmp_path, {"places": 2 + i}, keep_bundles=2))
+                 for i in range(4)]
+    assert list_bundles(str(tmp_path)) == published[-2:]
+    assert resolve_current_bundle(str(tmp_path)) == str(tmp_path / published[-1])
+
+
+def test_prune_never_deletes_current_or_staging(tmp_path):
+    first = publish(tmp_path, {"places": 2})
+    second = publish(tmp_path, {"places": 3})
+    # Roll back to the older bundle, with a build in progress next to it
+    (tmp_path / "CURRENT").write_text(os.path.basename(first) + "\n")
+    staging = BundleWriter(str(tmp_path), "test-model", DIM)
+
+    assert prune_bundles(str(tmp_path), keep=1) == []
+    assert list_bundles(str(tmp_path)) == [os.path.basename(first), os.path.basename(second)]
+    assert os.path.isdir(staging.staging_dir)
+
+
+def test_abort_discards_staging(tmp_path):
+    writer = BundleWriter(str(tmp_path), "test-model", DIM)
+    writer.add_collection("places", make_index(2), make_metadata(2))
+    writer.abort()
+    assert os.listdir(tmp_path) == []
+    assert resolve_current_bundle(str(tmp_path)) is None
+
+
+def test_incompatible_bundles_are_refused(tmp_path):
+    manifest = read_manifest(publish(tmp_path, {"places": 2}))
+    with pytest.raises(BundleMismatchError):
+        check_compatible(manifest, "other-model", DIM)
+    with pytest.raises(BundleMismatchError):
+        check_compatible(manifest, "test-model", DIM * 2)
+
+
+def test_unsupported_format_version_is_refused(tmp_path, monkeypatch):
+    bundle_dir = publish(tmp_path, {"places": 2})
+    monkeypatch.setattr(artifact_bundle, "BUNDLE_FORMAT_VERSION", 99)
+    with pytest.raises(BundleMismatchError):
+        read_manifest(bundle_dir)
@@ -0,0 +1,100 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+import compression
+from compression import CompressionMiddleware, negotiate_encoding
+from http_cache import compute_etag, etag_matches
+
+LARGE = {"text": "digital sherpa " * 1000}
+
+
+@pytest.fixture(params=[True, False], ids=["brotli", "gzip-only"])
+def brotli_available(request, monkeypatch):
+    if request.param and not compression.BROTLI_AVAILABLE:
+        pytest.skip("brotli is not installed")
+    monkeypatch.setattr(compression, "BROTLI_AVAILABLE", request.param)
+    return request.param
+
+
+def test_negotiate_prefers_brotli_when_available(brotli_available):
+    expected = "br" if brotli_available else "gzip"
+    assert negotiate_encoding("gzip, deflate, br") == expected
+    assert negotiate_encoding("*") == expected
+
+
+@pytest.mark.parametrize("header", [None, "", "identity", "deflate", "gzip;q=0", "*;q=0"])
+def test_negotiate_returns_none_without_acceptable_coding(header, brotli_available):
+    assert negotiate_encoding(header) is None
+
+
+def test_negotiate_honours_q_values(brotli_available):
+    assert negotiate_encoding("br;q=0.5, gzip;q=0.8") == "gzip"
+    assert negotiate_encoding("GZIP; q=1.0, br;q=0") == "gzip"
+    assert negotiate_encoding("*;q=0.1, gzip;q=0") == ("br" if brotli_available else None)
+    assert negotiate_encoding("gzip;q=bogus") is None
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/large")
+    def large(request: Request, response: Response):
+        etag = compute_etag(LARGE)
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        return LARGE
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/image")
+    def image():
+        return Response(b"\x89PNG" * 1000, media_type="image/png")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, thread_threshold=4096)
+    return TestClient(app)
+
+
+def test_large_json_is_compressed_with_vary_and_weak_etag(client):
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == compute_etag(LARGE)
+    assert response.json() == LARGE
+
+
+def test_identity_response_still_varies_on_accept_encoding(client):
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == compute_etag(LARGE)
+
+
+def test_not_modified_carries_same_etag_and_vary(client):
+    first = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    response = client.get("/large", headers={"Accept-Encoding": "gzip",
+                                             "If-None-Match": first.headers["etag"]})
+    assert response.status_code == 304
+    assert response.headers["etag"] == first.headers["etag"]
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_small_and_binary_bodies_are_not_compressed(client):
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert small.headers["vary"] == "Accept-Encoding"
+
+    image = client.get("/image", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in image.headers
+    assert "vary" not in image.headers
+
+
+def test_compress_gzip_round_trip():
+    body = b"x" * 5000
+    assert gzip.decompress(compression.compress(body, "gzip")) == body
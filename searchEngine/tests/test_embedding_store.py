@@ -0,0 +1,88 @@
+import threading
+
+import numpy as np
+
+from embedding_store import QueryEmbeddingStore
+
+DIM = 3
+
+
+def vec(value):
+    return np.full(DIM, value, dtype='float32')
+
+
+def make_store(tmp_path, max_entries=20_000):
+    return QueryEmbeddingStore(str(tmp_path), "test/model", DIM, max_entries=max_entries)
+
+
+def test_entries_survive_a_restart(tmp_path):
+    store = make_store(tmp_path)
+    store.put("Temples in  Patan", vec(1))
+    store.put_many([("durbar square", vec(2)), ("lakes", vec(3))])
+    store.close()
+
+    reloaded = make_store(tmp_path)
+    assert len(reloaded) == 3
+    np.testing.assert_array_equal(reloaded.get("temples in patan"), vec(1))
+    np.testing.assert_array_equal(reloaded.get("LAKES"), vec(3))
+
+
+def test_queries_that_sanitizing_would_change_are_not_stored(tmp_path):
+    store = make_store(tmp_path)
+    store.put_many([("mail me at someone@example.com", vec(1)), ("x" * 1000, vec(2))])
+    assert len(store) == 0
+
+
+def test_least_recently_used_query_is_evicted(tmp_path):
+    store = make_store(tmp_path, max_entries=2)
+    store.put_many([("a", vec(1)), ("b", vec(2))])
+    assert store.get("a") is not None  # "b" is now the least recently used
+    store.put_many([("c", vec(3))])
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+
+    # On reload the latest stored rows win
+    reloaded = make_store(tmp_path, max_entries=2)
+    assert reloaded.get("a") is None
+    assert reloaded.get("b") is not None and reloaded.get("c") is not None
+
+
+def test_files_are_compacted_once_evicted_rows_pile_up(tmp_path):
+    store = make_store(tmp_path, max_entries=2)
+    for i in range(5):
+        store.put_many([(f"q{i}", vec(i))])
+    # 5 rows written > 2 * max_entries: rewritten to the live entries
+    assert store._disk_rows == 2
+    with open(store.keys_path) as f:
+        assert f.read().split() == ['"q3"', '"q4"']
+
+
+def test_truncated_tail_is_dropped_on_load(tmp_path):
+    store = make_store(tmp_path)
+    store.put_many([("a", vec(1)), ("b", vec(2))])
+    with open(store.vectors_path, 'ab') as f:
+        f.write(vec(9).tobytes()[:5])  # crash mid-write
+    with open(store.keys_path, 'a') as f:
+        f.write('"c')
+
+    reloaded = make_store(tmp_path)
+    assert len(reloaded) == 2
+    reloaded.put_many([("c", vec(3))])
+    assert len(make_store(tmp_path)) == 3
+
+
+def test_concurrent_puts_respect_max_entries(tmp_path):
+    store = make_store(tmp_path, max_entries=50)
+
+    def writer(worker):
+        for i in range(200):
+            store.put(f"query {worker} {i}", vec(i))
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.close()
+    assert len(store) == 50
+    assert len(make_store(tmp_path, max_entries=50)) == 50
@@ -0,0 +1,58 @@
+import pytest
+
+import http_cache
+from http_cache import ValidatorCache, compute_etag, etag_matches
+
+
+def test_compute_etag_is_weak_and_canonical():
+    etag = compute_etag({"b": 1, "a": [1, 2]})
+    assert etag.startswith('W/"') and etag.endswith('"')
+    assert etag == compute_etag({"a": [1, 2], "b": 1})
+    assert etag != compute_etag({"a": [1, 2], "b": 2})
+
+
+@pytest.mark.parametrize("if_none_match, etag, expected", [
+    ('"abc"', '"abc"', True),
+    ('W/"abc"', '"abc"', True),
+    ('"abc"', 'W/"abc"', True),
+    ('W/"abc"', 'W/"abc"', True),
+    ('"xyz", W/"abc"', 'W/"abc"', True),
+    ('  "xyz" ,"abc" ', '"abc"', True),
+    ('*', 'W/"abc"', True),
+    ('"xyz"', '"abc"', False),
+    ('"abc"', '"abcd"', False),
+    (None, '"abc"', False),
+    ('', '"abc"', False),
+    ('"abc"', None, False),
+    ('*', None, False),
+])
+def test_etag_matches(if_none_match, etag, expected):
+    assert etag_matches(if_none_match, etag) is expected
+
+
+def test_validator_cache_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(http_cache.time, "monotonic", lambda: now[0])
+    cache = ValidatorCache(ttl_s=10)
+    cache.put(("place", "1"), 'W/"a"')
+    now[0] += 9
+    assert cache.get(("place", "1")) == 'W/"a"'
+    now[0] += 2
+    assert cache.get(("place", "1")) is None
+
+
+def test_validator_cache_evicts_least_recently_used():
+    cache = ValidatorCache(max_entries=2)
+    cache.put("a", 'W/"1"')
+    cache.put("b", 'W/"2"')
+    cache.get("a")
+    cache.put("c", 'W/"3"')
+    assert cache.get("b") is None
+    assert cache.get("a") == 'W/"1"' and cache.get("c") == 'W/"3"'
+
+
+def test_validator_cache_clear():
+    cache = ValidatorCache()
+    cache.put("a", 'W/"1"')
+    cache.clear()
+    assert cache.get("a") is None
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from filter_data import filter_json_data, filter_record
+from json_stream import JsonArrayWriter, JsonObjectWriter, iter_json_records
+
+RECORDS = [
+    {"_id": {"$oid": "a1"}, "name": "Boudhanath", "tags": ["stupa", "unesco"]},
+    {"id": "b2", "name": "Phewa \"Lake\"", "description": "[not, an, array] {x}"},
+    {"id": "c3", "name": "Patan", "coordinates": {"lat": 27.67, "lng": 85.32}},
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+def test_reads_json_arrays_in_any_chunk_size(tmp_path, chunk_size):
+    path = tmp_path / "export.json"
+    path.write_text(json.dumps(RECORDS, indent=2), encoding='utf-8')
+    assert list(iter_json_records(str(path), chunk_size=chunk_size)) == RECORDS
+
+
+@pytest.mark.parametrize("chunk_size", [3, 1 << 16])
+def test_reads_json_lines(tmp_path, chunk_size):
+    path = tmp_path / "export.jsonl"
+    path.write_text("\n".join(json.dumps(record) for record in RECORDS) + "\n\n",
+                    encoding='utf-8')
+    assert list(iter_json_records(str(path), chunk_size=chunk_size)) == RECORDS
+
+
+def test_empty_inputs(tmp_path):
+    for content in ("", "  \n", "[]", "[ \n ]"):
+        path = tmp_path / "empty.json"
+        path.write_text(content, encoding='utf-8')
+        assert list(iter_json_records(str(path))) == []
+
+
+def test_truncated_input_raises(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text('[{"id": "a"}, {"id": "b"', encoding='utf-8')
+    records = iter_json_records(str(path), chunk_size=4)
+    assert next(records) == {"id": "a"}
+    with pytest.raises(json.JSONDecodeError):
+        next(records)
+
+
+def test_writers_produce_regular_json(tmp_path):
+    array_path, object_path = tmp_path / "array.json", tmp_path / "object.json"
+    with JsonArrayWriter(str(array_path)) as writer:
+        for record in RECORDS:
+            writer.write(record)
+    with JsonObjectWriter(str(object_path)) as writer:
+        for i, record in enumerate(RECORDS):
+            writer.write_item(i, record)
+
+    assert writer.count == 3
+    assert json.loads(array_path.read_text(encoding='utf-8')) == RECORDS
+    assert json.loads(object_path.read_text(encoding='utf-8')) == \
+        {str(i): record for i, record in enumerate(RECORDS)}
+
+    with JsonArrayWriter(str(array_path)):
+        pass
+    assert json.loads(array_path.read_text(encoding='utf-8')) == []
+
+
+def test_filter_streams_records_through(tmp_path):
+    source, target = tmp_path / "Data.json", tmp_path / "FilteredData.json"
+    source.write_text("\n".join(json.dumps(record) for record in RECORDS), encoding='utf-8')
+    filter_json_data(str(source), str(target))
+
+    filtered = json.loads(target.read_text(encoding='utf-8'))
+    assert [record["id"] for record in filtered] == ["a1", "b2", "c3"]
+    assert filtered[0] == filter_record(RECORDS[0])
+    assert filtered[0]["tags"] == ["stupa", "unesco"] and filtered[0]["coordinates"] == {}
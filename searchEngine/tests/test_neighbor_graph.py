@@ -0,0 +1,83 @@
+import faiss
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from search_collections import get_collection_spec
+from search_service import CollectionIndex, SearchService
+from sync_embeddings import build_neighbor_graph
+
+EMBEDDINGS = np.asarray([
+    [1.0, 0.0, 0.0],
+    [0.9, 0.1, 0.0],
+    [0.0, 1.0, 0.0],
+    [0.9, 0.1, 0.0],   # duplicate row of place "b"
+    [0.7, 0.0, 0.7],
+], dtype='float32')
+faiss.normalize_L2(EMBEDDINGS)
+
+METADATA = {
+    "0": {"place_id": "a", "lat": 27.70, "lon": 85.30, "category": "Temple"},
+    "1": {"place_id": "b", "lat": 27.71, "lon": 85.31, "category": "temple"},
+    "2": {"place_id": "c", "lat": 27.70, "lon": 85.30, "category": "museum"},
+    "3": {"place_id": "b", "lat": 27.71, "lon": 85.31, "category": "temple"},
+    "4": {"place_id": "d", "lat": 28.20, "lon": 83.98, "category": "temple"},
+}
+
+
+def make_graph(k=4):
+    index = faiss.IndexFlatIP(EMBEDDINGS.shape[1])
+    index.add(EMBEDDINGS)
+    return index, build_neighbor_graph(index, EMBEDDINGS, k=k)
+
+
+def make_service():
+    index, (indices, scores) = make_graph()
+    entry = CollectionIndex(get_collection_spec("places"), index, METADATA)
+    entry.neighbor_indices, entry.neighbor_scores = indices, scores
+    service = object.__new__(SearchService)
+    service.collections = {"places": entry}
+    return service
+
+
+def test_graph_drops_self_match_and_keeps_score_order():
+    _, (indices, scores) = make_graph()
+    assert indices.shape == scores.shape == (5, 4)
+    for row in range(5):
+        assert row not in indices[row]
+        assert list(scores[row]) == sorted(scores[row], reverse=True)
+    assert indices[0][0] in (1, 3)
+
+
+def test_graph_k_is_capped_by_collection_size():
+    _, (indices, _) = make_graph(k=50)
+    assert indices.shape == (5, 4)
+
+    single = EMBEDDINGS[:1]
+    index = faiss.IndexFlatIP(single.shape[1])
+    index.add(single)
+    indices, scores = build_neighbor_graph(index, single)
+    assert indices.shape == scores.shape == (1, 0)
+
+
+def test_similar_skips_duplicate_rows_of_the_same_place():
+    hits = make_service().similar_hits("a", limit=10)
+    ids = [hit["place_id"] for hit in hits]
+    assert ids[0] == "b"
+    assert sorted(ids) == ["b", "c", "d"]
+
+
+def test_similar_filters_by_category_and_distance():
+    service = make_service()
+    assert [hit["id"] for hit in service.similar_hits("a", category="TEMPLE")] == ["b", "d"]
+    assert [hit["id"] for hit in service.similar_hits("a", max_distance_km=5)] == ["b", "c"]
+    assert [hit["id"] for hit in service.similar_hits("a", limit=1)] == ["b"]
+
+
+def test_similar_unknown_document_and_missing_graph():
+    service = make_service()
+    assert service.similar_hits("nope") is None
+    service.collections["places"].neighbor_indices = None
+    with pytest.raises(ValueError, match="No neighbor graph"):
+        service.similar_hits("a")
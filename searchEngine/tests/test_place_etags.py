@@ -0,0 +1,59 @@
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+class FakeService:
+    use_mongodb = True
+
+    def __init__(self, version):
+        self.bundle_manifest = {"version": version}
+        self.reads = 0
+        self.name = "Boudhanath"
+
+    def get_place_details(self, place_id, budget=None):
+        self.reads += 1
+        return {"_id": place_id, "name": self.name}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    fake = FakeService("v1")
+    monkeypatch.setattr(main, "search_service", fake)
+    main.place_etags.clear()
+    yield fake
+    main.place_etags.clear()
+
+
+def test_ttl_never_exceeds_max_age():
+    assert main.PLACES_ETAG_TTL_S <= main.PLACES_CACHE_MAX_AGE_S
+    assert main.place_etags.ttl_s == main.PLACES_ETAG_TTL_S
+
+
+def test_matching_etag_gets_304_without_a_read(service):
+    client = TestClient(main.app)
+    first = client.get("/places/p1")
+    assert first.status_code == 200 and service.reads == 1
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == main.PLACES_CACHE_CONTROL
+
+    again = client.get("/places/p1", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and service.reads == 1
+    assert again.headers["ETag"] == etag
+
+
+def test_new_index_generation_revalidates_against_the_database(service):
+    client = TestClient(main.app)
+    etag = client.get("/places/p1").headers["ETag"]
+
+    service.bundle_manifest = {"version": "v2"}
+    service.name = "Boudhanath Stupa"
+    changed = client.get("/places/p1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and service.reads == 2
+    assert changed.json()["name"] == "Boudhanath Stupa"
+    assert changed.headers["ETag"] != etag
@@ -0,0 +1,83 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from profiling import SamplingProfiler, profile_path, profiled
+
+
+def spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def busy_elsewhere(stop):
+    while not stop.is_set():
+        spin(0.001)
+
+
+def profile(work, interval_s=0.001):
+    profiler = SamplingProfiler(interval_s=interval_s)
+    assert profiler.start()
+    try:
+        work()
+    finally:
+        profiler.stop()
+    return profiler
+
+
+def test_only_threads_working_for_the_request_are_sampled():
+    stop = threading.Event()
+    other = threading.Thread(target=busy_elsewhere, args=(stop,), name="other-request")
+    other.start()
+    try:
+        with ThreadPoolExecutor(thread_name_prefix="inference") as executor:
+            def request():
+                # Submitted inside the profiled request: bound to its profiler
+                executor.submit(profiled(spin), 0.05).result()
+                spin(0.05)
+
+            profiler = profile(profiled(request))
+    finally:
+        stop.set()
+        other.join()
+
+    stacks = profiler.folded()
+    assert profiler.samples > 0
+    assert "busy_elsewhere" not in stacks and "other-request" not in stacks
+    assert any(line.startswith("inference") and "spin" in line for line in stacks.splitlines())
+    assert any(line.startswith("MainThread") and "request" in line for line in stacks.splitlines())
+
+
+def test_waiting_frames_are_not_sampled():
+    event = threading.Event()
+    timer = threading.Timer(0.05, event.set)
+    timer.start()
+    profiler = profile(profiled(lambda: event.wait()))
+    assert profiler.samples > 0
+    assert profiler.stacks == {}
+
+
+def test_profiled_is_a_no_op_without_an_active_profile():
+    assert profiled(lambda x: x + 1)(1) == 2
+
+
+def test_one_profile_at_a_time():
+    first = SamplingProfiler()
+    assert first.start()
+    try:
+        assert not SamplingProfiler().start()
+    finally:
+        first.stop()
+    second = SamplingProfiler()
+    assert second.start()
+    second.stop()
+
+
+def test_saved_profiles_resolve_by_id_only(tmp_path):
+    profiler = profile(profiled(lambda: spin(0.02)))
+    profile_id = profiler.save(str(tmp_path), "/search/along-route")
+    assert profile_id.endswith("-search-along-route.folded")
+    assert profile_path(str(tmp_path), profile_id) == str(tmp_path / profile_id)
+    assert profile_path(str(tmp_path), "../" + profile_id) is None
+    assert profile_path(str(tmp_path), "missing.folded") is None
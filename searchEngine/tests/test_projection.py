@@ -0,0 +1,110 @@
+import faiss
+import numpy as np
+import pytest
+
+from projection import (PCAProjection, evaluate_projection, fit_projection, project_index,
+                        recall_queries)
+
+
+def low_rank_vectors(n=200, dim=8, rank=3, noise=0.01, seed=0):
+    """Normalized vectors lying (almost) in a rank-dimensional subspace."""
+    rng = np.random.default_rng(seed)
+    basis = np.linalg.qr(rng.normal(size=(dim, rank)))[0].T
+    vectors = (rng.normal(size=(n, rank)) @ basis + noise * rng.normal(size=(n, dim))).astype('float32')
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def make_index(vectors):
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    return index
+
+
+def test_fit_keeps_orthonormal_axes_and_reports_explained_variance():
+    vectors = low_rank_vectors()
+    projection = PCAProjection.fit(vectors, 3)
+    assert (projection.input_dim, projection.output_dim) == (8, 3)
+    np.testing.assert_allclose(projection.components @ projection.components.T, np.eye(3), atol=1e-5)
+    assert 0.99 < projection.explained_variance <= 1.0
+    assert PCAProjection.fit(vectors, 1).explained_variance < projection.explained_variance
+
+
+def test_fit_rejects_dimensions_that_do_not_reduce():
+    vectors = low_rank_vectors()
+    for output_dim in (0, 8, 9):
+        with pytest.raises(ValueError):
+            PCAProjection.fit(vectors, output_dim)
+
+
+def test_apply_normalizes_and_preserves_ranking():
+    vectors = low_rank_vectors()
+    projection = PCAProjection.fit(vectors, 3)
+    projected = projection.apply(vectors)
+    assert projected.dtype == np.float32 and projected.shape == (200, 3)
+    np.testing.assert_allclose(np.linalg.norm(projected, axis=1), 1.0, rtol=1e-5)
+
+    # Nearly all energy is kept, so cosine scores barely move
+    np.testing.assert_allclose(projected[:20] @ projected[:20].T, vectors[:20] @ vectors[:20].T, atol=0.02)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    projection = PCAProjection.fit(low_rank_vectors(), 4)
+    path = str(tmp_path / "projection.npz")
+    projection.save(path)
+    loaded = PCAProjection.load(path)
+    np.testing.assert_array_equal(loaded.components, projection.components)
+    assert loaded.explained_variance == pytest.approx(projection.explained_variance)
+
+
+def test_fit_projection_samples_across_shards():
+    vectors = low_rank_vectors()
+    shards = [make_index(vectors[:50]), make_index(vectors[50:])]
+    projection = fit_projection(shards, 3, max_samples=100)
+    full = PCAProjection.fit(vectors, 3)
+    # Same subspace: projecting one basis onto the other keeps its length
+    overlap = projection.components @ full.components.T
+    np.testing.assert_allclose(np.linalg.norm(overlap, axis=1), 1.0, atol=0.01)
+
+
+def test_projected_index_recall_on_low_rank_data():
+    vectors = low_rank_vectors()
+    full_index = make_index(vectors)
+    projection = PCAProjection.fit(vectors, 3)
+    projected_index = project_index(full_index, projection)
+    assert projected_index.ntotal == 200 and projected_index.d == 3
+
+    queries, ids, source = recall_queries(full_index, limit=50)
+    result = evaluate_projection(full_index, projected_index, projection, queries, k=5, query_ids=ids)
+    assert result["recall"] > 0.9
+    assert result["full_ms"] >= 0 and result["projected_ms"] >= 0
+
+
+def test_recall_queries_prefers_stored_queries():
+    index = make_index(low_rank_vectors())
+    stored = low_rank_vectors(n=80, seed=1).astype('float64')
+
+    queries, ids, source = recall_queries(index, stored, limit=30)
+    assert source == "stored queries" and ids is None
+    assert queries.dtype == np.float32 and queries.shape == (30, 8)
+    # Sampled rows, not just the first ones
+    assert {tuple(row) for row in queries} <= {tuple(row) for row in stored.astype('float32')}
+
+    queries, ids, source = recall_queries(index, stored, limit=100)
+    assert len(queries) == 80
+
+
+def test_recall_queries_falls_back_to_a_corpus_sample():
+    vectors = low_rank_vectors()
+    index = make_index(vectors)
+
+    queries, ids, source = recall_queries(index, vectors[:10], limit=20, min_stored=50)
+    assert source == "corpus sample"
+    assert list(ids) == sorted(set(ids)) and len(ids) == 20
+    np.testing.assert_array_equal(queries, vectors[ids])
+
+    queries, ids, _ = recall_queries(index, None, limit=1000)
+    assert len(queries) == index.ntotal
+    # Deterministic for a given seed
+    np.testing.assert_array_equal(recall_queries(index, None, limit=20)[1],
+                                  recall_queries(index, None, limit=20)[1])
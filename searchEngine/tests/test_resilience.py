@@ -0,0 +1,200 @@
+import asyncio
+
+import pytest
+
+import resilience
+from resilience import AdmissionController, CircuitBreaker, OverloadedError, RequestBudget
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(resilience.time, "monotonic", fake)
+    return fake
+
+
+# ============== RequestBudget ==============
+
+def test_budget_remaining_never_negative(clock):
+    budget = RequestBudget.from_ms(200)
+    clock.now += 0.05
+    assert budget.remaining() == pytest.approx(0.15)
+    clock.now += 1.0
+    assert budget.remaining() == 0.0
+
+
+def test_budget_degraded_reasons_are_deduplicated():
+    budget = RequestBudget(1.0)
+    assert not budget.is_degraded
+    budget.mark_degraded("enrichment_timeout")
+    budget.mark_degraded("enrichment_timeout")
+    assert budget.degraded == ["enrichment_timeout"]
+
+
+# ============== CircuitBreaker ==============
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout_s=10)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert breaker.retry_after() == pytest.approx(10)
+
+
+def test_breaker_success_resets_failure_count(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success(0.01)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_counts_slow_calls_as_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, slow_call_s=0.5)
+    breaker.record_success(0.6)
+    breaker.record_success(0.7)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_breaker_half_open_allows_a_single_trial(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout_s=5)
+    breaker.record_failure()
+    clock.now += 5
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success(0.01)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+
+def test_breaker_failed_trial_reopens(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout_s=5)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 5
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_after() == pytest.approx(5)
+
+
+# ============== AdmissionController ==============
+
+def test_admission_runs_up_to_max_concurrent_then_queues():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=2, max_queue=4, max_wait_s=1.0)
+        await controller.acquire()
+        await controller.acquire()
+        waiter = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.queued == 1 and not waiter.done()
+
+        controller.release()
+        await waiter
+        assert controller.in_flight == 2 and controller.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_admission_rejects_when_queue_is_full():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, max_wait_s=1.0)
+        await controller.acquire()
+        waiter = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(OverloadedError) as error:
+            await controller.acquire()
+        assert error.value.reason == "queue_full"
+        assert controller.rejected == 1
+        waiter.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_admission_times_out_waiters():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=4, max_wait_s=0.01)
+        await controller.acquire()
+        with pytest.raises(OverloadedError) as error:
+            await controller.acquire()
+        assert error.value.reason == "queue_timeout"
+        assert controller.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_admission_serves_higher_priority_first():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=4, max_wait_s=1.0)
+        await controller.acquire()
+        order = []
+
+        async def request(priority, name):
+            await controller.acquire(priority)
+            order.append(name)
+            controller.release(priority)
+
+        low = asyncio.ensure_future(request(AdmissionController.LOW, "low"))
+        high = asyncio.ensure_future(request(AdmissionController.HIGH, "high"))
+        await asyncio.sleep(0)
+        controller.release()
+        await asyncio.gather(low, high)
+        assert order == ["high", "low"]
+
+    asyncio.run(scenario())
+
+
+def test_admission_sheds_lower_priority_waiter_for_higher_priority():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, max_wait_s=1.0)
+        await controller.acquire()
+        low = asyncio.ensure_future(controller.acquire(AdmissionController.LOW))
+        await asyncio.sleep(0)
+        high = asyncio.ensure_future(controller.acquire(AdmissionController.HIGH))
+        await asyncio.sleep(0)
+
+        with pytest.raises(OverloadedError):
+            await low
+        controller.release()
+        await high
+        assert controller.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_admission_caps_low_priority_slots():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=2, max_queue=4, max_wait_s=0.01,
+                                         low_priority_limit=1)
+        await controller.acquire(AdmissionController.LOW)
+        with pytest.raises(OverloadedError):
+            await controller.acquire(AdmissionController.LOW)
+        await controller.acquire(AdmissionController.NORMAL)
+        assert controller.in_flight == 2
+
+    asyncio.run(scenario())
+
+
+def test_admission_slot_releases_on_error():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1)
+        with pytest.raises(RuntimeError):
+            async with controller.slot():
+                assert controller.in_flight == 1
+                raise RuntimeError("boom")
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,55 @@
+import pytest
+
+from search_collections import COLLECTION_SPECS, get_collection_spec, list_collection_names
+
+
+def test_registry_lists_every_collection():
+    assert list_collection_names() == ["places", "craftsmen", "events"]
+    for name in list_collection_names():
+        assert get_collection_spec(name).name == name
+
+
+def test_unknown_collection_is_rejected():
+    with pytest.raises(ValueError, match="Unknown collection 'hotels'"):
+        get_collection_spec("hotels")
+
+
+def test_build_text_joins_configured_fields_and_lists():
+    spec = get_collection_spec("events")
+    text = spec.build_text({
+        "name": "Indra Jatra",
+        "description": "Chariot festival",
+        "tags": ["festival", "chariot"],
+        "category": None,
+        "locations": [{"name": "Basantapur"}, {"name": "Hanuman Dhoka"}],
+        "ignored": "not embedded"
+    })
+    assert text == "Indra Jatra Chariot festival festival chariot Basantapur Hanuman Dhoka"
+
+
+def test_place_metadata_accepts_lng_and_lon():
+    build = COLLECTION_SPECS["places"].build_metadata
+    assert build({"_id": "a", "coordinates": {"lat": 27.7, "lng": 85.3}, "category": "temple"}) == \
+        {"place_id": "a", "lat": 27.7, "lon": 85.3, "category": "temple"}
+    assert build({"id": "b", "coordinates": {"lat": 1.0, "lon": 2.0}})["lon"] == 2.0
+    assert build({"_id": "c"}) == {"place_id": "c", "lat": None, "lon": None, "category": ""}
+
+
+def test_event_metadata_anchors_on_first_location():
+    build = COLLECTION_SPECS["events"].build_metadata
+    meta = build({"_id": "e", "locations": [{"coordinates": {"lat": 1.0, "lng": 2.0}},
+                                            {"coordinates": {"lat": 3.0, "lng": 4.0}}]})
+    assert (meta["lat"], meta["lon"]) == (1.0, 2.0)
+    assert build({"_id": "f"})["lat"] is None
+
+
+def test_craftsman_metadata_uses_first_specialty():
+    build = COLLECTION_SPECS["craftsmen"].build_metadata
+    assert build({"_id": "c", "specialty": ["pottery", "clay"], "placeSlug": "bhaktapur"}) == \
+        {"craftsman_id": "c", "category": "pottery", "place_slug": "bhaktapur"}
+
+
+def test_embedding_projection_covers_text_fields():
+    projection = get_collection_spec("craftsmen").embedding_projection
+    for field in ("name", "bio", "specialty", "_id", "placeSlug"):
+        assert projection[field] == 1
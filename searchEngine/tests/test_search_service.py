@@ -0,0 +1,218 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import faiss
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from resilience import CircuitBreaker, RequestBudget
+from search_collections import get_collection_spec
+from search_service import CollectionIndex, SearchService
+
+DIM = 4
+
+
+def normalized(rows):
+    vectors = np.asarray(rows, dtype='float32')
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def make_service():
+    # Skips load_resources(): only the in-memory search path is exercised
+    return object.__new__(SearchService)
+
+
+def make_entry(vectors):
+    index = faiss.IndexFlatIP(DIM)
+    index.add(vectors)
+    metadata = {str(i): {"place_id": f"p{i}", "lat": None, "lon": None, "category": "temple"}
+                for i in range(len(vectors))}
+    return CollectionIndex(get_collection_spec("places"), index, metadata)
+
+
+VECTORS = normalized([
+    [1.0, 0.0, 0.0, 0.0],   # cosine 1.0 with the query
+    [1.0, 1.0, 0.0, 0.0],   # ~0.707
+    [1.0, 0.0, 3.0, 0.0],   # ~0.316
+    [0.1, 0.0, 1.0, 0.0],   # ~0.0995
+    [-1.0, 0.0, 0.0, 0.0],  # -1.0
+])
+QUERY = normalized([[1.0, 0.0, 0.0, 0.0]])
+
+
+def test_scores_are_cosine_similarities_in_descending_order():
+    hits = make_service()._search_collection(make_entry(VECTORS), QUERY, 5, None, False)
+    assert [hit["place_id"] for hit in hits] == ["p0", "p1", "p2", "p3", "p4"]
+    np.testing.assert_allclose([hit["score"] for hit in hits],
+                               [1.0, 0.7071, 0.3162, 0.0995, -1.0], atol=1e-3)
+    assert hits[0]["collection"] == "places" and hits[0]["faiss_index"] == 0
+
+
+def test_min_score_cuts_off_low_scores():
+    hits = make_service()._search_collection(make_entry(VECTORS), QUERY, 5, 0.5, False)
+    assert [hit["place_id"] for hit in hits] == ["p0", "p1"]
+
+
+def test_range_search_uses_default_threshold():
+    service = make_service()
+    hits = service._search_collection(make_entry(VECTORS), QUERY, 10, None, True)
+    assert all(hit["score"] >= SearchService.DEFAULT_RANGE_MIN_SCORE for hit in hits)
+    assert [hit["place_id"] for hit in hits] == ["p0", "p1", "p2"]
+
+
+def test_range_search_honours_min_score_and_top_k():
+    service = make_service()
+    entry = make_entry(VECTORS)
+    assert [hit["place_id"] for hit in service._search_collection(entry, QUERY, 10, 0.05, True)] \
+        == ["p0", "p1", "p2", "p3"]
+    assert [hit["place_id"] for hit in service._search_collection(entry, QUERY, 2, 0.05, True)] \
+        == ["p0", "p1"]
+
+
+def test_legacy_l2_index_is_converted_to_cosine():
+    raw = np.asarray([[3.0, 0.0, 0.0, 0.0], [0.0, 2.0, 0.0, 0.0], [1.0, 1.0, 0.0, 0.0]],
+                     dtype='float32')
+    legacy = faiss.IndexFlatL2(DIM)
+    legacy.add(raw)
+
+    index = SearchService._ensure_cosine_index(legacy)
+    assert index.metric_type == faiss.METRIC_INNER_PRODUCT
+    assert index.ntotal == 3
+    np.testing.assert_allclose(np.linalg.norm(index.reconstruct_n(0, 3), axis=1), 1.0, rtol=1e-6)
+
+    scores, ids = index.search(QUERY, 3)
+    np.testing.assert_array_equal(ids[0], [0, 2, 1])
+    np.testing.assert_allclose(scores[0], [1.0, 0.7071, 0.0], atol=1e-3)
+
+
+def test_cosine_index_is_left_untouched():
+    index = faiss.IndexFlatIP(DIM)
+    assert SearchService._ensure_cosine_index(index) is index
+
+
+def make_federated_service():
+    from thread_budget import ThreadBudget
+    service = make_service()
+    service.collections = {}
+    service.inference_executor = None
+    service.configure_threads(ThreadBudget(2, 1, 1))
+    for name, vectors in (("places", VECTORS[:3]), ("events", VECTORS[1:4])):
+        index = faiss.IndexFlatIP(DIM)
+        index.add(vectors)
+        spec = get_collection_spec(name)
+        metadata = {str(i): {spec.id_field: f"{name}-{i}"} for i in range(len(vectors))}
+        service.collections[name] = CollectionIndex(spec, index, metadata)
+    return service
+
+
+def test_federated_search_merges_collections_by_score():
+    service = make_federated_service()
+    try:
+        hits = service.search_embedding(QUERY, top_k=4)
+        assert [(hit["collection"], hit["id"]) for hit in hits] == [
+            ("places", "places-0"), ("places", "places-1"), ("events", "events-0"),
+            ("places", "places-2")]
+        assert hits[0]["place_id"] == "places-0" and hits[2]["event_id"] == "events-0"
+
+        only_events = service.search_embedding(QUERY, top_k=10, collections=["events"])
+        assert {hit["collection"] for hit in only_events} == {"events"}
+        with pytest.raises(ValueError):
+            service.search_embedding(QUERY, collections=["craftsmen"])
+    finally:
+        service.inference_executor.shutdown()
+
+
+class FakeCollectionService:
+    def __init__(self, delay_s=0.0, error=None):
+        self.delay_s = delay_s
+        self.error = error
+
+    def get_documents_by_ids(self, ids, projection=None, timeout=None):
+        time.sleep(self.delay_s)
+        if self.error:
+            raise self.error
+        return [{"_id": doc_id, "name": doc_id.upper()} for doc_id in ids]
+
+
+def make_enrichment_service(collection_service):
+    service = make_service()
+    entry = make_entry(VECTORS)
+    entry.service = collection_service
+    service.collections = {"places": entry}
+    service.executor = ThreadPoolExecutor()
+    service.latency_budget_s = 1.0
+    service.enrichment_breaker = CircuitBreaker("test", failure_threshold=1)
+    return service
+
+
+def hits(*ids):
+    return [{"collection": "places", "id": doc_id} for doc_id in ids]
+
+
+def test_enrichment_adds_full_details():
+    service = make_enrichment_service(FakeCollectionService())
+    budget = RequestBudget(1.0)
+    results = service._enrich_with_mongodb(hits("p0", "p1"), budget)
+    assert [r["full_details"]["name"] for r in results] == ["P0", "P1"]
+    assert not budget.is_degraded
+
+
+def test_enrichment_timeout_degrades_and_opens_breaker():
+    service = make_enrichment_service(FakeCollectionService(delay_s=0.3))
+    budget = RequestBudget(0.1)
+    results = service._enrich_with_mongodb(hits("p0"), budget)
+    assert "full_details" not in results[0]
+    assert budget.degraded == ["enrichment_timeout"]
+
+    # Breaker is open now: the next request skips MongoDB entirely
+    budget = RequestBudget(1.0)
+    service._enrich_with_mongodb(hits("p0"), budget)
+    assert budget.degraded == ["enrichment_circuit_open"]
+
+
+def test_enrichment_error_and_exhausted_budget():
+    service = make_enrichment_service(FakeCollectionService(error=RuntimeError("down")))
+    budget = RequestBudget(1.0)
+    service._enrich_with_mongodb(hits("p0"), budget)
+    assert budget.degraded == ["enrichment_error"]
+
+    service = make_enrichment_service(FakeCollectionService())
+    budget = RequestBudget(service.MIN_ENRICHMENT_BUDGET_S / 2)
+    service._enrich_with_mongodb(hits("p0"), budget)
+    assert budget.degraded == ["enrichment_budget_exhausted"]
+
+
+def make_bounds_service():
+    metadata = {
+        "0": {"place_id": "p-east", "lat": 0.0, "lon": 179.95, "category": "temple"},
+        "1": {"place_id": "p-west", "lat": 0.5, "lon": -179.95, "category": "temple"},
+        "2": {"place_id": "p-meridian", "lat": 0.0, "lon": 0.0, "category": "temple"},
+        "3": {"place_id": "p-dateline", "lat": -0.5, "lon": 180.0, "category": "museum"},
+    }
+    service = make_service()
+    service.collections = {"places": CollectionIndex(
+        get_collection_spec("places"), faiss.IndexFlatIP(DIM), metadata)}
+    return service
+
+
+def test_bounds_crossing_the_antimeridian_are_split():
+    service = make_bounds_service()
+    # west > east: the box spans 179E..179W
+    found = service.bounds_hits(-1.0, 179.0, 1.0, -179.0, zoom=17)
+    assert not found["clustered"]
+    assert [hit["id"] for hit in found["places"]] == ["p-dateline", "p-east", "p-west"]
+    assert found["total"] == 3
+
+    assert service.bounds_hits(-1.0, -179.0, 1.0, 179.0, zoom=17)["total"] == 1
+
+
+def test_clustered_bounds_crossing_the_antimeridian():
+    service = make_bounds_service()
+    found = service.bounds_hits(-1.0, 179.0, 1.0, -179.0, zoom=14, limit=1)
+    assert found["clustered"] and found["total"] == 3
+    assert found["truncated"] and len(found["clusters"]) == 1
+    # Ties on count are broken by cell (southernmost first); single points carry their hit
+    assert found["clusters"][0]["place"]["id"] == "p-dateline"
@@ -0,0 +1,98 @@
+import json
+
+import faiss
+import httpx
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from resilience import RequestBudget
+from search_collections import get_collection_spec
+from search_service import CollectionIndex, SearchService
+from shard_coordinator import RemoteCollection, ShardedSearchService
+from sharding import shard_for_id
+
+SHARDS = 3
+
+# A 6x6 grid of places around Kathmandu, about 1 km apart
+METADATA = {
+    str(row): {"place_id": f"place-{row:02d}", "lat": 27.68 + (row // 6) * 0.01,
+               "lon": 85.28 + (row % 6) * 0.01, "category": "temple" if row % 3 else "museum"}
+    for row in range(36)
+}
+BOX = {"south": 27.6, "west": 85.2, "north": 27.8, "east": 85.4}
+
+
+def make_node(rows):
+    metadata = {row: METADATA[row] for row in rows}
+    entry = CollectionIndex(get_collection_spec("places"), faiss.IndexFlatIP(3), metadata)
+    service = object.__new__(SearchService)
+    service.collections = {"places": entry}
+    return service
+
+
+def make_coordinator():
+    """Coordinator whose shards are in-process nodes holding their share of METADATA."""
+    nodes = [make_node([row for row, meta in METADATA.items()
+                        if shard_for_id(meta["place_id"], SHARDS) == shard])
+             for shard in range(SHARDS)]
+    coordinator = object.__new__(ShardedSearchService)
+    coordinator.collections = {"places": RemoteCollection(get_collection_spec("places"), len(METADATA))}
+    coordinator.latency_budget_s = 1.0
+    coordinator.shard_timeout_s = 0.5
+    coordinator.requests = []
+
+    def scatter(method, path, budget, params):
+        coordinator.requests.append(params)
+        params = {key: value for key, value in params.items() if key != "collection"}
+        # Through JSON, as the shard answers arrive over HTTP
+        return [json.loads(json.dumps(node.bounds_hits(**params))) for node in reversed(nodes)]
+
+    coordinator._scatter = scatter
+    return coordinator
+
+
+def test_unclustered_merge_matches_a_single_node():
+    single = make_node(list(METADATA)).bounds_hits(**BOX, zoom=17, limit=10)
+    merged = make_coordinator().bounds_hits(**BOX, zoom=17, limit=10)
+
+    assert [hit["id"] for hit in single["places"]] == [f"place-{row:02d}" for row in range(10)]
+    assert [hit["id"] for hit in merged["places"]] == [hit["id"] for hit in single["places"]]
+    assert merged["total"] == single["total"] == 36
+    assert merged["truncated"] and single["truncated"]
+
+
+def test_clusters_are_merged_per_cell_before_the_limit():
+    coordinator = make_coordinator()
+    merged = coordinator.bounds_hits(**BOX, zoom=12, limit=3)
+    single = make_node(list(METADATA)).bounds_hits(**BOX, zoom=12, limit=3)
+
+    # Shards are asked for every cell, not just the first `limit`
+    assert coordinator.requests[-1]["limit"] == ShardedSearchService.SHARD_CLUSTER_LIMIT
+    assert [(cluster["cell"], cluster["count"]) for cluster in merged["clusters"]] == \
+           [(cluster["cell"], cluster["count"]) for cluster in single["clusters"]]
+    assert merged["total"] == 36
+    for merged_cluster, single_cluster in zip(merged["clusters"], single["clusters"]):
+        assert merged_cluster["lat"] == pytest.approx(single_cluster["lat"], abs=1e-5)
+        assert merged_cluster["lon"] == pytest.approx(single_cluster["lon"], abs=1e-5)
+
+
+class TimingOutClient:
+    def get(self, url, params=None, timeout=None):
+        self.timeout = timeout
+        raise httpx.ReadTimeout("timed out")
+
+
+def test_similar_hits_timeout_returns_degraded_empty_list():
+    coordinator = make_coordinator()
+    coordinator.shards = [TimingOutClient() for _ in range(SHARDS)]
+    budget = RequestBudget(0.2)
+
+    assert coordinator.similar_hits("place-01", budget=budget) == []
+    assert budget.degraded == ["shard_timeout"]
+    owner = coordinator.shards[shard_for_id("place-01", SHARDS)]
+    assert 0 < owner.timeout <= 0.2
+
+    exhausted = RequestBudget(0.0)
+    assert coordinator.similar_hits("place-01", budget=exhausted) == []
+    assert exhausted.degraded == ["shard_timeout"]
@@ -0,0 +1,40 @@
+import os
+from collections import Counter
+
+import numpy as np
+
+from sharding import decode_vector, encode_vector, shard_bundles_dir, shard_for_id
+
+
+def test_shard_for_id_is_stable_and_in_range():
+    ids = [f"place-{i}" for i in range(1000)]
+    first = [shard_for_id(doc_id, 3) for doc_id in ids]
+    assert first == [shard_for_id(doc_id, 3) for doc_id in ids]
+    assert set(first) == {0, 1, 2}
+    # sha1-based, so independent of PYTHONHASHSEED
+    assert shard_for_id("abc", 4) == int.from_bytes(
+        bytes.fromhex("a9993e364706816aba3e25717850c26c9cd0d89d")[:8], "big") % 4
+
+
+def test_shard_for_id_single_shard_and_non_string_ids():
+    assert shard_for_id("anything", 1) == 0
+    assert shard_for_id("anything", 0) == 0
+    assert shard_for_id(42, 5) == shard_for_id("42", 5)
+
+
+def test_shard_for_id_spreads_documents_evenly():
+    counts = Counter(shard_for_id(f"{i:024x}", 4) for i in range(4000))
+    assert all(800 <= counts[shard] <= 1200 for shard in range(4))
+
+
+def test_shard_bundles_dir_layout():
+    assert shard_bundles_dir("bundles", 1, 3) == os.path.join("bundles", "shard-1-of-3")
+
+
+def test_vector_wire_format_round_trip():
+    vector = np.asarray([[0.1, -2.5, 3.0e-8, 1.0]], dtype='float32')
+    decoded = decode_vector(encode_vector(vector))
+    assert decoded.dtype == np.float32 and decoded.shape == (1, 4)
+    assert np.array_equal(decoded, vector)
+    # A flat vector comes back as a single query row
+    assert decode_vector(encode_vector(vector[0])).shape == (1, 4)
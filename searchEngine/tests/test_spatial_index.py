@@ -0,0 +1,92 @@
+import math
+
+import pytest
+
+from spatial_index import CLUSTER_MAX_ZOOM, METERS_PER_DEGREE, SpatialGrid
+
+METADATA = {
+    "0": {"lat": 27.7000, "lon": 85.3000, "category": "temple"},
+    "1": {"lat": 27.7050, "lon": 85.3050, "category": "temple"},
+    "2": {"lat": 27.7200, "lon": 85.3000, "category": "museum"},
+    "3": {"lat": 28.2000, "lon": 83.9800, "category": "lake"},
+    "4": {"lat": None, "lon": None},
+    "5": {"lat": float("nan"), "lon": 85.3},
+}
+
+
+def test_points_without_coordinates_are_skipped():
+    grid = SpatialGrid(METADATA)
+    assert len(grid) == 4
+    assert grid.coordinates_of(4) is None and grid.coordinates_of(5) is None
+    assert grid.coordinates_of(3) == (28.2, 83.98)
+
+
+def test_rows_in_bbox_cell_walk_is_inclusive():
+    grid = SpatialGrid(METADATA)
+    assert sorted(grid.rows_in_bbox(27.70, 85.30, 27.705, 85.305)) == [0, 1]
+    assert grid.rows_in_bbox(27.71, 85.31, 27.711, 85.311) == []
+
+
+def test_rows_in_bbox_scans_points_for_wide_boxes():
+    grid = SpatialGrid(METADATA)
+    # Covers far more cells than are occupied: falls back to the point scan
+    assert sorted(grid.rows_in_bbox(27.0, 83.0, 29.0, 86.0)) == [0, 1, 2, 3]
+    assert sorted(grid.rows_in_bbox(27.0, 85.0, 28.0, 86.0)) == [0, 1, 2]
+
+
+def test_rows_near_polyline_reports_distance_and_offset():
+    grid = SpatialGrid(METADATA)
+    # North-south route along lon 85.3 from point 0 to point 2
+    corridor = grid.rows_near_polyline([(27.70, 85.30), (27.72, 85.30)], buffer_m=600)
+    assert sorted(corridor) == [0, 1, 2]
+
+    distance, offset = corridor[0]
+    assert distance == pytest.approx(0, abs=1e-6) and offset == pytest.approx(0, abs=1e-6)
+    distance, offset = corridor[2]
+    assert offset == pytest.approx(0.02 * METERS_PER_DEGREE)
+
+    x_scale = METERS_PER_DEGREE * math.cos(math.radians(27.71))
+    distance, offset = corridor[1]
+    assert distance == pytest.approx(0.005 * x_scale, rel=1e-6)
+    assert offset == pytest.approx(0.005 * METERS_PER_DEGREE, rel=1e-6)
+
+
+def test_rows_near_polyline_buffer_and_single_vertex():
+    grid = SpatialGrid(METADATA)
+    assert sorted(grid.rows_near_polyline([(27.70, 85.30), (27.72, 85.30)], 100)) == [0, 2]
+    assert sorted(grid.rows_near_polyline([(27.70, 85.30)], 1000)) == [0, 1]
+    assert grid.rows_near_polyline([], 1000) == {}
+    assert SpatialGrid({}).rows_near_polyline([(0.0, 0.0)], 1000) == {}
+
+
+def test_clusters_in_bbox_counts_centroid_and_category():
+    grid = SpatialGrid(METADATA)
+    # Zoom 10 cells are ~0.09 degrees: points 0-2 share a cell, point 3 is alone
+    clusters = sorted(grid.clusters_in_bbox(27.0, 83.0, 29.0, 86.0, 10), key=lambda c: -c["count"])
+    assert [cluster["count"] for cluster in clusters] == [3, 1]
+
+    kathmandu, pokhara = clusters
+    assert kathmandu["lat"] == pytest.approx((27.70 + 27.705 + 27.72) / 3, abs=1e-4)
+    assert kathmandu["lon"] == pytest.approx((85.30 + 85.305 + 85.30) / 3, abs=1e-4)
+    assert (kathmandu["category"], kathmandu["category_count"]) == ("temple", 2)
+    assert kathmandu["row"] in (0, 1, 2)
+    assert kathmandu["cell"][0] == 10
+    assert (pokhara["row"], pokhara["category"], pokhara["category_count"]) == (3, "lake", 1)
+
+
+def test_clusters_in_bbox_filters_by_centroid():
+    grid = SpatialGrid(METADATA)
+    assert [cluster["row"] for cluster in grid.clusters_in_bbox(28.1, 83.9, 28.3, 84.0, 10)] == [3]
+    # Contains point 2 but not the centroid of its cluster
+    assert grid.clusters_in_bbox(27.715, 85.29, 27.725, 85.31, 10) == []
+
+
+def test_clusters_in_bbox_clamps_zoom():
+    grid = SpatialGrid(METADATA)
+    world = grid.clusters_in_bbox(-90, -180, 90, 180, -3)
+    assert [(cluster["cell"], cluster["count"]) for cluster in world] == [([0, 0, 0], 4)]
+
+    deepest = grid.clusters_in_bbox(-90, -180, 90, 180, 30)
+    assert {cluster["cell"][0] for cluster in deepest} == {CLUSTER_MAX_ZOOM}
+    assert sum(cluster["count"] for cluster in deepest) == 4
+    assert SpatialGrid({}).clusters_in_bbox(-90, -180, 90, 180, 5) == []
@@ -0,0 +1,100 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import faiss
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+import sync_embeddings
+from artifact_bundle import BundleWriter, load_collection, read_manifest
+from search_collections import get_collection_spec
+from sharding import shard_for_id
+
+DIM = 4
+
+
+class FakeEncoder:
+    """Deterministic per-text vectors; random delays make batches finish out of order."""
+
+    def __init__(self, delay_s=0.0):
+        self.delay_s = delay_s
+
+    def get_sentence_embedding_dimension(self):
+        return DIM
+
+    def encode(self, texts):
+        time.sleep(random.random() * self.delay_s)
+        return np.array([vector_for(text) for text in texts], dtype='float32')
+
+
+def vector_for(text):
+    rng = np.random.default_rng(abs(hash(text)) % (2 ** 32))
+    return rng.standard_normal(DIM).astype('float32')
+
+
+class FakeEventService:
+    def __init__(self, name, docs):
+        self.docs = docs
+
+    def count_documents(self):
+        return len(self.docs)
+
+    def iter_documents_for_embedding(self, projection, batch_size):
+        for start in range(0, len(self.docs), batch_size):
+            yield [dict(doc) for doc in self.docs[start:start + batch_size]]
+
+
+DOCS = [{"id": f"event-{i}", "_id": f"event-{i}", "name": f"Festival {i}",
+         "locations": [{"coordinates": {"lat": 27.7, "lng": 85.3}}]} for i in range(23)]
+
+
+@pytest.fixture
+def events_service(monkeypatch):
+    monkeypatch.setattr(sync_embeddings, "CollectionService",
+                        lambda name: FakeEventService(name, DOCS))
+
+
+def build(tmp_path, shards, model=None, pool=None, workers=1):
+    spec = get_collection_spec("events")
+    bundles = [BundleWriter(str(tmp_path / f"shard-{shard}"), "fake", DIM)
+               for shard in range(shards)]
+    assert sync_embeddings.sync_collection(spec, model, bundles, pool, workers, batch_size=5)
+    results = []
+    for bundle in bundles:
+        bundle_dir = bundle.publish()
+        results.append(load_collection(bundle_dir, read_manifest(bundle_dir), "events")[:2])
+    return results
+
+
+def assert_rows_match_metadata(index, metadata):
+    spec = get_collection_spec("events")
+    for row in range(index.ntotal):
+        doc = next(doc for doc in DOCS if doc["id"] == metadata[str(row)]["event_id"])
+        expected = vector_for(spec.build_text(doc)).reshape(1, DIM)
+        faiss.normalize_L2(expected)
+        np.testing.assert_allclose(index.reconstruct(row), expected[0], rtol=1e-5)
+
+
+def test_in_process_build(tmp_path, events_service):
+    [(index, metadata)] = build(tmp_path, shards=1, model=FakeEncoder())
+    assert index.ntotal == len(DOCS)
+    assert [metadata[str(i)]["event_id"] for i in range(len(DOCS))] == [d["id"] for d in DOCS]
+    assert_rows_match_metadata(index, metadata)
+
+
+def test_pooled_build_keeps_cursor_order_without_a_parent_model(tmp_path, events_service,
+                                                               monkeypatch):
+    # Stands in for the worker processes: _encode_batch uses the worker's encoder
+    monkeypatch.setattr(sync_embeddings, "_worker_model", FakeEncoder(delay_s=0.01))
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        assert pool.submit(sync_embeddings._worker_dimension).result() == DIM
+        shards = build(tmp_path, shards=2, pool=pool, workers=3)
+
+    assert sum(index.ntotal for index, _ in shards) == len(DOCS)
+    for shard, (index, metadata) in enumerate(shards):
+        ids = [metadata[str(i)]["event_id"] for i in range(index.ntotal)]
+        assert ids == [d["id"] for d in DOCS if shard_for_id(d["id"], 2) == shard]
+        assert_rows_match_metadata(index, metadata)
@@ -0,0 +1,55 @@
+import threading
+
+import pytest
+
+import thread_budget
+from thread_budget import ThreadBudget, available_cpus, in_inference_thread, init_inference_thread
+
+
+@pytest.mark.parametrize("cpus, expected", [
+    (1, ThreadBudget(1, 1, 1)),
+    (2, ThreadBudget(1, 2, 2)),
+    (8, ThreadBudget(4, 2, 2)),
+    (32, ThreadBudget(4, 8, 8)),
+])
+def test_for_host_fills_the_cores(cpus, expected):
+    budget = ThreadBudget.for_host(cpus=cpus)
+    assert budget == expected
+    assert budget.total_threads <= cpus
+
+
+def test_for_host_keeps_explicit_values():
+    budget = ThreadBudget.for_host(inference_workers=2, faiss_threads=1, cpus=8)
+    assert budget == ThreadBudget(2, 4, 1)
+    assert budget.total_threads == 8
+
+
+def test_total_threads_counts_every_worker():
+    assert ThreadBudget(3, 2, 4).total_threads == 12
+    assert ThreadBudget(3, 2, 4).as_dict()["total_threads"] == 12
+
+
+def test_search_cpus_caps_available_cpus(monkeypatch):
+    monkeypatch.delenv("SEARCH_CPUS", raising=False)
+    host = available_cpus()
+    monkeypatch.setenv("SEARCH_CPUS", "1")
+    assert available_cpus() == 1
+    assert ThreadBudget.for_host() == ThreadBudget(1, 1, 1)
+    monkeypatch.setenv("SEARCH_CPUS", str(host + 100))
+    assert available_cpus() == host
+
+
+def test_inference_threads_are_marked(monkeypatch):
+    limits = []
+    monkeypatch.setattr(thread_budget.faiss, "omp_set_num_threads", limits.append)
+    seen = []
+
+    def worker():
+        init_inference_thread(3)
+        seen.append(in_inference_thread())
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    assert seen == [True] and limits == [3]
+    assert not in_inference_thread()
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from replay_traffic import build_request, load_records, percentile
+from traffic_log import MAX_QUERY_LENGTH, TrafficLogger, sanitize_query
+
+
+def test_sanitize_masks_contacts_and_control_characters():
+    assert sanitize_query("call +977 98-4123 4567\tor mail ram@example.com\x00now") == \
+        "call <number> or mail <email> now"
+    assert sanitize_query("  temples   near\npatan ") == "temples near patan"
+    assert sanitize_query("year 2024") == "year 2024"
+    assert sanitize_query(None) is None
+
+
+def test_sanitize_truncates_long_queries():
+    assert sanitize_query("a" * 500) == "a" * MAX_QUERY_LENGTH
+
+
+def read_lines(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_capture_records_sanitized_request_and_status(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    logger = TrafficLogger(str(path))
+    with logger.capture("POST", "search", "/search", query="ram@example.com temples",
+                        top_k=5, collections=None, min_score=0.3) as record:
+        record["results"] = 2
+    with pytest.raises(HTTPException):
+        with logger.capture("GET", "place", "/places/x"):
+            raise HTTPException(status_code=404)
+    logger.close()
+
+    first, second = read_lines(path)
+    assert first["query"] == "<email> temples"
+    assert first["filters"] == {"min_score": 0.3}
+    assert (first["status"], first["results"], first["top_k"]) == (200, 2, 5)
+    assert second["status"] == 404 and "duration_ms" in second
+
+
+def test_sampling_can_skip_every_request(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    logger = TrafficLogger(str(path), sample_rate=0.0)
+    with logger.capture("POST", "search", "/search", query="lakes"):
+        pass
+    logger.close()
+    assert path.read_text() == ""
+
+
+def test_replay_round_trip(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    path.write_text("\n".join([
+        json.dumps({"ts": 2, "method": "GET", "path": "/places/a/similar",
+                    "filters": {"limit": 5}}),
+        "{truncated",
+        json.dumps({"ts": 1, "method": "POST", "path": "/search", "query": "lakes",
+                    "top_k": 10, "filters": {"collections": ["places"]}}),
+    ]))
+    records = load_records([str(path)])
+    assert [record["ts"] for record in records] == [1, 2]
+    assert load_records([str(path)], limit=1) == records[:1]
+
+    assert build_request(records[0]) == {
+        "method": "POST", "url": "/search",
+        "json": {"query": "lakes", "top_k": 10, "collections": ["places"]}}
+    assert build_request(records[1]) == {
+        "method": "GET", "url": "/places/a/similar", "params": {"limit": 5}}
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile([7.0], 99) == 7.0
+    assert percentile([], 50) == 0.0
@@ -0,0 +1,101 @@
+"""
+CPU Thread Budget
+Splits the host's cores between concurrent inference calls and the intra-op
+threads each call may use (PyTorch encoder, FAISS OpenMP). Left alone, each
+of them sizes itself to every core and they oversubscribe the CPU under load.
+
+PyTorch's intra-op thread count is process-wide, not per inference thread:
+each concurrent encode uses up to encoder_threads, so the encoder as a whole
+uses encoder_threads x inference_workers threads at full load. FAISS OpenMP
+limits are per calling thread and add up the same way.
+"""
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+import faiss
+
+_thread_state = threading.local()
+
+
+def available_cpus() -> int:
+    """
+    Cores this process may run on (respects CPU affinity / container pinning).
+    SEARCH_CPUS lowers this when several processes share the host.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = int(os.getenv("SEARCH_CPUS", 0))
+    return min(cpus, limit) if limit > 0 else cpus
+
+
+@dataclass(frozen=True)
+class ThreadBudget:
+    """
+    How many inference calls run at once, and the threads each may use.
+    Process totals are these per-call counts times inference_workers.
+    """
+
+    inference_workers: int
+    encoder_threads: int
+    faiss_threads: int
+
+    @classmethod
+    def for_host(cls, inference_workers: Optional[int] = None,
+                 encoder_threads: Optional[int] = None,
+                 faiss_threads: Optional[int] = None,
+                 cpus: Optional[int] = None) -> "ThreadBudget":
+        """
+        Fills unset values so that total_threads roughly equals the cores.
+
+        By default up to 4 inference calls run concurrently (half the cores),
+        each using an equal share of the cores for its intra-op threads.
+        """
+        cpus = cpus or available_cpus()
+        workers = inference_workers or max(1, min(4, cpus // 2))
+        share = max(1, cpus // workers)
+        return cls(
+            inference_workers=workers,
+            encoder_threads=encoder_threads or share,
+            faiss_threads=faiss_threads or share
+        )
+
+    @property
+    def total_threads(self) -> int:
+        """
+        Threads busy when every worker is inside a call. Encoding and the FAISS
+        search run one after the other, so a call uses the larger of the two.
+        """
+        return self.inference_workers * max(self.encoder_threads, self.faiss_threads)
+
+    def as_dict(self) -> Dict[str, int]:
+        return {**asdict(self), "total_threads": self.total_threads, "cpus": available_cpus()}
+
+
+def apply_encoder_threads(threads: int):
+    """
+    Sets how many intra-op threads each PyTorch encode may use. The setting is
+    process-wide and every inference thread's encode gets that many.
+    """
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def init_inference_thread(faiss_threads: int):
+    """
+    Executor initializer for inference threads. OpenMP thread counts are per
+    calling thread, so each worker sets its own FAISS limit.
+    """
+    faiss.omp_set_num_threads(faiss_threads)
+    _thread_state.is_inference = True
+
+
+def in_inference_thread() -> bool:
+    """True when called from a thread started with init_inference_thread."""
+    return getattr(_thread_state, "is_inference", False)
@@ -0,0 +1,126 @@
+"""
+Traffic Capture
+Optional, low-overhead logging of sanitized search requests to a rotating
+JSON-lines file. Records are handed to a background thread through a queue,
+so the request path only pays for building a small dict.
+
+The file is the input format for replay_traffic.py and
+precompute_query_embeddings.py.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from fastapi import HTTPException
+
+MAX_QUERY_LENGTH = 200
+
+_CONTROL_CHARS = re.compile(r'[\x00-\x1f\x7f]')
+_EMAIL = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')
+_LONG_NUMBER = re.compile(r'\+?\d[\d\s-]{6,}\d')
+
+
+def sanitize_query(query: Optional[str]) -> Optional[str]:
+    """Strips control characters, masks emails/phone numbers and truncates."""
+    if query is None:
+        return None
+    query = _CONTROL_CHARS.sub(" ", query)
+    query = _EMAIL.sub("<email>", query)
+    query = _LONG_NUMBER.sub("<number>", query)
+    return " ".join(query.split())[:MAX_QUERY_LENGTH]
+
+
+class TrafficLogger:
+    """Writes one JSON line per captured request from a background thread."""
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024,
+                 backup_count: int = 5, sample_rate: float = 1.0):
+        """
+        Args:
+            path: Log file path (rotated as path.1, path.2, ...)
+            max_bytes: Rotate once the file reaches this size
+            backup_count: Number of rotated files to keep
+            sample_rate: Fraction of requests to record (0-1)
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+        )
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+
+        self._queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=10000)
+        self._listener = logging.handlers.QueueListener(self._queue, file_handler)
+        self._logger = logging.getLogger(f"search.traffic.{id(self)}")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        self._logger.addHandler(_DroppingQueueHandler(self._queue))
+        self._listener.start()
+
+    def log(self, record: Dict[str, Any]):
+        """Queues a record for writing."""
+        self._logger.info(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+
+    @contextmanager
+    def capture(self, method: str, endpoint: str, path: str, query: Optional[str] = None,
+                top_k: Optional[int] = None, **filters) -> Iterator[Dict[str, Any]]:
+        """
+        Times the wrapped block and logs the request when it finishes.
+
+        The yielded dict can be updated with "results" and "degraded". The
+        status is taken from a raised HTTPException (500 for other errors).
+        """
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            yield {}
+            return
+
+        record: Dict[str, Any] = {
+            "ts": time.time(),
+            "method": method,
+            "endpoint": endpoint,
+            "path": path,
+            "query": sanitize_query(query),
+            "top_k": top_k,
+            "filters": {key: value for key, value in filters.items() if value is not None},
+            "status": 200
+        }
+        started = time.perf_counter()
+        try:
+            yield record
+        except HTTPException as e:
+            record["status"] = e.status_code
+            raise
+        except Exception:
+            record["status"] = 500
+            raise
+        finally:
+            record["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            self.log(record)
+
+    def close(self):
+        """Flushes queued records and stops the writer thread."""
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The message is already a JSON string; skip the default formatting work
+        return record
+